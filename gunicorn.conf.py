@@ -0,0 +1,35 @@
+# Configuracion de gunicorn, se carga sola al correr `gunicorn wsgi --chdir ./src/`
+# desde la raiz del proyecto (Procfile / render.yaml).
+import os
+import shutil
+import sys
+
+# modo de worker, ver src/wsgi.py; WEB_CONCURRENCY sigue eligiendo cuantos workers
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+if threads > 1:
+    # la app se importa en cada worker y lee esta variable (database.py)
+    os.environ.setdefault("DB_POOL_SIZE", str(threads))
+
+
+def on_starting(server):
+    # las metricas multiproceso de un arranque anterior no deben sumarse
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # solo con preload_app la app ya esta importada en el maestro
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        from database import dispose_after_fork
+        dispose_after_fork(app_module.app, app_module.db)
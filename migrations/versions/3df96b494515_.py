@@ -0,0 +1,54 @@
+"""search_document para GET /search
+
+Revision ID: 3df96b494515
+Revises: 2f444ac7cd18
+Create Date: 2026-10-18 10:32:07.514326
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3df96b494515'
+down_revision = '2f444ac7cd18'
+branch_labels = None
+depends_on = None
+
+# tabla, codigo de la llave (id * 4 + codigo), columnas del body; igual que src/search.py
+SOURCES = (
+    ('character', 1, ('homeworld', 'gender', 'description')),
+    ('planet', 2, ('climate', 'terrain', 'description')),
+    ('vehicle', 3, ('model', 'vehicle_class', 'manufactured', 'description')),
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE search_document ("
+            " doc_id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL,"
+            " title TEXT NOT NULL, body TEXT NOT NULL,"
+            " document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED)")
+        op.execute("CREATE INDEX ix_search_document_document ON search_document USING GIN (document)")
+        key = 'doc_id'
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE search_document USING fts5("
+            "kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')")
+        key = 'rowid'
+    else:
+        return
+
+    for table, code, columns in SOURCES:
+        body = " || ' ' || ".join(f"coalesce({name}, '')" for name in columns)
+        op.execute(
+            f"INSERT INTO search_document ({key}, kind, ref_id, title, body) "
+            f"SELECT id * 4 + {code}, '{table}', id, name, {body} FROM {table}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('postgresql', 'sqlite'):
+        op.execute("DROP TABLE search_document")
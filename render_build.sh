@@ -7,5 +7,6 @@ set -o errexit
 # npm run build
 
 pipenv install
+pipenv run extras
 
 pipenv run upgrade
\ No newline at end of file
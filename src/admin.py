@@ -2,6 +2,14 @@ import os
 from flask_admin import Admin
 from models import db, User
 from flask_admin.contrib.sqla import ModelView
+from passwords import hash_password, parse
+
+
+class UserView(ModelView):
+    # el formulario muestra el hash; si lo cambian por un password nuevo se guarda hasheado
+    def on_model_change(self, form, model, is_created):
+        if parse(model.password) is None:
+            model.password = hash_password(model.password)
 
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
@@ -10,7 +18,7 @@ def setup_admin(app):
 
     
     # Add your models here, for example this is how we add a the User model to the admin
-    admin.add_view(ModelView(User, db.session))
+    admin.add_view(UserView(User, db.session))
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
@@ -2,18 +2,42 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for
+import io
+from flask import Flask, g, request, jsonify, url_for
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from flask_cors import CORS
 from utils import APIException, generate_sitemap
 from admin import setup_admin
 from models import db, User, Planet, user_planet, Character, user_character, user_vehicle,Vehicle
+from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import RequestEntityTooLarge
+from pagination import paginate, parse_expand, expand_options, wants_stream, stream_response
+from favorites import get_favorites, apply_bulk, MAX_BULK_OPERATIONS
+from importer import (IMPORT_MODELS, MAX_BYTES as IMPORT_MAX_BYTES, MAX_ROWS as IMPORT_MAX_ROWS, import_rows,
+                      read_records, import_catalog_command)
+from cache import response_cache
+from serializers import setup_json
+from bench import bench_cli
+from instrumentation import setup_instrumentation, query_report
+from metrics import setup_metrics
+from compression import setup_compression
+from database import engine_options, env_flag, pool_stats, check_database
+from replicas import replica_router, read_replica, replica_binds, replica_urls
+from versions import conditional, touch, track as track_versions
+from search import search, include_object, track as track_search
+from validation import validate_payload, check_unique
+from passwords import hash_password, verify_login
+from auth import auth, login_required
+from ratelimit import rate_limit, WRITE_LIMIT, LOGIN_LIMIT
+from multiget import parse_ids, load_items, item_response, items_response
+from stats import count_favorite, favorite_summary, ranking, favorite_count_of, stats_cli, track as track_stats
 # from models import Person
 
 app = Flask(__name__)
 app.url_map.strict_slashes = False
+setup_json(app)
 
 db_url = os.getenv("DATABASE_URL")
 if db_url is not None:
@@ -22,11 +46,28 @@ if db_url is not None:
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_BINDS'] = replica_binds(replica_urls(), engine_options)
+# endpoints operativos que muestran SQL, tiempos y las bases de toda la app:
+# solo con FLASK_DEBUG=1 u OPS_ENDPOINTS=1, sin ellos ni se registran
+app.config['OPS_ENDPOINTS'] = app.debug or env_flag("OPS_ENDPOINTS", "0")
 
-MIGRATE = Migrate(app, db)
+MIGRATE = Migrate(app, db, include_object=include_object)
 db.init_app(app)
+replica_router.init_app(app, db)
 CORS(app)
 setup_admin(app)
+auth.init_app(app, db)
+app.cli.add_command(import_catalog_command)
+app.cli.add_command(bench_cli)
+app.cli.add_command(stats_cli)
+response_cache.track(db.session)
+track_versions(db.session)
+track_search(db.session)
+track_stats(db.session)
+setup_instrumentation(app)
+setup_metrics(app)
+setup_compression(app)
 
 # Handle/serialize errors like a JSON object
 
@@ -47,62 +88,64 @@ def validate_required(data, required_fields):
     missing = [field for field in required_fields if not data.get(field)]
     return missing
 
+# columnas por las que se puede filtrar en los listados (?name=Luke, ?name=Lu*)
+# sin email: filtrar por email diria que emails estan registrados
+USER_DIRECTORY_FILTERS = ["name", "last_name"]
+CHARACTER_FILTERS = ["name", "gender", "homeworld"]
+PLANET_FILTERS = ["name", "climate", "terrain"]
+VEHICLE_FILTERS = ["name", "vehicle_class", "model"]
+
+def page_response(items, next_cursor, empty_message):
+    body = {"results": items, "next_cursor": next_cursor}
+    if not items:
+        body["message"] = empty_message
+    return jsonify(body), 200
+
 # rutas para el modelo User
 @app.route('/user', methods=['GET'])
+@login_required()
+@read_replica
+@conditional("user")
 def get_all_users():
     try:
-        users = User.query.all()
-        if not users:
-            return jsonify({"message": "No hay Usuarios Registrados"}), 200
-        return jsonify([user.serialize() for user in users]), 200
+        # el listado es un directorio: email, telefono y favoritos solo en GET /user/<id> del propio usuario
+        if parse_expand(User, {"expand": request.args.get("expand", "")}):
+            raise APIException("Solo puede acceder a sus propios datos", status_code=403)
+        args = request.args.copy()
+        fields = [name.strip() for name in args.get("fields", "").split(",") if name.strip()]
+        hidden = [name for name in fields if name not in User.DIRECTORY_FIELDS]
+        if hidden:
+            raise APIException("Campos no validos", status_code=400, payload={"invalid_fields": hidden})
+        args["fields"] = ",".join(fields or User.DIRECTORY_FIELDS)
+        if wants_stream(args):
+            return stream_response(User, args, USER_DIRECTORY_FILTERS)
+        users, next_cursor = paginate(User, args, USER_DIRECTORY_FILTERS)
+        return page_response(users, next_cursor, "No hay Usuarios Registrados")
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error en la base de datos", "detatls": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "detail": str(e)}), 500
 
 @app.route("/user", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
 def create_user():
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "No hay Datos Verifique"}), 400
+    clean_data = validate_payload(User, data)
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"message": "No hay Datos Verifique"}), 400
-
-        # name = data.get("name")
-        # last_name = data.get("last_name")
-        # phone = data.get("phone")
-        # email = data.get("email")
-        # password = data.get("password")
-        # is_active = data.get("is_active")
-
-        # if not email or not name or not password or not is_active:
-        #    return jsonify({"message": "Se necesitan todos los valores"})
-
-        required = ["name", "last_name", "phone", "email", "password",
-                   "is_active"]
-
-
-        clean_data = {field: data[field] for field in required if field in data}
-
-        for field in required:
-            if not data.get(field):
-                return jsonify({"message": f"El campo '{field}' es requerido"}), 400
-
-
-
+        check_unique(User, clean_data)
+        clean_data["password"] = hash_password(clean_data["password"])
         new_user = User(**clean_data)
-            #name=name,
-            #last_name=last_name,
-            #phone=phone,
-            #email=email,
-            #password=password,
-            #is_active=is_active
-             #)
-
         db.session.add(new_user)
         db.session.commit()
 
         return jsonify({"new_user": new_user.serialize()}), 201
 
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
@@ -110,40 +153,100 @@ def create_user():
         return jsonify({"Error": "Error en el servidor ", "detalles": str(e)}), 500
 
 @app.route("/user/<int:user_id>", methods=["GET"])
+@login_required(owner="user_id")
+@read_replica
+@conditional("user:{user_id}", "favorites:{user_id}", "planet", "character", "vehicle")
 def get_one_user(user_id):
     try:
-        user = User.query.get(user_id)
+        expand = parse_expand(User, request.args)
+        user = db.session.get(User, user_id, options=expand_options(User, expand))
         if not user:
             return jsonify({"message": "Usuario no encontrado", "user_id": user_id}), 200
-        return jsonify({"user": user.serialize()}), 200
+        return jsonify({"user": user.serialize(expand)}), 200
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"error": "se produjo un error en el servidor", "Details": str(e)}), 500
 
 @app.route("/user/<int:user_id>", methods=["PUT"]) # prueba
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def update_user(user_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "No hay datos para actualizar"}), 400
+    clean_data = validate_payload(User, data, partial=True)
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"message": "No hay datos para actualizar"}), 400
         user = User.query.get(user_id)
         if not user:
             return jsonify({"message": "Usuario no encontrado"}), 404
-        # Campos permitidos para actualizar
-        updatable_fields = ["name", "last_name", "phone", "email", "password", "is_active"]
-        for field in updatable_fields:
-            if field in data:
-                setattr(user, field, data[field])
+        check_unique(User, clean_data, user_id)
+        if "password" in clean_data:
+            clean_data["password"] = hash_password(clean_data["password"])
+        for field, value in clean_data.items():
+            setattr(user, field, value)
         db.session.commit()
         return jsonify({"updated_user": user.serialize()}), 200
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+@app.route("/login", methods=["POST"])
+@rate_limit(LOGIN_LIMIT)
+def login():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "No hay Datos Verifique"}), 400
+    missing = validate_required(data, ["email", "password"])
+    if missing:
+        return jsonify({"message": "Faltan campos requeridos", "missing_fields": missing}), 400
+    if not isinstance(data["email"], str) or not isinstance(data["password"], str):
+        return jsonify({"message": "email y password deben ser texto"}), 400
+    try:
+        user = db.session.scalars(select(User).where(User.email == data["email"])).first()
+        stored = user.password if user else None
+        ok, new_hash = verify_login(data["password"], stored)
+        if not ok:
+            return jsonify({"message": "Email o password incorrectos"}), 401
+        if not user.is_active:
+            return jsonify({"message": "Usuario inactivo"}), 403
+        if new_hash:
+            # costo viejo o texto plano: se guarda el hash nuevo solo si nadie lo cambio mientras tanto
+            db.session.execute(update(User).where(User.id == user.id, User.password == stored)
+                               .values(password=new_hash))
+            db.session.commit()
+        token, expires_in = auth.issue(user.id)
+        return jsonify({"user": user.serialize(expand=()), "token": token, "token_type": "Bearer",
+                        "expires_in": expires_in}), 200
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
+@app.route("/logout", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+def logout():
+    claims = auth.authenticate()
+    try:
+        auth.revoke(db.session, claims)
+        db.session.commit()
+        return jsonify({"message": "Sesion cerrada"}), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+
 @app.route("/user/<int:user_id>", methods=["DELETE"]) # prueba 
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def delete_user(user_id):
     try:
         user = User.query.get(user_id)
@@ -162,71 +265,59 @@ def delete_user(user_id):
 
 # rutas para el modelo Character
 @app.route("/get_all_character", methods=["GET"])
+@read_replica
+@conditional("character")
+@response_cache.cached("character")
 def get_all_character():
     try:
-        characters = Character.query.all()
-        if not characters:
-            return jsonify({"message": "No hay Characters registrados"}), 200
-        return jsonify([character.serialize() for character in characters]), 200
+        if wants_stream(request.args):
+            return stream_response(Character, request.args, CHARACTER_FILTERS)
+        characters, next_cursor = paginate(Character, request.args, CHARACTER_FILTERS)
+        return page_response(characters, next_cursor, "No hay Characters registrados")
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error, en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
 @app.route("/get_one_character/<int:character_id>", methods=["GET"])
+@read_replica
+@conditional("character")
 def get_one_character(character_id):
     try:
-        character = Character.query.get(character_id)
-        if not character:
+        character = load_items(Character, [character_id])[0]
+        if character is None:
             return jsonify({"message": "Character no encontrado", "character_id": character_id})
-        return jsonify({"character": character.serialize()}), 200
+        return item_response("character", character)
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error, en la base de datos", "detail": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error, en el servidor", "detail": str(e)}), 500
+
+@app.route("/get_many_character", methods=["GET"])
+@read_replica
+@conditional("character")
+def get_many_character():
+    try:
+        ids = parse_ids(request.args)
+        return items_response(ids, load_items(Character, ids))
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error, en la base de datos", "detail": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error, en el servidor", "detail": str(e)}), 500
 
 @app.route("/add_character", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
 def add_character():
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "No hay datos Verifique"}), 400
+    clean_data = validate_payload(Character, data)
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"message": "No hay datos Verifique"}), 400
-        name = data.get("name")
-        age = data.get("age")
-        height = data.get("height")
-        weight = data.get("weight")
-        eye_color = data.get("eye_color")
-        hair_color = data.get("hair_color")
-        skin_color = data.get("skin_color")
-        gender = data.get("gender")
-        mass = data.get("mass")
-        homeworld = data.get("homeworld")
-        birth_year = data.get("birth_year")
-        description = data.get("description")
- 
-        fields = [
-            name, age, height, weight, eye_color, hair_color,
-            skin_color, gender, mass, homeworld, birth_year,
-            description
-        ]
-
-        if any(f is None or f == "" for f in fields):
-            return jsonify({"message": "Se necesitan todos los campos"})
-
-        new_user = Character(
-            name=name,
-            age=age,
-            height=height,
-            weight=weight,
-            eye_color=eye_color,
-            hair_color=hair_color,
-            skin_color=skin_color,
-            gender=gender,
-            mass=mass,
-            homeworld=homeworld,
-            birth_year=birth_year,
-            description=description
-        )
+        new_user = Character(**clean_data)
         db.session.add(new_user)
         db.session.commit()
         return jsonify({"New Character": new_user.serialize()}), 201
@@ -237,6 +328,7 @@ def add_character():
         return jsonify({"Error": "Error en el servidor", "detail": str(e)}), 500
 
 @app.route("/delete_character/<int:character_id>", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
 def delete_character(character_id):
     if not character_id:
         return jsonify({"error": "Error, no se recibio Character_id a eliminar"}), 400
@@ -253,22 +345,21 @@ def delete_character(character_id):
     except Exception as e:
         return jsonify({"message": "Error, en el servidor", "details": str(e)}),500
     
-@app.route("/put_character/<int:character_id", methods=["PUT"])
+@app.route("/put_character/<int:character_id>", methods=["PUT"])
+@rate_limit(WRITE_LIMIT)
 def put_character(character_id):
     if not character_id:
         return jsonify({"message": "Error no existe character_id para eliminar, verifique"}),400
     data = request.get_json()
     if not data:
         return jsonify({"message": "Error, no hay data a modificar, verifique"}),400
+    clean_data = validate_payload(Character, data, partial=True)
     try:
         character = Character.query.get(character_id)
         if not character:
             return jsonify({"message": f"Error, character_id {character_id} no existe, verifique"}), 404
-        updatable_fields = ["name", "age", "height", "weight", "eye_color", "hair_color", "skin_color", "gender",
-                            "mass", "homeworld", "birth_year", "description"]
-        for field in updatable_fields:
-            if field in data:
-                setattr(character, field, data[field])
+        for field, value in clean_data.items():
+            setattr(character, field, value)
         db.session.commit()
         return jsonify({"updated_character": character.serialize()}),200    
     except SQLAlchemyError as e:
@@ -280,71 +371,59 @@ def put_character(character_id):
 
 # rutas para modelo Planet
 @app.route("/get_all_planet", methods=["GET"])
+@read_replica
+@conditional("planet")
+@response_cache.cached("planet")
 def get_all_planet():
     try:
-        planets = Planet.query.all()
-        if not planets:
-            return jsonify({"message": "No hay planet registrador"}), 200
-        return jsonify([planet.serialize() for planet in planets]), 200
+        if wants_stream(request.args):
+            return stream_response(Planet, request.args, PLANET_FILTERS)
+        planets, next_cursor = paginate(Planet, request.args, PLANET_FILTERS)
+        return page_response(planets, next_cursor, "No hay planet registrador")
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error, en la base de dastos"}), 500
     except Exception as e:
         return jsonify({"Error": "Error, en el servidor"}), 500
 
 @app.route("/get_one_planet/<int:planet_id>", methods=["GET"])
+@read_replica
+@conditional("planet")
 def get_one_planet(planet_id):
     try:
-        planet = Planet.query.get(planet_id)
-        if not planet:
+        planet = load_items(Planet, [planet_id])[0]
+        if planet is None:
             return jsonify({"message": "Planet no existe", "Planet_id": planet_id})
-        return jsonify({"planet": planet.serialize()}), 200
+        return item_response("planet", planet)
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+@app.route("/get_many_planet", methods=["GET"])
+@read_replica
+@conditional("planet")
+def get_many_planet():
+    try:
+        ids = parse_ids(request.args)
+        return items_response(ids, load_items(Planet, ids))
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
 @app.route("/add_planet", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
 def add_planet():
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "Error, no hay dstos"}), 400
+    clean_data = validate_payload(Planet, data)
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"message": "Error, no hay dstos"}), 400
-        name = data.get("name")
-        climate = data.get("climate")
-        surface_water = data.get("surface_water")
-        diameter = data.get("diameter")
-        rotation_period = data.get("rotation_period")
-        terrain = data.get("terrain")
-        gravity = data.get("gravity")
-        orbital_period = data.get("orbital_period")
-        population = data.get("population")
-        description = data.get("description")
-        if (
-            not name or
-            not climate or
-            not surface_water or
-            not diameter or
-            not rotation_period or
-            not terrain or
-            not gravity or
-            not orbital_period or 
-            not population or
-            not description
-
-        ): 
-            return jsonify({"message": "se necesitan todo los campos "})
-        new_planet = Planet(
-            name = name,
-            climate = climate,
-            surface_water = surface_water,
-            diameter = diameter,
-            rotation_period = rotation_period,
-            terrain = terrain,
-            gravity = gravity,
-            orbital_period = orbital_period,
-            population = population,
-            description = description
-        )
+        new_planet = Planet(**clean_data)
         db.session.add(new_planet)
         db.session.commit()
         return jsonify({"new_planet": new_planet.serialize()}),201
@@ -355,47 +434,19 @@ def add_planet():
         return jsonify({"Error": "Error en el servidor", "details": str(e)}),500
 
 @app.route("/planet/<int:planet_id>", methods=["PUT"])
-def put_planet(planet_id): # no es la mejor manera de hacerlo en los demas modelos esta corregido
+@rate_limit(WRITE_LIMIT)
+def put_planet(planet_id):
+    # reemplazo completo: exige los mismos campos que /add_planet
     data = request.get_json()
     if not data:
         return jsonify({"message": "Error, no hay datos verifique"}),400
-    new_name = data.get("name")
-    new_climate = data.get("climate")
-    new_surface_water = data.get("surface_water")
-    new_diameter = data.get("diameter")
-    new_rotation_period = data.get("rotation_period")
-    new_terrain = data.get("terrain")
-    new_gravity = data.get("gravity")
-    new_orbital_period = data.get("orbital_period")
-    new_population = data.get("population")
-    new_description = data.get("description")
-    if(
-        not new_name or
-        not new_climate or
-        not new_surface_water or
-        not new_diameter or
-        not new_rotation_period or
-        not new_terrain or 
-        not new_gravity or
-        not new_orbital_period or 
-        not new_population or 
-        not new_description 
-    ):
-        return jsonify({"message": "Se necesitan todos los datos"})
+    clean_data = validate_payload(Planet, data)
     try:
         planet = Planet.query.get(planet_id)
         if not planet:
            return jsonify({"message": "Planet no encontrado, verifique"}), 404 
-        planet.name = new_name  
-        planet.climate = new_climate 
-        planet.surface_water = new_surface_water
-        planet.diameter = new_diameter
-        planet.rotation_period = new_rotation_period 
-        planet.terrain = new_terrain 
-        planet.gravity = new_gravity 
-        planet.orbital_period = new_orbital_period 
-        planet.population = new_population 
-        planet.description = new_description
+        for field, value in clean_data.items():
+            setattr(planet, field, value)
         db.session.commit()
         return jsonify({"message": "Planet, modificado correctamente", "planet": planet.serialize()}),200
     except SQLAlchemyError as e:
@@ -404,7 +455,8 @@ def put_planet(planet_id): # no es la mejor manera de hacerlo en los demas model
     except Exception as e:
         return jsonify({"message": "Error, en el servidor", "details": str(e)}), 500
 
-@app.route("/planet/<int:planet_id", mothods=["DELETE"])
+@app.route("/planet/<int:planet_id>", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
 def delete_planet(planet_id):
     try:
         planet = Planet.query.get(planet_id)
@@ -422,6 +474,8 @@ def delete_planet(planet_id):
 
 # ruras para modelo user_planet
 @app.route("/user_planet", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def add_user_planet():
     try:
         data = request.get_json()
@@ -449,6 +503,8 @@ def add_user_planet():
             planet_id=planet_id
         )
         db.session.execute(new_planet_fav)
+        count_favorite("planet", planet_id, 1)
+        touch("favorites", f"favorites:{user_id}")
         db.session.commit()
         return jsonify({"New_planet_favorite": "Favorito creado"}), 201
     except SQLAlchemyError as e:
@@ -458,6 +514,8 @@ def add_user_planet():
         return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
 @app.route("/delete_user_planet", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def delete_user_planet():
     data = request.get_json()
     if not data:
@@ -475,17 +533,22 @@ def delete_user_planet():
             user_planet.c.planet_id == data["planet_id"]
         )
         result = db.session.execute(stmt)
+        count_favorite("planet", data["planet_id"], -result.rowcount)
+        if result.rowcount:
+            touch("favorites", f"favorites:{data['user_id']}")
         db.session.commit()
         if result.rowcount == 0:
             return jsonify({"message": "No existe ese favotiro"}), 404
         return jsonify({"message": "Favorito eliminado correctamente"}),200
     except SQLAlchemyError as e:
-        db.session.rollbak()
+        db.session.rollback()
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}),500
 
 @app.route("/user_planet", methods=["PUT"]) # ruta de prueba 
+@rate_limit(WRITE_LIMIT)
+@login_required(owner=("user_id", "new_user_id"))
 def update_user_planet():
     try:
         data = request.get_json()
@@ -518,6 +581,10 @@ def update_user_planet():
         )
 
         result = db.session.execute(stmt)
+        if result.rowcount and new_planet_id and new_planet_id != data["planet_id"]:
+            count_favorite("planet", data["planet_id"], -1)
+            count_favorite("planet", new_planet_id, 1)
+        touch("favorites", f"favorites:{data['user_id']}", f"favorites:{new_user_id or data['user_id']}")
         db.session.commit()
 
         if result.rowcount == 0:
@@ -535,6 +602,8 @@ def update_user_planet():
 
 # rutas para modelo user_character
 @app.route("/add_user_character", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def add_user_character():
     data = request.get_json()
     if not data:
@@ -554,6 +623,8 @@ def add_user_character():
             character_id = character_id
         )
         db.session.execute(new_char_fav)
+        count_favorite("character", character_id, 1)
+        touch("favorites", f"favorites:{user_id}")
         db.session.commit()
         return jsonify({"New_character_fav": "Favorito creado", "test": {
             "user_id": user_id,
@@ -566,6 +637,8 @@ def add_user_character():
         return jsonify({"Error": "Error en el servidor", "Details": str(e)}),500
 
 @app.route("/delete_user_character", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def delete_user_character():
     data = request.get_json()
     if not data:
@@ -583,12 +656,15 @@ def delete_user_character():
             user_character.c.character_id == data["character_id"]
         )
         result = db.session.execute(stmt)
+        count_favorite("character", data["character_id"], -result.rowcount)
+        if result.rowcount:
+            touch("favorites", f"favorites:{data['user_id']}")
         db.session.commit()
         if result.rowcount == 0:
             return jsonify({"message": "No existe ese favotiro"}), 404
         return jsonify({"message": "Favorito eliminado correctamente"}),200
     except SQLAlchemyError as e:
-        db.session.rollbak()
+        db.session.rollback()
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}),500
@@ -596,6 +672,8 @@ def delete_user_character():
 
 # rutas para modelo de user_vehicle
 @app.route("/add_user_vehicle", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def add_user_vehicle():
     data = request.get_json()
     if not data:
@@ -612,6 +690,8 @@ def add_user_vehicle():
             vehicle_id = vehicle_id
         )
         db.session.execute(new_vehicle_fav)
+        count_favorite("vehicle", vehicle_id, 1)
+        touch("favorites", f"favorites:{user_id}")
         db.session.commit()
         return jsonify({"new_vehicle_fav": "Favorito creado "}),201
     except SQLAlchemyError as e:
@@ -621,6 +701,8 @@ def add_user_vehicle():
         return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
 @app.route("/delete_user_vehicle", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
+@login_required(owner="user_id")
 def delete_user_vehicle():
     data = request.get_json()
     if not data:
@@ -638,12 +720,15 @@ def delete_user_vehicle():
             user_vehicle.c.vehicle_id == data["vehicle_id"]
         )
         result = db.session.execute(stmt)
+        count_favorite("vehicle", data["vehicle_id"], -result.rowcount)
+        if result.rowcount:
+            touch("favorites", f"favorites:{data['user_id']}")
         db.session.commit()
         if result.rowcount == 0:
             return jsonify({"message": "No existe ese favotiro"}), 404
         return jsonify({"message": "Favorito eliminado correctamente"}),200
     except SQLAlchemyError as e:
-        db.session.rollbak()
+        db.session.rollback()
         return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "details": str(e)}),500
@@ -652,79 +737,73 @@ def delete_user_vehicle():
 
 # rutas para modelo vehicles
 @app.route("/get_all_vehicle", methods=["GET"])
+@read_replica
+@conditional("vehicle")
+@response_cache.cached("vehicle")
 def get_all_vehicles():
     try:
-        vehicles = Vehicle.query.all()
-        if not vehicles:
-            return jsonify({"message": "No hay Vehicles registrador"}), 200
-        return jsonify([vehicle.serialize() for vehicle in vehicles]), 200
+        if wants_stream(request.args):
+            return stream_response(Vehicle, request.args, VEHICLE_FILTERS)
+        vehicles, next_cursor = paginate(Vehicle, request.args, VEHICLE_FILTERS)
+        return page_response(vehicles, next_cursor, "No hay Vehicles registrador")
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error en la base de datos", "Details": str(e)}), 500
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "Details": str(e)}),500
 
 @app.route("/get_one_vehicle/<int:vehicle_id>", methods=["GET"])
+@read_replica
+@conditional("vehicle")
 def get_one_vehicle(vehicle_id):
     try:
-        vehicle = Vehicle.query.get(vehicle_id)
-        if not vehicle:
+        vehicle = load_items(Vehicle, [vehicle_id])[0]
+        if vehicle is None:
             return jsonify({"Error": f"No existe el vehicle con id {vehicle_id}"}), 404
-        return jsonify({"vehicle": vehicle.serialize()}),200
+        return item_response("vehicle", vehicle)
     except SQLAlchemyError as e:
         return jsonify({"Error": "Error en la base de dstos", "Details": str(e)})
     except Exception as e:
         return jsonify({"Error": "Error en el servidor", "Details": str(2)})
+
+@app.route("/get_many_vehicle", methods=["GET"])
+@read_replica
+@conditional("vehicle")
+def get_many_vehicle():
+    try:
+        ids = parse_ids(request.args)
+        return items_response(ids, load_items(Vehicle, ids))
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de dstos", "Details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "Details": str(e)}), 500
  
 @app.route("/add_vehicle", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
 def add_vehicle():
     data = request.get_json()
     if not data:
         return jsonify({"Error": "No hay datos verifique"}),400
-    required_fields = ["name", "consumables", "cargo_capacity", "passenger",
-                       "max_atmosphering_speed", "crew", "length", "model", "cost_in_credits",
-                       "manufactured", "vehicle_class", "description"]
-    missing = validate_required(data, required_fields)
-    if missing:
-        return jsonify({"message": "Faltan campos requeridos",
-            "missing_fields": missing
-        }), 400
+    clean_data = validate_payload(Vehicle, data)
     try:
-        name = data.get("name")
-        consumables = data.get("consumables")
-        cargo_capacity = data.get("cargo_capacity")
-        passenger = data.get("passenger")
-        max_atmosphering_speed = data.get("max_atmosphering_speed")
-        crew = data.get("crew")
-        length = data.get("length")
-        model = data.get("model")
-        cost_in_credits = data.get("cost_in_credits")
-        manufactured = data.get("manufactured")
-        vehicle_class = data.get("vehicle_class")
-        description = data.get("description") 
-        new_vehicle = Vehicle(
-            name = name,
-            consumables = consumables,
-            cargo_capacity = cargo_capacity,
-            passenger = passenger,
-            max_atmosphering_speed = max_atmosphering_speed,
-            crew = crew,
-            length = length,
-            model = model,
-            cost_in_credits = cost_in_credits,
-            manufactured = manufactured,
-            vehicle_class = vehicle_class,
-            description = description
-        )
+        check_unique(Vehicle, clean_data)
+        new_vehicle = Vehicle(**clean_data)
         db.session.add(new_vehicle)
         db.session.commit()
         return jsonify({"new_vehicle": new_vehicle.serialize()}),201
+    except APIException:
+        raise
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"Error": "error en la base de datos ", "details": str(e)}),500
     except Exception as e:
         return jsonify({"Error": "error en el servidor", "details": str(e)}),500
 
-@app.route("/vehicle/<int:vehicle_id", methods=["DELETE"])
+@app.route("/vehicle/<int:vehicle_id>", methods=["DELETE"])
+@rate_limit(WRITE_LIMIT)
 def delete_vehicle(vehicle_id):
     try:
         vehicle = Vehicle.query.get(vehicle_id)
@@ -746,24 +825,26 @@ def delete_vehicle(vehicle_id):
         return jsonify({"message": "Error, en el servidor", "details": str(e)})
 
 @app.route("/vehicle/<int:vehicle_id>", methods=["PUT"])
+@rate_limit(WRITE_LIMIT)
 def put_vehicle(vehicle_id):
    data = request.get_json()
    if not data:
        return jsonify({"message": "No hay datos que procesar, verifique"}), 400
+   clean_data = validate_payload(Vehicle, data, partial=True)
    try:
        vehicle = Vehicle.query.get(vehicle_id)  
        if not vehicle:
             return jsonify({"error": "Vehicle no encontrado, verifique "}), 404
-       for field in ["name", "consumables", "cargo_capacity", "passenger",
-                      "max_atmosphering_speed", "crew", "length", "model", "cost_in_credits",
-                      "manufactured", "vehicle_class", "description"]:
-           if field in data:
-               setattr(vehicle, field, data[field])  # actualizacion dinamica de datos 
-           db.session.commit()
-           return jsonify({
-               "message": "Vehicle actualizado correctamente",
-               "update": vehicle.serialize()
-           }) 
+       check_unique(Vehicle, clean_data, vehicle_id)
+       for field, value in clean_data.items():
+           setattr(vehicle, field, value)  # actualizacion dinamica de datos 
+       db.session.commit()
+       return jsonify({
+           "message": "Vehicle actualizado correctamente",
+           "update": vehicle.serialize()
+       }) 
+   except APIException:
+       raise
    except SQLAlchemyError as e:
        db.session.rollback()
        return jsonify({"message": "Error, en la base de datos"}),500
@@ -777,19 +858,158 @@ def put_vehicle(vehicle_id):
 
 
 @app.route("/users/favorites/<int:user_id>", methods=["GET"])
+@login_required(owner="user_id")
+@read_replica
+@conditional("user:{user_id}", "favorites:{user_id}", "planet", "character", "vehicle")
 def get_user_favoritos(user_id):
-    user = User.query.get(user_id)
-    if not user:
+    favorites = get_favorites(user_id)
+    if favorites is None:
         return jsonify({"message": "no se encontrol el usuario con el id- " + str(user_id)})
-    fav_planets = user.planets
-    fav_planets_serialized = [planet.serialize() for planet in fav_planets]
-    fav_character = user.characters
-    fav_character_serialized = [character.serialize()
-                                for character in fav_character]
-    fav_vehicles = user.vehicles
-    fav_vehicles_serialized = [vehicle.serialize() for vehicle in fav_vehicles]
-    return jsonify({"fav_planets": fav_planets_serialized, "fav_character": fav_character_serialized,
-                    "fav_vehicles": fav_vehicles_serialized})
+    return jsonify(favorites)
+
+
+@app.route("/users/favorites/bulk", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+@login_required()
+def bulk_user_favorites():
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "No hay datos verifique"}), 400
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "Se necesita una lista 'operations'"}), 400
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return jsonify({"message": f"Maximo {MAX_BULK_OPERATIONS} operaciones por request"}), 400
+    try:
+        results = apply_bulk(operations, owner=g.user_id)
+        db.session.commit()
+        summary = {}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        return jsonify({"results": results, "summary": summary}), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+
+@app.route("/search", methods=["GET"])
+@read_replica
+@conditional("character", "planet", "vehicle")
+def search_catalog():
+    try:
+        results, next_cursor = search(request.args)
+        return page_response(results, next_cursor, "No se encontraron resultados")
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+
+@app.route("/stats/favorites", methods=["GET"])
+@read_replica
+@conditional("favorites", "character", "planet", "vehicle")
+def favorite_stats():
+    try:
+        return jsonify(favorite_summary(request.args)), 200
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+
+@app.route("/stats/favorites/<string:kind>", methods=["GET"])
+@read_replica
+@conditional("favorites", "{kind}")
+def favorite_ranking(kind):
+    try:
+        items, next_cursor = ranking(kind, request.args)
+        return page_response(items, next_cursor, "No hay favoritos registrados")
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+
+@app.route("/stats/favorites/<string:kind>/<int:ref_id>", methods=["GET"])
+@read_replica
+@conditional("favorites", "{kind}")
+def favorite_count_detail(kind, ref_id):
+    try:
+        count = favorite_count_of(kind, ref_id)
+        if count is None:
+            return jsonify({"message": f"No existe {kind} con id {ref_id}"}), 404
+        return jsonify(count), 200
+    except APIException:
+        raise
+    except SQLAlchemyError as e:
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
+
+
+if app.config['OPS_ENDPOINTS']:
+    @app.route("/cache/stats", methods=["GET"])
+    def cache_stats():
+        return jsonify(response_cache.stats()), 200
+
+    @app.route("/db/pool", methods=["GET"])
+    def db_pool_stats():
+        stats = pool_stats(db.engine)
+        stats["replicas"] = [{**replica, **pool_stats(db.engines[replica["name"]])}
+                             for replica in replica_router.stats()]
+        return jsonify(stats), 200
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    ok, error = check_database(db.engine)
+    if not ok:
+        # el detalle puede traer host y usuario del DSN: solo al log
+        app.logger.error("health: la base no responde: %s", error)
+        return jsonify({"status": "error", "database": "unavailable"}), 503
+    return jsonify({"status": "ok"}), 200
+
+
+if app.config['OPS_ENDPOINTS']:
+    @app.route("/debug/queries", methods=["GET"])
+    def debug_queries():
+        return jsonify(query_report.summary()), 200
+
+
+@app.route("/import/<string:model_name>", methods=["POST"])
+@rate_limit(WRITE_LIMIT)
+@login_required()
+def import_catalog(model_name):
+    model = IMPORT_MODELS.get(model_name)
+    if not model:
+        return jsonify({"message": "Modelo no valido", "models": sorted(IMPORT_MODELS)}), 404
+    fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    # un body mas grande corta con 413 al leerlo
+    request.max_content_length = IMPORT_MAX_BYTES
+    try:
+        # se lee el body como stream, nunca completo en memoria
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        report = import_rows(model, read_records(stream, fmt), max_rows=IMPORT_MAX_ROWS)
+        if report.get("truncated"):
+            report["message"] = f"Maximo {IMPORT_MAX_ROWS} filas por request: el resto no se importo"
+            return jsonify(report), 413
+        return jsonify(report), 200
+    except RequestEntityTooLarge:
+        db.session.rollback()
+        return jsonify({"message": f"El body supera {IMPORT_MAX_BYTES} bytes"}), 413
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"Error": "Error en la base de datos", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"Error": "Error en el servidor", "details": str(e)}), 500
 
 
 # @app.route("/",methods=["GET"])
@@ -0,0 +1,191 @@
+"""
+Autenticacion con tokens firmados: POST /login entrega un JWT HS256 y las
+rutas marcadas con @login_required lo verifican sin consultar la base.
+
+    AUTH_SECRET               clave HMAC, la misma en todos los workers
+                              (sin ella se usa FLASK_APP_KEY). La app no
+                              arranca sin una de las dos o con los valores
+                              de ejemplo; con FLASK_DEBUG=1 usa una clave al
+                              azar por proceso (los tokens no sobreviven un
+                              reinicio)
+    AUTH_TOKEN_TTL            segundos de validez de cada token (3600)
+    AUTH_CACHE_SIZE           tokens ya verificados que recuerda cada worker (4096)
+    AUTH_REVOCATION_INTERVAL  segundos entre lecturas de revoked_token (5)
+
+Camino de cada request: la firma se chequea una vez por token y worker (un
+lru_cache de los claims); despues solo se comparan exp y el jti contra un
+frozenset de tokens revocados que un thread relee cada
+AUTH_REVOCATION_INTERVAL segundos. Un /logout vale enseguida en su worker y
+en los demas a mas tardar en ese intervalo.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache, wraps
+from flask import g, request
+from sqlalchemy import delete, insert, select
+from models import revoked_token
+from utils import APIException
+
+TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", 3600))
+CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 4096))
+REVOCATION_INTERVAL = float(os.getenv("AUTH_REVOCATION_INTERVAL", 5))
+
+Claims = namedtuple("Claims", ["user_id", "expires_at", "jti"])
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# el header es siempre el mismo; un token con otro (alg "none", RS256...) no se acepta
+HEADER = _b64(b'{"alg":"HS256","typ":"JWT"}')
+
+# claves publicas (default de admin.py y .env.example): con ellas cualquiera firma tokens
+PUBLIC_SECRETS = ("sample key", "any key works")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenAuth:
+    def __init__(self, cache_size=CACHE_SIZE, interval=REVOCATION_INTERVAL):
+        self.key = None
+        self.engine = None
+        self.interval = interval
+        self.revoked = frozenset()
+        self.lock = threading.Lock()
+        self.pid = None
+        self.wakeup = threading.Event()
+        # los errores no quedan en la cache: un token mal firmado se chequea cada vez
+        self.claims = lru_cache(maxsize=cache_size)(self._decode)
+
+    def init_app(self, app, db):
+        secret = os.getenv("AUTH_SECRET") or os.getenv("FLASK_APP_KEY")
+        if not secret or secret in PUBLIC_SECRETS:
+            if not app.debug:
+                raise RuntimeError("Falta AUTH_SECRET (o FLASK_APP_KEY): sin una clave propia cualquiera "
+                                   "puede firmar tokens. Generar una con: python -c \"import secrets; "
+                                   "print(secrets.token_urlsafe(32))\"")
+            app.logger.warning("AUTH_SECRET no configurada: clave al azar, los tokens vencen al reiniciar")
+            secret = secrets.token_urlsafe(32)
+        self.key = secret.encode()
+        with app.app_context():
+            self.engine = db.engine
+
+    def _sign(self, signing_input):
+        return _b64(hmac.new(self.key, signing_input.encode(), hashlib.sha256).digest())
+
+    def issue(self, user_id, ttl=TOKEN_TTL):
+        """(token, segundos de validez)."""
+        now = int(time.time())
+        # sub es un string segun el RFC 7519
+        payload = _b64(json.dumps({"sub": str(user_id), "iat": now, "exp": now + ttl, "jti": secrets.token_urlsafe(12)},
+                                  separators=(",", ":")).encode())
+        signing_input = f"{HEADER}.{payload}"
+        return f"{signing_input}.{self._sign(signing_input)}", ttl
+
+    def _decode(self, token):
+        header, _, rest = token.partition(".")
+        payload, _, signature = rest.partition(".")
+        if header != HEADER or not signature:
+            raise InvalidToken
+        if not hmac.compare_digest(signature, self._sign(f"{header}.{payload}")):
+            raise InvalidToken
+        try:
+            data = json.loads(_unb64(payload))
+            return Claims(int(data["sub"]), int(data["exp"]), str(data["jti"]))
+        except (ValueError, KeyError, TypeError):
+            raise InvalidToken
+
+    def verify(self, token, now=None):
+        """Claims del token, o APIException 401."""
+        try:
+            claims = self.claims(token)
+        except InvalidToken:
+            raise APIException("Token invalido", status_code=401)
+        if claims.expires_at <= (now or time.time()):
+            raise APIException("Token vencido", status_code=401)
+        self._ensure_refresher()
+        if claims.jti in self.revoked:
+            raise APIException("Token revocado", status_code=401)
+        return claims
+
+    def authenticate(self):
+        """Claims del header Authorization: Bearer <token> del request."""
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise APIException("Se necesita el header Authorization: Bearer <token>", status_code=401)
+        return self.verify(token.strip())
+
+    def revoke(self, session, claims):
+        """Agrega el token a revoked_token (el caller hace commit) y borra los que ya vencieron."""
+        session.execute(delete(revoked_token).where(revoked_token.c.expires_at <= int(time.time())))
+        session.execute(insert(revoked_token).values(jti=claims.jti, expires_at=claims.expires_at))
+        with self.lock:
+            self.revoked = self.revoked | {claims.jti}
+
+    def refresh(self):
+        with self.engine.connect() as connection:
+            jtis = frozenset(connection.execute(
+                select(revoked_token.c.jti).where(revoked_token.c.expires_at > int(time.time()))).scalars())
+        with self.lock:
+            self.revoked = jtis
+
+    def _ensure_refresher(self):
+        # los workers de gunicorn hacen fork despues de importar la app: un thread por proceso
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        self.refresh()
+        threading.Thread(target=self._refresh_loop, args=(self.pid,), name="auth-revocations",
+                         daemon=True).start()
+
+    def _refresh_loop(self, pid):
+        while self.pid == pid and not self.wakeup.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # base caida: se sigue con la lista anterior y se reintenta en el proximo ciclo
+                pass
+
+
+auth = TokenAuth()
+
+
+def login_required(owner=()):
+    """
+    Exige un token valido y deja el usuario en g.user_id. owner: campos de
+    la URL o del body JSON (user_id, new_user_id...) que deben ser ese mismo
+    usuario; si no vienen, la ruta responde su propio 400.
+    """
+    fields = (owner,) if isinstance(owner, str) else tuple(owner)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            g.user_id = auth.authenticate().user_id
+            if fields:
+                body = request.get_json(silent=True) if request.is_json else None
+                for field in fields:
+                    value = kwargs[field] if field in kwargs else body.get(field) if isinstance(body, dict) else None
+                    if value is not None and value != g.user_id:
+                        raise APIException("Solo puede acceder a sus propios datos", status_code=403)
+            return view(**kwargs)
+        return wrapper
+    return decorator
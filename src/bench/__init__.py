@@ -0,0 +1,29 @@
+"""
+Benchmarks de la API: `flask bench <comando>`.
+Trabajan sobre una base SQLite propia, nunca sobre DATABASE_URL.
+
+Cada comando esta en su modulo (bench/routes.py, bench/indexes.py, ...) y
+se importa recien cuando se ejecuta o se pide su --help: la app registra el
+grupo al arrancar sin cargar el codigo de los benchmarks.
+"""
+import importlib
+from flask.cli import AppGroup
+
+# cada uno es el modulo bench.<comando> con la funcion <comando>_command
+COMMANDS = ("auth", "compare", "compression", "concurrency", "indexes", "multiget", "passwords", "ratelimit",
+            "replicas", "routes", "serialize", "validate")
+
+
+class LazyGroup(AppGroup):
+    """AppGroup que importa el modulo de un comando cuando click lo pide."""
+
+    def list_commands(self, ctx):
+        return list(COMMANDS)
+
+    def get_command(self, ctx, name):
+        if name not in COMMANDS:
+            return None
+        return getattr(importlib.import_module(f"{__name__}.{name}"), f"{name}_command")
+
+
+bench_cli = LazyGroup("bench", help="Benchmarks de la API.")
@@ -0,0 +1,75 @@
+"""`flask bench auth`: costo por request de @login_required."""
+import time
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from models import db, User, revoked_token
+from auth import auth
+from bench.common import DEFAULT_BENCH_DATABASE, reexec_with_database, seed_models
+
+
+@click.command("auth")
+@click.option("--database", default=DEFAULT_BENCH_DATABASE, show_default=True,
+              help="Base que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--users", default=1000, show_default=True, help="Usuarios, un token cada uno.")
+@click.option("--revoked", default=10000, show_default=True, help="Tokens revocados en revoked_token.")
+@click.option("--calls", default=50000, show_default=True)
+@with_appcontext
+def auth_command(database, users, revoked, calls):
+    """
+    Microsegundos por request autenticado: firma HMAC sin cache, token ya
+    verificado (lru_cache + frozenset de revocados) y, como referencia,
+    buscar el usuario en la base en cada request.
+    """
+    reexec_with_database(database)
+    db.drop_all()
+    db.create_all()
+    seed_models(db.session, {User: users})
+    now = int(time.time())
+    for start in range(0, revoked, 1000):
+        db.session.execute(insert(revoked_token), [{"jti": f"revoked-{n}", "expires_at": now + 3600}
+                                                   for n in range(start, min(revoked, start + 1000))])
+    db.session.commit()
+    db.session.remove()
+    tokens = [auth.issue(user_id)[0] for user_id in range(1, users + 1)]
+    started = time.perf_counter()
+    auth.refresh()
+    refresh_ms = (time.perf_counter() - started) * 1000
+    headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+
+    def per_call(function, count):
+        started = time.perf_counter()
+        for i in range(count):
+            function(i)
+        return (time.perf_counter() - started) / count * 1e6
+
+    def uncached(i):
+        auth._decode(tokens[i % users])
+
+    def cached(i):
+        auth.verify(tokens[i % users])
+
+    for token in tokens:
+        auth.verify(token)
+    context = current_app.test_request_context(headers=headers[0])
+    context.push()
+    try:
+        def request_path(i):
+            # lo que hace login_required: leer el header y verificar
+            request.headers = headers[i % users]
+            auth.authenticate()
+
+        def lookup(i):
+            db.session.execute(select(User.id, User.is_active).where(User.id == i % users + 1)).first()
+
+        rows = (("firma HMAC + json, sin cache", per_call(uncached, calls)),
+                ("token verificado (cache)", per_call(cached, calls)),
+                ("header + cache (@login_required)", per_call(request_path, calls)),
+                ("referencia: SELECT del usuario", per_call(lookup, min(calls, 5000))))
+    finally:
+        context.pop()
+    click.echo(f"{users} tokens, {len(auth.revoked)} revocados (lectura {refresh_ms:.1f} ms), "
+               f"cache {auth.claims.cache_info().currsize}/{auth.claims.cache_info().maxsize}")
+    for label, micros in rows:
+        click.echo(f"  {label:<36} {micros:>8.2f} us")
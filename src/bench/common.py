@@ -0,0 +1,102 @@
+"""Siembra, mediciones y helpers que comparten los comandos de `flask bench`."""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import Boolean, DateTime, Float, Integer, insert
+from models import Character, Planet, Vehicle, user_planet, user_character, user_vehicle
+from numeric import fill_shadows, shadow_columns
+from replicas import replica_urls
+
+CATALOG_MODELS = (Character, Planet, Vehicle)
+DEFAULT_BENCH_DATABASE = "sqlite:////tmp/bench.db"
+FAVORITE_TABLES = ((user_planet, "planet_id", Planet), (user_character, "character_id", Character),
+                   (user_vehicle, "vehicle_id", Vehicle))
+
+
+def fake_row(model, i):
+    """Fila valida para cualquier modelo segun el tipo y largo de sus columnas."""
+    row = {}
+    for column in model.__table__.columns:
+        if column.primary_key or "shadow_of" in column.info:
+            continue
+        if isinstance(column.type, Boolean):
+            row[column.name] = True
+        elif isinstance(column.type, Integer):
+            row[column.name] = i
+        elif isinstance(column.type, Float):
+            row[column.name] = i * 1.5
+        elif isinstance(column.type, DateTime):
+            row[column.name] = datetime.now()
+        else:
+            value = f"{column.name[:8]}-{i}"
+            row[column.name] = value[:column.type.length] if column.type.length else value
+    for source in shadow_columns(model):
+        # las medidas como en SWAPI: numeros con separador de miles o "unknown"
+        row[source] = f"{i * 37 % 100003:,}" if i % 10 else "unknown"
+    return fill_shadows(model, row)
+
+
+def seed_models(session, counts):
+    """counts: {Model: cantidad}. Inserta con executemany en lotes."""
+    for model, count in counts.items():
+        for start in range(0, count, 1000):
+            rows = [fake_row(model, i) for i in range(start, min(start + 1000, count))]
+            session.execute(insert(model.__table__), rows)
+    session.commit()
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def percentiles(samples):
+    """p50/p95/p99 en milisegundos."""
+    if len(samples) < 2:
+        value = round(samples[0] * 1000, 3) if samples else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_ms": round(cuts[49] * 1000, 3), "p95_ms": round(cuts[94] * 1000, 3),
+            "p99_ms": round(cuts[98] * 1000, 3)}
+
+
+def summarize(samples, statuses, elapsed, queries=None):
+    summary = {"requests": len(samples), **percentiles(samples),
+               "requests_per_second": round(len(samples) / elapsed, 1) if elapsed else None,
+               "statuses": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+               "errors": sum(1 for code in statuses if code >= 500)}
+    if queries is not None:
+        summary["queries_per_request"] = round(sum(queries) / len(queries), 2) if queries else 0
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def reexec_with_database(database, replicas=(), **env):
+    """
+    El benchmark borra y siembra su base: si la app no esta apuntando a
+    `database` (y a esas replicas) se vuelve a ejecutar el mismo comando con
+    DATABASE_URL=database y DATABASE_REPLICA_URLS=replicas.
+    """
+    current = current_app.config["SQLALCHEMY_DATABASE_URI"]
+    if current == database.replace("postgres://", "postgresql://") and replica_urls() == list(replicas):
+        return
+    args = sys.argv[sys.argv.index("bench"):]
+    command = [sys.executable, "-m", "flask", "--app", os.path.join(current_app.root_path, "app.py"), *args]
+    sys.exit(subprocess.call(command, env=dict(os.environ, DATABASE_URL=database,
+                                               DATABASE_REPLICA_URLS=",".join(replicas), **env)))
@@ -0,0 +1,29 @@
+"""`flask bench compare`: dos resultados de `flask bench routes` ruta por ruta."""
+import json
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("compare")
+@click.argument("before", type=click.Path(exists=True, dir_okay=False))
+@click.argument("after", type=click.Path(exists=True, dir_okay=False))
+@click.option("--threshold", default=0.10, show_default=True, help="Variacion de p95 que se marca.")
+@with_appcontext
+def compare_command(before, after, threshold):
+    """Compara dos resultados de `flask bench routes` ruta por ruta."""
+    with open(before) as handle:
+        old = json.load(handle)
+    with open(after) as handle:
+        new = json.load(handle)
+    click.echo(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for section in ("test_client", "gunicorn"):
+        if section not in old or section not in new:
+            continue
+        click.echo(f"{section}:")
+        for endpoint in sorted(set(old[section]) & set(new[section])):
+            a, b = old[section][endpoint]["p95_ms"], new[section][endpoint]["p95_ms"]
+            if not a or not b:
+                continue
+            change = (b - a) / a
+            flag = "REGRESION" if change > threshold else ("mejora" if change < -threshold else "")
+            click.echo(f"  {endpoint:<24} p95 {a:>9} -> {b:>9} ms  {change:+7.1%}  {flag}")
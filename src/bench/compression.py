@@ -0,0 +1,61 @@
+"""`flask bench compression`: ratio y CPU por encoding y nivel sobre los listados reales."""
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from pagination import DEFAULT_LIMIT, MAX_LIMIT
+import compression
+from bench.common import CATALOG_MODELS, DEFAULT_BENCH_DATABASE, reexec_with_database, seed_models
+
+COMPRESSION_LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+
+
+@click.command("compression")
+@click.option("--database", default=DEFAULT_BENCH_DATABASE, show_default=True,
+              help="Base que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--rows", default=1000, show_default=True, help="Filas por tabla del catalogo.")
+@click.option("--repeat", default=50, show_default=True)
+@with_appcontext
+def compression_command(database, rows, repeat):
+    """
+    Para los listados reales (una fila, una pagina, MAX_LIMIT y ?limit=all):
+    ratio, microsegundos y bytes ahorrados por ms de CPU de cada encoding
+    disponible en varios niveles. Despues, un hit de la cache de respuestas
+    sin comprimir contra la entrada ya comprimida.
+    """
+    reexec_with_database(database)
+    db.drop_all()
+    db.create_all()
+    seed_models(db.session, {model: rows for model in CATALOG_MODELS})
+    db.session.remove()
+    client = current_app.test_client()
+    bodies = []
+    for table in ("character", "planet"):
+        for query in ("limit=1", f"limit={DEFAULT_LIMIT}", f"limit={MAX_LIMIT}", "limit=all"):
+            body = client.get(f"/get_all_{table}?{query}").get_data()
+            bodies.append((f"{table}?{query}", body))
+    click.echo(f"umbral COMPRESSION_MIN_SIZE {compression.MIN_SIZE} bytes, encodings: {', '.join(compression.ENCODERS)}")
+    click.echo(f"{'respuesta':<22} {'bytes':>8} {'encoding':<9} {'ratio':>6} {'us':>9} {'MB/s':>7} {'ahorro/ms':>10}")
+    for label, body in bodies:
+        count = repeat if len(body) < 1 << 20 else max(1, repeat // 10)
+        for name, encoder in compression.ENCODERS.items():
+            for level in COMPRESSION_LEVELS[name]:
+                started = time.perf_counter()
+                for _ in range(count):
+                    encoded = encoder.compress(body, level)
+                seconds = (time.perf_counter() - started) / count
+                saved = (len(body) - len(encoded)) / (seconds * 1000)
+                click.echo(f"{label:<22} {len(body):>8} {f'{name}-{level}':<9} {len(body) / len(encoded):>5.1f}x "
+                           f"{seconds * 1e6:>9.1f} {len(body) / seconds / 1e6:>7.1f} {saved:>10.0f}")
+
+    # la misma pagina desde la cache: la entrada comprimida se calcula una vez y se reusa
+    path = f"/get_all_character?limit={MAX_LIMIT}"
+    for label, headers in (("sin comprimir", {}),
+                           *((f"{name} (cache)", {"Accept-Encoding": name}) for name in compression.AVAILABLE)):
+        client.get(path, headers=headers)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = client.get(path, headers=headers)
+        micros = (time.perf_counter() - started) / repeat * 1e6
+        click.echo(f"hit {label:<16} {micros:>8.1f} us por request, {len(response.get_data()):>7} bytes")
@@ -0,0 +1,59 @@
+"""`flask bench concurrency`: las rutas GET con cada clase de worker de gunicorn."""
+import json
+import platform
+from datetime import datetime, timezone
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from bench.common import DEFAULT_BENCH_DATABASE, git_commit, reexec_with_database
+from bench.scenario import Scenario, run_gunicorn
+
+
+@click.command("concurrency")
+@click.option("--database", default=DEFAULT_BENCH_DATABASE, show_default=True,
+              help="Base que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--mode", "modes", multiple=True, default=("sync", "gthread", "gevent"), show_default=True,
+              help="Clase de worker; se puede repetir.")
+@click.option("--clients", multiple=True, type=int, default=(100, 1000), show_default=True,
+              help="Clientes concurrentes; se puede repetir.")
+@click.option("--workers", default=2, show_default=True)
+@click.option("--threads", default=8, show_default=True, help="Threads por worker en modo gthread.")
+@click.option("--duration", default=10.0, show_default=True, help="Segundos de carga por corrida.")
+@click.option("--port", default=8765, show_default=True)
+@click.option("--output", default="bench-concurrency.json", show_default=True, type=click.Path(dir_okay=False))
+@with_appcontext
+def concurrency_command(database, modes, clients, workers, threads, duration, port, output):
+    """req/s y p99 de las rutas GET con cada clase de worker de gunicorn y cada nivel de clientes."""
+    reexec_with_database(database)
+    app = current_app._get_current_object()
+    scenario = Scenario({"users": 200, "characters": 1000, "planets": 1000, "vehicles": 1000,
+                         "favorites": 5}, 0)
+    click.echo(f"sembrando {database} ...")
+    db.drop_all()
+    db.create_all()
+    scenario.seed(db.session)
+    db.session.remove()
+
+    report = {"meta": {"commit": git_commit(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "database": db.engine.dialect.name,
+                       "workers": workers, "threads": threads, "duration": duration}}
+    for mode in modes:
+        if mode == "gevent":
+            try:
+                import gevent  # noqa: F401
+            except ImportError:
+                click.echo("gevent no esta instalado, se omite", err=True)
+                continue
+        for count in clients:
+            results = run_gunicorn(app, scenario, database, count, duration, workers, mode, port,
+                                   threads=threads if mode == "gthread" else 1)
+            report.setdefault(mode, {})[str(count)] = results["_total"]
+    click.echo(f"{'modo':<10} {'clientes':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for mode in modes:
+        for count, total in report.get(mode, {}).items():
+            click.echo(f"{mode:<10} {count:>8} {total['requests_per_second']:>9} {total['p50_ms']:>9} "
+                       f"{total['p99_ms']:>9} {total['errors']:>8}")
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+    click.echo(f"resultados en {output}")
@@ -0,0 +1,145 @@
+"""`flask bench indexes`: planes y latencia de las queries de lectura sin y con los indices."""
+import json
+import random
+import time
+from urllib.parse import urlencode
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from models import db, User, Character, Planet, Vehicle, favorite_count, user_planet
+from pagination import DEFAULT_LIMIT, base_query, build_query, keyset
+from stats import TOP_LIMIT, rebuild as rebuild_favorite_counts
+from bench.common import FAVORITE_TABLES, fake_row, git_commit, percentiles
+
+DEFAULT_INDEX_DATABASE = "sqlite:////tmp/bench-indexes.db"
+# valores distintos por columna de filtro, para que no sea siempre un solo registro
+FILTER_CARDINALITY = 50
+
+
+def seed_for_indexes(session, rows, favorites):
+    rng = random.Random(7)
+    counts = {Character: rows, Planet: rows, Vehicle: rows, User: max(rows // 10, 1)}
+    for model, count in counts.items():
+        skip = {"name", "email"}
+        for start in range(0, count, 1000):
+            batch = []
+            for i in range(start, min(start + 1000, count)):
+                row = fake_row(model, i)
+                for index in model.__table__.indexes:
+                    for column in index.columns:
+                        if (column.name not in skip and column.name in row and not column.primary_key
+                                and "shadow_of" not in column.info):
+                            row[column.name] = f"{column.name[:8]}-{i % FILTER_CARDINALITY}"
+                batch.append(row)
+            session.execute(insert(model.__table__), batch)
+    for table, fk, model in FAVORITE_TABLES:
+        pairs = {(user_id, rng.randint(1, rows))
+                 for user_id in range(1, counts[User] + 1) for _ in range(favorites)}
+        session.execute(insert(table), [{"user_id": u, fk: e} for u, e in pairs])
+    rebuild_favorite_counts(session)
+    session.commit()
+
+
+def index_queries(rows):
+    """(nombre, statement) de las lecturas que dependen de los indices nuevos."""
+    middle = rows // 2
+    queries = []
+    for model, filters in ((Character, {"name": f"name-{middle}", "gender": "gender-7", "homeworld": "homeworl-7*"}),
+                           (Planet, {"name": "name-12*", "climate": "climate-7", "terrain": "terrain-7"}),
+                           (Vehicle, {"vehicle_class": "vehicle_-7", "model": "model-7*"})):
+        for name, value in filters.items():
+            stmt, _ = build_query(model, {name: value}, filters)
+            queries.append((f"{model.__tablename__}?{name}={value}", stmt.limit(DEFAULT_LIMIT + 1)))
+    stmt, _ = build_query(User, {"last_name": "last_nam-7"}, ("last_name",))
+    queries.append(("user?last_name=last_nam-7", stmt.limit(DEFAULT_LIMIT + 1)))
+    for table, fk, model in FAVORITE_TABLES:
+        # quien tiene X de favorito; es tambien el WHERE del DELETE al borrar X
+        queries.append((f"{table.name} por {fk}", select(table.c.user_id).where(table.c[fk] == middle)))
+    queries.append(("user_planet por user_id (PK)", select(user_planet.c.planet_id).where(user_planet.c.user_id == 3)))
+    # rangos y orden sobre las columnas numericas espejo (primera pagina)
+    for model, args in ((Planet, {"min_population": "90000"}), (Planet, {"sort": "-population"}),
+                        (Planet, {"min_diameter": "1000", "max_diameter": "2000", "sort": "diameter"}),
+                        (Vehicle, {"sort": "cost_in_credits"})):
+        stmt, _, sort = base_query(model, args)
+        where, order = keyset(model, sort, None)
+        queries.append((f"{model.__tablename__}?{urlencode(args)}",
+                        stmt.where(*where).order_by(*order).limit(DEFAULT_LIMIT + 1)))
+    # top de favoritos: GROUP BY sobre la tabla de favoritos contra el contador de /stats
+    top = func.count().label("favorites")
+    queries.append(("top planets (GROUP BY user_planet)",
+                    select(user_planet.c.planet_id, top).group_by(user_planet.c.planet_id)
+                    .order_by(top.desc(), user_planet.c.planet_id.desc()).limit(TOP_LIMIT)))
+    queries.append(("top planets (favorite_count)",
+                    select(favorite_count.c.ref_id, favorite_count.c.favorites)
+                    .where(favorite_count.c.kind == "planet", favorite_count.c.favorites > 0)
+                    .order_by(favorite_count.c.favorites.desc(), favorite_count.c.ref_id.desc()).limit(TOP_LIMIT)))
+    return queries
+
+
+def explain(connection, stmt):
+    dialect = connection.dialect.name
+    sql = str(stmt.compile(connection, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.paramstyle in ("format", "pyformat"):
+        sql = sql.replace("%", "%%")
+    prefix = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN ANALYZE "}.get(dialect, "EXPLAIN ")
+    rows = connection.exec_driver_sql(prefix + sql).all()
+    if dialect == "sqlite":
+        return [row[-1] for row in rows]
+    return [" ".join(str(value) for value in row if value is not None) for row in rows]
+
+
+def measure_queries(engine, queries, repeat):
+    results = {}
+    with engine.connect() as connection:
+        if engine.dialect.name != "mysql":
+            connection.exec_driver_sql("ANALYZE")
+        for name, stmt in queries:
+            connection.execute(stmt).all()
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(stmt).all()
+                samples.append(time.perf_counter() - started)
+            results[name] = {**percentiles(samples), "plan": explain(connection, stmt)}
+    return results
+
+
+@click.command("indexes")
+@click.option("--database", default=DEFAULT_INDEX_DATABASE, show_default=True,
+              help="Base que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--rows", default=50000, show_default=True, help="Filas por tabla del catalogo.")
+@click.option("--favorites", default=5, show_default=True, help="Favoritos por usuario y tabla.")
+@click.option("--repeat", default=30, show_default=True)
+@click.option("--output", default=None, type=click.Path(dir_okay=False), help="Guarda el resultado en JSON.")
+@with_appcontext
+def indexes_command(database, rows, favorites, repeat, output):
+    """Plan y latencia de filtros y busquedas inversas de favoritos, sin y con los indices."""
+    engine = create_engine(database.replace("postgres://", "postgresql://"))
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    click.echo(f"sembrando {database} ...")
+    with Session(engine) as session:
+        seed_for_indexes(session, rows, favorites)
+    # solo los indices no unicos declarados en los modelos (los de la migracion)
+    indexes = [index for table in db.metadata.tables.values() for index in table.indexes if not index.unique]
+    queries = index_queries(rows)
+
+    for index in indexes:
+        index.drop(engine)
+    before = measure_queries(engine, queries, repeat)
+    for index in indexes:
+        index.create(engine)
+    after = measure_queries(engine, queries, repeat)
+    engine.dispose()
+
+    for name, _ in queries:
+        a, b = before[name], after[name]
+        click.echo(f"{name}\n  sin indices  p50 {a['p50_ms']:>9} ms  {' | '.join(a['plan'])}"
+                   f"\n  con indices  p50 {b['p50_ms']:>9} ms  {' | '.join(b['plan'])}")
+    if output:
+        report = {"meta": {"commit": git_commit(), "database": engine.dialect.name, "rows": rows},
+                  "before": before, "after": after}
+        with open(output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        click.echo(f"resultados en {output}")
@@ -0,0 +1,74 @@
+"""`flask bench multiget`: varios registros con ?ids= contra un GET por registro."""
+import random
+import statistics
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from models import db
+from cache import response_cache
+from bench.common import CATALOG_MODELS, DEFAULT_BENCH_DATABASE, reexec_with_database, seed_models
+
+
+@click.command("multiget")
+@click.option("--database", default=DEFAULT_BENCH_DATABASE, show_default=True,
+              help="Base que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--rows", default=1000, show_default=True, help="Filas por tabla del catalogo.")
+@click.option("--ids", "sizes", multiple=True, type=int, default=(10, 50, 100), show_default=True,
+              help="Ids por lectura; se puede repetir.")
+@click.option("--repeat", default=20, show_default=True)
+@with_appcontext
+def multiget_command(database, rows, sizes, repeat):
+    """
+    N GET /get_one_<modelo>/<id> contra un GET /get_many_<modelo>?ids=, con la
+    cache de registros fria y caliente (calentada por el ?ids=, asi se ve que
+    la comparten).
+    """
+    reexec_with_database(database)
+    db.drop_all()
+    db.create_all()
+    seed_models(db.session, {model: rows for model in CATALOG_MODELS})
+    db.session.remove()
+    client = current_app.test_client()
+    rng = random.Random(3)
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+
+    def run(paths):
+        queries[0] = 0
+        started = time.perf_counter()
+        for path in paths:
+            response = client.get(path)
+            response.get_data()
+            assert response.status_code == 200, (path, response.status_code)
+        return time.perf_counter() - started, queries[0]
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    click.echo(f"{'modelo':<10} {'ids':>4} {'cache':<7} {'N GET p50':>10} {'q':>5} {'?ids= p50':>10} {'q':>4} {'x':>6}")
+    try:
+        for model in CATALOG_MODELS:
+            table = model.__tablename__
+            for size in sizes:
+                for warm in (False, True):
+                    singles, multis = [], []
+                    for _ in range(repeat):
+                        ids = rng.sample(range(1, rows + 1), size)
+                        one = [f"/get_one_{table}/{id}" for id in ids]
+                        many = [f"/get_many_{table}?ids={','.join(map(str, ids))}"]
+                        response_cache.invalidate(table, ids)
+                        if warm:
+                            run(many)
+                        singles.append(run(one))
+                        if not warm:
+                            response_cache.invalidate(table, ids)
+                        multis.append(run(many))
+                    single_ms = statistics.median(elapsed for elapsed, _ in singles) * 1000
+                    multi_ms = statistics.median(elapsed for elapsed, _ in multis) * 1000
+                    click.echo(f"{table:<10} {size:>4} {'caliente' if warm else 'fria':<7} {single_ms:>8.2f}ms "
+                               f"{singles[-1][1]:>5} {multi_ms:>8.2f}ms {multis[-1][1]:>4} "
+                               f"{single_ms / multi_ms:>5.1f}x")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
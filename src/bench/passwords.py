@@ -0,0 +1,60 @@
+"""`flask bench passwords`: logins/seg por core con cada costo de scrypt."""
+import os
+import statistics
+import threading
+import time
+import click
+from flask.cli import with_appcontext
+import passwords
+from bench.common import percentiles
+
+
+@click.command("passwords")
+@click.option("--ln", "costs", multiple=True, type=int, default=(14, 15, 16), show_default=True,
+              help="log2 de N de scrypt; se puede repetir.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Procesos del pool.")
+@click.option("--clients", default=None, type=int, help="Logins simultaneos (2 x workers).")
+@click.option("--seconds", default=3.0, show_default=True, help="Duracion de cada medicion.")
+@with_appcontext
+def passwords_command(costs, workers, clients, seconds):
+    """Logins/seg por core con cada costo: en el thread del request y en el pool de procesos."""
+    clients = clients or 2 * workers
+    cores = min(workers, os.cpu_count() or 1)
+    click.echo(f"{'ln':>3} {'MiB':>5} {'ms/login':>9} {'inline/s/core':>14} {'pool/s':>8} "
+               f"{'pool/s/core':>12} {'p50':>9} {'p99':>9}  ({workers} procesos, {clients} clientes)")
+    for ln in costs:
+        cost = passwords.Cost(ln, passwords.COST.r, passwords.COST.p)
+        stored = passwords._hash("bench-password", cost)
+
+        inline, started = [], time.perf_counter()
+        while time.perf_counter() - started < seconds or not inline:
+            begin = time.perf_counter()
+            assert passwords._login("bench-password", stored, cost)[0]
+            inline.append(time.perf_counter() - begin)
+
+        pool = passwords.PasswordPool(workers, max_pending=clients, timeout=60)
+        pool.run(passwords._verify, "", stored)  # arranca los procesos fuera de la medicion
+        samples, lock = [], threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def client():
+            while time.perf_counter() < deadline:
+                begin = time.perf_counter()
+                assert pool.run(passwords._login, "bench-password", stored, cost)[0]
+                with lock:
+                    samples.append(time.perf_counter() - begin)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+
+        cuts = percentiles(samples)
+        memory = 128 * cost.r * (1 << ln) / (1 << 20)
+        click.echo(f"{ln:>3} {memory:>5.0f} {statistics.median(inline) * 1000:>9.1f} "
+                   f"{len(inline) / sum(inline):>14.1f} {len(samples) / elapsed:>8.1f} "
+                   f"{len(samples) / elapsed / cores:>12.1f} {cuts['p50_ms']:>7.0f}ms {cuts['p99_ms']:>7.0f}ms")
@@ -0,0 +1,75 @@
+"""`flask bench ratelimit`: costo por request del limite con muchos clientes."""
+import random
+import time
+import click
+from flask import current_app, make_response, request
+from flask.cli import with_appcontext
+from ratelimit import (WRITE_LIMIT, MemoryBackend as RateLimitMemory, RateLimiter, RedisBackend as RateLimitRedis,
+                       parse_limit)
+
+
+@click.command("ratelimit")
+@click.option("--clients", default=10000, show_default=True, help="Clientes distintos (IPs).")
+@click.option("--calls", default=200000, show_default=True)
+@click.option("--limit", "limit_text", default=WRITE_LIMIT, show_default=True)
+@click.option("--max-buckets", default=None, type=int, help="Tope de buckets (RATELIMIT_MAX_BUCKETS).")
+@click.option("--redis", "redis_url", default=None, help="Ademas mide RedisBackend en esta url.")
+@with_appcontext
+def ratelimit_command(clients, calls, limit_text, max_buckets, redis_url):
+    """
+    Microsegundos por request con `clients` clientes distintos: el bucket solo
+    y el decorador completo (cliente + bucket + headers) contra la misma vista
+    sin limite; memoria por bucket y cuantos quedan con el tope.
+    """
+    import tracemalloc
+    limit = parse_limit(limit_text)
+    rng = random.Random(5)
+    keys = [f"add_user_planet:ip:10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in range(clients)]
+    order = [rng.randrange(clients) for _ in range(calls)]
+    backends = [("memoria", RateLimitMemory(max_buckets or max(clients, 1)))]
+    if redis_url:
+        backends.append(("redis", RateLimitRedis(redis_url)))
+
+    def per_call(function, count):
+        started = time.perf_counter()
+        for i in range(count):
+            function(i)
+        return (time.perf_counter() - started) / count * 1e6
+
+    for label, backend in backends:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for key in keys:
+            backend.hit(key, limit)
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        count = calls if label == "memoria" else min(calls, 20000)
+        micros = per_call(lambda i: backend.hit(keys[order[i]], limit), count)
+        click.echo(f"{label:<8} {micros:>6.2f} us por request, {len(backend) or clients} buckets"
+                   + (f", {memory / clients:.0f} bytes por bucket, {backend.evictions} expulsados"
+                      if label == "memoria" else ""))
+
+    limiter = RateLimiter(RateLimitMemory(max_buckets or max(clients, 1)))
+
+    def view():
+        return "ok"
+
+    limited = limiter.limit(limit_text)(view)
+    with current_app.test_request_context("/user_planet", method="POST"):
+        addresses = [key.rsplit(":", 1)[1] for key in keys]
+
+        def plain(i):
+            request.remote_addr = addresses[order[i]]
+            make_response(view())
+
+        def decorated(i):
+            request.remote_addr = addresses[order[i]]
+            limited()
+
+        base, full = per_call(plain, calls), per_call(decorated, calls)
+    click.echo(f"decorador {full:.2f} us por request contra {base:.2f} us sin limite: +{full - base:.2f} us")
+
+    # un solo cliente insistiendo: pasan `burst` y despues uno cada 1/rate segundos
+    single = RateLimitMemory()
+    allowed = sum(single.hit("add_user_planet:ip:1.2.3.4", limit, now=0.0)[0] for _ in range(limit.burst * 2))
+    click.echo(f"un cliente, {limit.burst * 2} requests seguidos: {allowed} permitidos (burst {limit.burst})")
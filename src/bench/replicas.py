@@ -0,0 +1,123 @@
+"""`flask bench replicas`: el ruteo a replicas con un primario y dos replicas SQLite."""
+import os
+import shutil
+import sys
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from models import db, User, Planet
+from replicas import replica_router
+from auth import auth
+from bench.common import reexec_with_database, seed_models
+
+
+@click.command("replicas")
+@click.option("--directory", default="/tmp/bench-replicas", show_default=True,
+              help="Donde se crean primary.db y las replicas (se borra).")
+@with_appcontext
+def replicas_command(directory):
+    """
+    Ejercita el ruteo a replicas con un primario y dos replicas SQLite sin
+    replicacion: lo escrito solo aparece en el primario, asi se ve de donde
+    lee cada request. Sale con codigo 1 si algun chequeo falla.
+    """
+    sticky_seconds = 1.0
+    primary = f"sqlite:///{directory}/primary.db"
+    replicas = (f"sqlite:///{directory}/r0/replica.db", f"sqlite:///{directory}/r1/replica.db")
+    # chequeos seguidos y una ventana corta, para ver el vencimiento sin esperar 5 segundos
+    reexec_with_database(primary, replicas, REPLICA_HEALTH_INTERVAL="0.1", REPLICA_STICKY_SECONDS=str(sticky_seconds),
+                         REPLICA_STICKY_URL="")
+    app = current_app._get_current_object()
+    shutil.rmtree(directory, ignore_errors=True)
+    for replica in replicas:
+        os.makedirs(os.path.dirname(replica.split("///", 1)[1]))
+
+    db.drop_all()
+    db.create_all()
+    seed_models(db.session, {User: 2, Planet: 10})
+    db.session.remove()
+    for engine in db.engines.values():
+        engine.dispose()
+    for replica in replicas:
+        shutil.copy(f"{directory}/primary.db", replica.split("///", 1)[1])
+
+    queries = {}
+
+    def count(name):
+        def before_cursor_execute(connection, cursor, statement, *args):
+            # el SELECT 1 es del thread de chequeos, no de un request
+            if statement != "SELECT 1":
+                queries[name] = queries.get(name, 0) + 1
+        return before_cursor_execute
+
+    for name, engine in db.engines.items():
+        event.listen(engine, "before_cursor_execute", count(name or "primary"))
+    results = []
+
+    def check(description, ok):
+        results.append(ok)
+        click.echo(f"  [{'ok' if ok else 'FALLO'}] {description}")
+
+    def wait_health(name, healthy, timeout=5.0):
+        """El thread de chequeos marca la replica; retorna el estado de todas."""
+        deadline = time.monotonic() + timeout
+        while True:
+            state = {replica["name"]: replica["healthy"] for replica in replica_router.stats()}
+            if state[name] == healthy or time.monotonic() > deadline:
+                return state
+            time.sleep(0.05)
+
+    def has_favorite(response):
+        favorites = response.get_json() or {}
+        return response.status_code == 200 and any(item["id"] == 3 for item in favorites.get("fav_planets", []))
+
+    writer, reader = app.test_client(), app.test_client()
+    click.echo("round-robin:")
+    for i in range(6):
+        reader.get(f"/get_one_planet/{i + 1}")
+    check(f"las lecturas se reparten entre replicas {queries}",
+          queries.get("replica_0", 0) > 0 and queries.get("replica_1", 0) > 0)
+
+    click.echo("escrituras y read-your-writes:")
+    # el reader es otro cliente (sin la cookie del writer): el mismo usuario desde otro dispositivo
+    headers = {"Authorization": f"Bearer {auth.issue(1)[0]}"}
+    other = {"Authorization": f"Bearer {auth.issue(2)[0]}"}
+    queries.clear()
+    response = writer.post("/user_planet", json={"user_id": 1, "planet_id": 3}, headers=headers)
+    check(f"la escritura va al primario ({response.status_code})", response.status_code < 400
+          and set(queries) == {"primary"})
+    response = writer.get("/users/favorites/1", headers=headers)
+    check(f"quien escribio ve su favorito (cookie, {response.status_code})", has_favorite(response))
+    queries.clear()
+    response = reader.get("/users/favorites/1", headers=headers)
+    check(f"el mismo usuario desde otro cliente tambien (ventana por usuario, {queries})",
+          has_favorite(response) and set(queries) == {"primary"})
+    queries.clear()
+    response = reader.get("/users/favorites/2", headers=other)
+    check(f"otro usuario sigue leyendo de la replica ({response.status_code}, {queries})",
+          response.status_code == 200 and "primary" not in queries)
+    time.sleep(sticky_seconds + 0.1)
+    queries.clear()
+    response = reader.get("/users/favorites/1", headers=headers)
+    check(f"vencida la ventana vuelve a la replica (sin el favorito, {queries})",
+          response.status_code == 200 and not has_favorite(response) and "primary" not in queries)
+
+    click.echo("replica caida (chequeos en segundo plano):")
+    os.rename(f"{directory}/r1", f"{directory}/r1-caida")
+    db.engines["replica_1"].dispose()
+    healthy = wait_health("replica_1", False)
+    check(f"replica_1 marcada como caida {healthy}", healthy == {"replica_0": True, "replica_1": False})
+    queries.clear()
+    statuses = {reader.get(f"/get_one_planet/{i + 1}?caida=1").status_code for i in range(4)}
+    check(f"sin errores y solo replica_0 {queries}", statuses == {200} and "replica_1" not in queries)
+    os.rename(f"{directory}/r1-caida", f"{directory}/r1")
+    healthy = wait_health("replica_1", True)
+    queries.clear()
+    for i in range(4):
+        reader.get(f"/get_one_planet/{i + 1}?vuelve=1")
+    check(f"vuelve a recibir lecturas al recuperarse {healthy} {queries}", queries.get("replica_1", 0) > 0)
+
+    if not all(results):
+        sys.exit(1)
@@ -0,0 +1,65 @@
+"""`flask bench routes`: latencia, req/s y queries por request de cada ruta."""
+import json
+import platform
+from datetime import datetime, timezone
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from bench.common import DEFAULT_BENCH_DATABASE, git_commit, reexec_with_database
+from bench.scenario import Scenario, run_gunicorn, run_test_client
+
+
+@click.command("routes")
+@click.option("--database", default=DEFAULT_BENCH_DATABASE, show_default=True,
+              help="Base SQLite o PostgreSQL local que se borra y siembra (nunca la de DATABASE_URL).")
+@click.option("--users", default=200, show_default=True)
+@click.option("--characters", default=1000, show_default=True)
+@click.option("--planets", default=1000, show_default=True)
+@click.option("--vehicles", default=1000, show_default=True)
+@click.option("--favorites", default=5, show_default=True, help="Favoritos por usuario y tabla.")
+@click.option("--requests", "requests_per_route", default=50, show_default=True, help="Requests por ruta.")
+@click.option("--gunicorn/--no-gunicorn", default=False, help="Ademas, carga concurrente contra gunicorn.")
+@click.option("--concurrency", default=16, show_default=True)
+@click.option("--duration", default=10.0, show_default=True, help="Segundos de carga con gunicorn.")
+@click.option("--workers", default=2, show_default=True)
+@click.option("--worker-class", default="sync", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--output", default="bench-results.json", show_default=True, type=click.Path(dir_okay=False))
+@with_appcontext
+def routes_command(database, users, characters, planets, vehicles, favorites, requests_per_route,
+                   gunicorn, concurrency, duration, workers, worker_class, port, output):
+    """Latencia p50/p95/p99, req/s y queries por request de cada ruta; guarda un JSON."""
+    reexec_with_database(database)
+    volumes = {"users": users, "characters": characters, "planets": planets, "vehicles": vehicles,
+               "favorites": favorites}
+    app = current_app._get_current_object()
+    scenario = Scenario(volumes, requests_per_route)
+
+    click.echo(f"sembrando {database} ...")
+    db.drop_all()
+    db.create_all()
+    scenario.seed(db.session)
+    db.session.remove()
+
+    covered = {endpoint for endpoint, _, _, _ in scenario.routes()}
+    # las vistas de flask-admin y static tienen "." o no son de la API
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint not in covered and rule.endpoint != "static" and "." not in rule.endpoint)
+    if missing:
+        click.echo(f"rutas sin escenario de benchmark: {', '.join(missing)}", err=True)
+
+    report = {
+        "meta": {"commit": git_commit(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "database": db.engine.dialect.name,
+                 "volumes": volumes, "requests_per_route": requests_per_route},
+    }
+    click.echo("test client:")
+    report["test_client"] = run_test_client(app, scenario)
+    if gunicorn:
+        click.echo("gunicorn:")
+        report["gunicorn"] = run_gunicorn(app, scenario, database, concurrency, duration,
+                                          workers, worker_class, port)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+    click.echo(f"resultados en {output}")
@@ -0,0 +1,301 @@
+"""
+Requests de todas las rutas de la API y las corridas que los miden: con el
+test client (secuencial, cuenta queries) y con gunicorn (carga concurrente).
+Lo usan `flask bench routes` y `flask bench concurrency`.
+"""
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import click
+from flask import current_app
+from sqlalchemy import event, insert
+from models import db, User, Character, Planet, Vehicle
+from stats import rebuild as rebuild_favorite_counts
+from auth import auth
+from bench.common import FAVORITE_TABLES, fake_row, seed_models, summarize
+
+
+class Scenario:
+    """Datos sembrados y generadores de requests para cada ruta de la API."""
+
+    def __init__(self, volumes, requests):
+        self.volumes = volumes
+        self.requests = requests
+        self.random = random.Random(42)
+        self.token = uuid.uuid4().hex[:6]
+        self.favorites = {}
+        self.tokens = {}
+
+    def seed(self, session):
+        # se siembran `requests` filas extra de cada modelo para las rutas DELETE
+        extra = self.requests
+        seed_models(session, {User: self.volumes["users"] + extra,
+                              Character: self.volumes["characters"] + extra,
+                              Planet: self.volumes["planets"] + extra,
+                              Vehicle: self.volumes["vehicles"] + extra})
+        counts = {Planet: self.volumes["planets"], Character: self.volumes["characters"],
+                  Vehicle: self.volumes["vehicles"]}
+        for table, fk, model in FAVORITE_TABLES:
+            pairs = set()
+            for user_id in range(1, self.volumes["users"] + 1):
+                for _ in range(min(self.volumes["favorites"], counts[model])):
+                    pairs.add((user_id, self.random.randint(1, counts[model])))
+            if pairs:
+                session.execute(insert(table), [{"user_id": u, fk: e} for u, e in pairs])
+            self.favorites[fk] = pairs
+        rebuild_favorite_counts(session)
+        session.commit()
+
+    def user_id(self):
+        return self.random.randint(1, self.volumes["users"])
+
+    def entity_id(self, fk):
+        model = {"planet_id": "planets", "character_id": "characters", "vehicle_id": "vehicles"}[fk]
+        return self.random.randint(1, self.volumes[model])
+
+    def entity_ids(self, fk, count=20):
+        """Ids para ?ids=, como los de una grilla de favoritos."""
+        return ",".join(str(self.entity_id(fk)) for _ in range(count))
+
+    def headers(self, path, payload):
+        """Authorization con el token del usuario del request (URL /user/<id>, user_id del body, GET /user o /import)."""
+        user_id = None
+        if path.startswith(("/user/", "/users/favorites/")) and path.rsplit("/", 1)[1].isdigit():
+            user_id = int(path.rsplit("/", 1)[1])
+        elif isinstance(payload, dict):
+            user_id = payload.get("user_id") or next(
+                (op.get("user_id") for op in payload.get("operations") or ()), None)
+        elif path.startswith("/import/") or path.partition("?")[0] == "/user":
+            # cualquier usuario con token puede importar y ver el listado de usuarios
+            user_id = self.user_id()
+        if user_id is None:
+            return {}
+        # un token por usuario, como un cliente que lo reusa hasta que vence
+        if user_id not in self.tokens:
+            self.tokens[user_id] = auth.issue(user_id)[0]
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def new_favorite(self, fk, user_id=None):
+        for _ in range(100):
+            pair = (user_id or self.user_id(), self.entity_id(fk))
+            if pair not in self.favorites[fk]:
+                self.favorites[fk].add(pair)
+                return {"user_id": pair[0], fk: pair[1]}
+        return {"user_id": user_id or self.user_id(), fk: self.entity_id(fk)}
+
+    def old_favorite(self, fk, user_id=None):
+        if user_id is not None:
+            pair = next((pair for pair in self.favorites[fk] if pair[0] == user_id), (user_id, self.entity_id(fk)))
+            self.favorites[fk].discard(pair)
+            return {"user_id": pair[0], fk: pair[1]}
+        pair = self.favorites[fk].pop() if self.favorites[fk] else (self.user_id(), self.entity_id(fk))
+        return {"user_id": pair[0], fk: pair[1]}
+
+    def reserved_id(self, key, i):
+        return self.volumes[key] + 1 + i
+
+    def body(self, model, i):
+        row = fake_row(model, i)
+        unique = f"{self.token}-{i}"
+        row["name"] = f"bench-{unique}"
+        if model is User:
+            row["email"] = f"{unique}@bench.test"
+        return row
+
+    def login(self, i):
+        # fake_row(User, n) es el usuario con id n + 1; su password empieza en texto
+        # plano y el primer login lo rehace con scrypt
+        n = self.user_id() - 1
+        row = fake_row(User, n)
+        return {"email": row["email"], "password": row["password"]}
+
+    def update_user_planet(self, i):
+        body = self.old_favorite("planet_id")
+        new = self.new_favorite("planet_id")
+        self.favorites["planet_id"].discard((new["user_id"], new["planet_id"]))
+        self.favorites["planet_id"].add((body["user_id"], new["planet_id"]))
+        return {**body, "new_planet_id": new["planet_id"]}
+
+    def bulk(self, i):
+        # todas las operaciones de un mismo usuario, el del token
+        user_id = self.user_id()
+        operations = [{"op": "add", **self.new_favorite(fk, user_id)}
+                      for fk in ("planet_id", "character_id", "vehicle_id") for _ in range(5)]
+        operations += [{"op": "delete", **self.old_favorite("planet_id", user_id)} for _ in range(5)]
+        return {"operations": operations}
+
+    def import_body(self, i):
+        rows = [self.body(Planet, i * 100 + n) for n in range(100)]
+        return "\n".join(json.dumps(row) for row in rows)
+
+    def routes(self):
+        """(endpoint, metodo, url(i), body(i)); las escrituras van despues de las lecturas."""
+        r = self
+        return [
+            ("sitemap", "GET", lambda i: "/", None),
+            ("get_all_users", "GET", lambda i: "/user", None),
+            ("get_one_user", "GET", lambda i: f"/user/{r.user_id()}", None),
+            ("get_all_character", "GET", lambda i: "/get_all_character", None),
+            ("get_one_character", "GET", lambda i: f"/get_one_character/{r.entity_id('character_id')}", None),
+            ("get_many_character", "GET", lambda i: f"/get_many_character?ids={r.entity_ids('character_id')}", None),
+            ("get_all_planet", "GET", lambda i: "/get_all_planet", None),
+            ("get_one_planet", "GET", lambda i: f"/get_one_planet/{r.entity_id('planet_id')}", None),
+            ("get_many_planet", "GET", lambda i: f"/get_many_planet?ids={r.entity_ids('planet_id')}", None),
+            ("get_all_vehicles", "GET", lambda i: "/get_all_vehicle", None),
+            ("get_one_vehicle", "GET", lambda i: f"/get_one_vehicle/{r.entity_id('vehicle_id')}", None),
+            ("get_many_vehicle", "GET", lambda i: f"/get_many_vehicle?ids={r.entity_ids('vehicle_id')}", None),
+            ("get_user_favoritos", "GET", lambda i: f"/users/favorites/{r.user_id()}", None),
+            ("search_catalog", "GET", lambda i: f"/search?q=name-{r.entity_id('planet_id')}", None),
+            ("favorite_stats", "GET", lambda i: "/stats/favorites", None),
+            ("favorite_ranking", "GET", lambda i: "/stats/favorites/planet", None),
+            ("favorite_count_detail", "GET", lambda i: f"/stats/favorites/planet/{r.entity_id('planet_id')}", None),
+            # /cache/stats y /db/pool solo existen con FLASK_DEBUG=1 u OPS_ENDPOINTS=1
+            *[(endpoint, "GET", lambda i, path=path: path, None)
+              for endpoint, path in (("cache_stats", "/cache/stats"), ("db_pool_stats", "/db/pool"))
+              if endpoint in current_app.view_functions],
+            ("health", "GET", lambda i: "/health", None),
+            ("create_user", "POST", lambda i: "/user", lambda i: r.body(User, i)),
+            ("login", "POST", lambda i: "/login", r.login),
+            ("update_user", "PUT", lambda i: f"/user/{r.user_id()}", lambda i: {"phone": str(i)}),
+            ("add_character", "POST", lambda i: "/add_character", lambda i: r.body(Character, i)),
+            ("put_character", "PUT", lambda i: f"/put_character/{r.entity_id('character_id')}",
+             lambda i: {"description": f"bench {i}"}),
+            ("add_planet", "POST", lambda i: "/add_planet", lambda i: r.body(Planet, i)),
+            ("put_planet", "PUT", lambda i: f"/planet/{r.entity_id('planet_id')}", lambda i: r.body(Planet, i)),
+            ("add_vehicle", "POST", lambda i: "/add_vehicle", lambda i: r.body(Vehicle, i)),
+            ("put_vehicle", "PUT", lambda i: f"/vehicle/{r.entity_id('vehicle_id')}",
+             lambda i: {"description": f"bench {i}"}),
+            ("add_user_planet", "POST", lambda i: "/user_planet", lambda i: r.new_favorite("planet_id")),
+            ("update_user_planet", "PUT", lambda i: "/user_planet", r.update_user_planet),
+            ("delete_user_planet", "DELETE", lambda i: "/delete_user_planet", lambda i: r.old_favorite("planet_id")),
+            ("add_user_character", "POST", lambda i: "/add_user_character",
+             lambda i: r.new_favorite("character_id")),
+            ("delete_user_character", "DELETE", lambda i: "/delete_user_character",
+             lambda i: r.old_favorite("character_id")),
+            ("add_user_vehicle", "POST", lambda i: "/add_user_vehicle", lambda i: r.new_favorite("vehicle_id")),
+            ("delete_user_vehicle", "DELETE", lambda i: "/delete_user_vehicle",
+             lambda i: r.old_favorite("vehicle_id")),
+            ("bulk_user_favorites", "POST", lambda i: "/users/favorites/bulk", r.bulk),
+            ("import_catalog", "POST", lambda i: "/import/planet", r.import_body),
+            ("delete_user", "DELETE", lambda i: f"/user/{r.reserved_id('users', i)}", None),
+            ("delete_character", "DELETE", lambda i: f"/delete_character/{r.reserved_id('characters', i)}", None),
+            ("delete_planet", "DELETE", lambda i: f"/planet/{r.reserved_id('planets', i)}", None),
+            ("delete_vehicle", "DELETE", lambda i: f"/vehicle/{r.reserved_id('vehicles', i)}", None),
+        ]
+
+
+def run_test_client(app, scenario):
+    """Cada ruta `requests` veces en secuencia; cuenta las queries de cada request."""
+    client = app.test_client()
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    results = {}
+    try:
+        for endpoint, method, url, body in scenario.routes():
+            samples, statuses, per_request = [], [], []
+            started = time.perf_counter()
+            for i in range(scenario.requests):
+                kwargs, payload = {}, None
+                if body is not None:
+                    payload = body(i)
+                    kwargs = {"data": payload} if isinstance(payload, str) else {"json": payload}
+                path = url(i)
+                kwargs["headers"] = scenario.headers(path, payload)
+                # una IP por request: el limite de escrituras es por cliente y aca se mide la ruta
+                kwargs["environ_base"] = {"REMOTE_ADDR": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"}
+                queries[0] = 0
+                request_started = time.perf_counter()
+                response = client.open(path, method=method, **kwargs)
+                response.get_data()
+                samples.append(time.perf_counter() - request_started)
+                statuses.append(response.status_code)
+                per_request.append(queries[0])
+            results[endpoint] = summarize(samples, statuses, time.perf_counter() - started, per_request)
+            click.echo(f"  {endpoint:<24} p50 {results[endpoint]['p50_ms']:>8} ms  "
+                       f"p99 {results[endpoint]['p99_ms']:>8} ms  "
+                       f"{results[endpoint]['queries_per_request']:>5} q/req  {results[endpoint]['statuses']}")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return results
+
+
+def wait_for_port(host, port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request("GET", "/health")
+            connection.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_gunicorn(app, scenario, database, concurrency, duration, workers, worker_class, port, threads=1):
+    """Levanta gunicorn sobre la base del benchmark y lo carga con `concurrency` clientes (solo GET)."""
+    src = app.root_path
+    command = [sys.executable, "-m", "gunicorn", "wsgi", "--chdir", src, "--bind", f"127.0.0.1:{port}",
+               "--config", os.path.join(os.path.dirname(src), "gunicorn.conf.py"),
+               "--workers", str(workers), "--worker-class", worker_class, "--log-level", "warning"]
+    # la misma clave que este proceso: los tokens de Scenario.headers valen en los workers
+    env = dict(os.environ, DATABASE_URL=database, GUNICORN_THREADS=str(threads), AUTH_SECRET=auth.key.decode())
+    server = subprocess.Popen(command, env=env)
+    try:
+        if not wait_for_port("127.0.0.1", port):
+            raise click.ClickException("gunicorn no respondio")
+        reads = [(endpoint, url) for endpoint, method, url, body in scenario.routes() if method == "GET"]
+        samples = {endpoint: [] for endpoint, _ in reads}
+        statuses = {endpoint: [] for endpoint, _ in reads}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client_loop(seed):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                endpoint, url = rng.choice(reads)
+                started = time.perf_counter()
+                try:
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                    path = url(0)
+                    connection.request("GET", path, headers=scenario.headers(path, None))
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                    connection.close()
+                except OSError:
+                    status = 599
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples[endpoint].append(elapsed)
+                    statuses[endpoint].append(status)
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client_loop, args=(n,)) for n in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results = {endpoint: summarize(samples[endpoint], statuses[endpoint], elapsed)
+                   for endpoint, _ in reads if samples[endpoint]}
+        everything = [value for values in samples.values() for value in values]
+        all_statuses = [value for values in statuses.values() for value in values]
+        results["_total"] = summarize(everything, all_statuses, elapsed)
+        mode = f"{worker_class} x{threads} threads" if threads > 1 else worker_class
+        click.echo(f"  gunicorn x{workers} ({mode}), {concurrency} clientes: "
+                   f"{results['_total']['requests_per_second']} req/s, p99 {results['_total']['p99_ms']} ms")
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
@@ -0,0 +1,41 @@
+"""`flask bench serialize`: filas/seg serializando con el ORM contra el schema compilado."""
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from models import db, User
+from serializers import compile_schema, public_columns
+from bench.common import CATALOG_MODELS, seed_models, timed
+
+
+@click.command("serialize")
+@click.option("--rows", default=5000, show_default=True, help="Filas por modelo.")
+@click.option("--repeat", default=5, show_default=True)
+@with_appcontext
+def serialize_command(rows, repeat):
+    """Filas/seg serializando cada modelo: ORM + dict + json vs schema compilado + proveedor JSON."""
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_models(session, {model: rows for model in CATALOG_MODELS + (User,)})
+        encoder = type(current_app.json).__name__
+        click.echo(f"{'modelo':<10} {'antes (filas/s)':>16} {'despues (filas/s)':>18} {'x':>6}   ({encoder})")
+        for model in CATALOG_MODELS + (User,):
+            names = [column.name for column in public_columns(model)]
+            schema = compile_schema(model)
+
+            def before():
+                # lo que hacian los serialize() escritos a mano
+                session.expunge_all()
+                objects = session.scalars(select(model)).all()
+                json.dumps([{name: getattr(obj, name) for name in names} for obj in objects],
+                           sort_keys=True)
+
+            def after():
+                result = session.execute(select(*schema.columns))
+                current_app.json.dumps([schema.from_row(row) for row in result])
+
+            old, new = timed(before, repeat), timed(after, repeat)
+            click.echo(f"{model.__tablename__:<10} {rows / old:>16,.0f} {rows / new:>18,.0f} {old / new:>5.1f}x")
@@ -0,0 +1,68 @@
+"""`flask bench validate`: bodies/seg con los chequeos a mano contra el validador compilado."""
+import click
+from flask.cli import with_appcontext
+from models import User, Vehicle
+from numeric import shadow_columns
+from validation import compile_validator
+from bench.common import CATALOG_MODELS, fake_row, timed
+
+
+def legacy_check(model):
+    """Los chequeos que hacian a mano create_user y add_* antes de validation.py (sin tipos ni largos)."""
+    fields = model.REQUIRED_FIELDS
+    if model is User:
+        def check(data):
+            clean_data = {field: data[field] for field in fields if field in data}
+            for field in fields:
+                if not data.get(field):
+                    return None
+            return clean_data
+    elif model is Vehicle:
+        def check(data):
+            if [field for field in fields if not data.get(field)]:
+                return None
+            return {field: data.get(field) for field in fields}
+    else:
+        # add_character y add_planet: un data.get por campo y un any sobre todos
+        def check(data):
+            values = {field: data.get(field) for field in fields}
+            if any(value is None or value == "" for value in values.values()):
+                return None
+            return values
+    return check
+
+
+@click.command("validate")
+@click.option("--payloads", default=20000, show_default=True, help="Bodies por modelo.")
+@click.option("--repeat", default=5, show_default=True)
+@with_appcontext
+def validate_command(payloads, repeat):
+    """Bodies/seg validados: chequeos a mano vs reglas leidas en cada request vs validador compilado."""
+    click.echo(f"{'modelo':<18} {'a mano':>12} {'sin compilar':>14} {'compilado':>12}  (bodies/s)")
+    for model in CATALOG_MODELS + (User,):
+        valid = []
+        for i in range(payloads):
+            row = fake_row(model, i)
+            for shadow in shadow_columns(model).values():
+                del row[shadow]
+            valid.append(row)
+        # sin un campo requerido y con un texto demasiado largo
+        invalid = [{**row, model.REQUIRED_FIELDS[-1]: None, "name": "x" * 500} for row in valid]
+        legacy = legacy_check(model)
+        compiled = compile_validator(model).validate
+        for label, bodies in (("validos", valid), ("invalidos", invalid)):
+            def before():
+                for data in bodies:
+                    legacy(data)
+
+            def uncompiled():
+                for data in bodies:
+                    compile_validator.__wrapped__(model).validate(data)
+
+            def after():
+                for data in bodies:
+                    compiled(data)
+
+            old, walk, new = timed(before, repeat), timed(uncompiled, repeat), timed(after, repeat)
+            click.echo(f"{model.__tablename__ + ' ' + label:<18} {payloads / old:>12,.0f} "
+                       f"{payloads / walk:>14,.0f} {payloads / new:>12,.0f}")
@@ -0,0 +1,307 @@
+"""
+Cache de respuestas serializadas para las rutas de lectura del catalogo
+(characters, planets, vehicles).
+
+Cada entrada se guarda bajo una llave que incluye la version de su tag:
+"planet" para los listados y "planet:<id>" para un registro. Al hacer commit
+de un cambio se incrementan esas versiones, asi las entradas viejas dejan de
+usarse sin tener que buscarlas y funciona igual con un backend compartido.
+Esas versiones son del backend; con MemoryBackend solo las sube el worker
+que hizo el cambio. Por eso la llave lleva tambien las versiones de
+data_version que leyo @conditional (g.data_versions): un cambio hecho en
+otro worker cambia la llave igual que cambia el ETag.
+
+Ademas de respuestas completas se guarda el JSON de cada registro (entradas
+"record:planet:<id>"), que comparten get_one_* y las lecturas de varios ids.
+Los listados se guardan tambien comprimidos, una entrada por encoding
+("<llave>|gzip"), la primera vez que un cliente pide ese encoding.
+"""
+import itertools
+from abc import ABC, abstractmethod
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, g, make_response, request
+from sqlalchemy import event
+from metrics import observe_cache, observe_eviction
+from compression import MIN_SIZE, compress, mark_encoded, negotiate
+from replicas import STICKY_SECONDS
+
+# tablas del catalogo que se cachean; el nombre de la tabla es el tag de sus listados
+CACHED_TABLES = ("character", "planet", "vehicle")
+
+
+class CacheBackend(ABC):
+    """Interfaz para backends de cache (en memoria, redis, ...)."""
+    evictions = 0
+
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        pass
+
+    @abstractmethod
+    def version(self, tag):
+        pass
+
+    @abstractmethod
+    def bump(self, tag):
+        pass
+
+    def bump_many(self, tags):
+        for tag in tags:
+            self.bump(tag)
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set_many(self, values, ttl):
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    def version_many(self, tags):
+        return [self.version(tag) for tag in tags]
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """
+    LRU con TTL dentro del proceso; cada worker de gunicorn tiene el suyo.
+    Las versiones de los tags son otro LRU del mismo tamano (hay un tag
+    "planet:<id>" por registro leido). Cada version sale de un contador
+    unico del backend, asi un tag expulsado vuelve con un numero que
+    ninguna entrada vieja tiene y solo se pierden sus hits.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = OrderedDict()
+        self.sequence = itertools.count()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                self.evictions += 1
+                observe_eviction()
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                observe_eviction()
+
+    def version(self, tag):
+        with self.lock:
+            version = self.versions.get(tag)
+            if version is None:
+                version = self.versions[tag] = next(self.sequence)
+                if len(self.versions) > self.max_entries:
+                    self.versions.popitem(last=False)
+            else:
+                self.versions.move_to_end(tag)
+            return version
+
+    def bump(self, tag):
+        # un tag que nunca se leyo (o ya expulsado) no tiene entradas que invalidar
+        with self.lock:
+            if tag in self.versions:
+                self.versions[tag] = next(self.sequence)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RedisBackend(CacheBackend):
+    """Backend compartido entre workers; necesita `pip install redis`."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get("cache:" + key)
+
+    def set(self, key, value, ttl):
+        self.client.set("cache:" + key, value, ex=ttl)
+
+    def version(self, tag):
+        return int(self.client.get("version:" + tag) or 0)
+
+    def bump(self, tag):
+        self.client.incr("version:" + tag)
+
+    def bump_many(self, tags):
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr("version:" + tag)
+        pipeline.execute()
+
+    def get_many(self, keys):
+        return self.client.mget(["cache:" + key for key in keys]) if keys else []
+
+    def set_many(self, values, ttl):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set("cache:" + key, value, ex=ttl)
+        pipeline.execute()
+
+    def version_many(self, tags):
+        if not tags:
+            return []
+        return [int(value or 0) for value in self.client.mget(["version:" + tag for tag in tags])]
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # ultima invalidacion por tabla en este proceso
+        self.invalidated_at = {}
+
+    def key(self, tag):
+        args = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        return f"{self.backend.version(tag)}|{g.get('data_versions', '')}|{request.path}?{args}"
+
+    def invalidate(self, table, ids=()):
+        """Invalida los listados de la tabla y los registros con esos ids."""
+        self.invalidated_at[table] = time.monotonic()
+        self.backend.bump(table)
+        self.backend.bump_many(f"{table}:{id}" for id in ids)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend),
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+    def get_records(self, table, ids):
+        """
+        JSON de cada registro que ya esta en cache. Retorna ({id: bytes},
+        {id: version}); las versiones se pasan a set_records para guardar
+        lo que falto bajo la version leida antes de ir a la base.
+        """
+        stamp = g.get("data_versions", "")
+        versions = {id: f"{version}|{stamp}"
+                    for id, version in zip(ids, self.backend.version_many([f"{table}:{id}" for id in ids]))}
+        values = self.backend.get_many([f"{versions[id]}|record:{table}:{id}" for id in ids])
+        found = {id: value for id, value in zip(ids, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(ids) - len(found)
+        observe_cache("hit", len(found))
+        observe_cache("miss", len(ids) - len(found))
+        return found, versions
+
+    def set_records(self, table, records, versions):
+        if records and not self.maybe_stale(table):
+            self.backend.set_many({f"{versions[id]}|record:{table}:{id}": value
+                                   for id, value in records.items()}, self.ttl)
+
+    def maybe_stale(self, table):
+        """Leido de una replica justo despues de un cambio: puede no incluirlo todavia."""
+        if g.get("db_replica") is None:
+            return False
+        return time.monotonic() - self.invalidated_at.get(table, float("-inf")) < STICKY_SECONDS
+
+    def cached(self, table, id_arg=None):
+        """
+        Decorador para rutas GET. Sin id_arg la entrada depende de todo el
+        listado de la tabla; con id_arg solo de ese registro.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                tag = table if id_arg is None else f"{table}:{kwargs[id_arg]}"
+                key = self.key(tag)
+                encoding = negotiate()
+                if encoding is None:
+                    body, encoded = self.backend.get(key), None
+                else:
+                    # la version comprimida y la original en una sola lectura
+                    encoded, body = self.backend.get_many([f"{key}|{encoding}", key])
+                if encoded is not None:
+                    self.hits += 1
+                    observe_cache("hit")
+                    return mark_encoded(Response(encoded, status=200, mimetype="application/json"), encoding)
+                if body is not None:
+                    self.hits += 1
+                    observe_cache("hit")
+                    response = Response(body, status=200, mimetype="application/json")
+                    entries = self._encode(key, response, body, encoding)
+                    if entries and not self.maybe_stale(table):
+                        self.backend.set_many(entries, self.ttl)
+                    return response
+                self.misses += 1
+                observe_cache("miss")
+                response = make_response(view(**kwargs))
+                if response.status_code == 200 and not response.is_streamed and not self.maybe_stale(table):
+                    body = response.get_data()
+                    self.backend.set_many({key: body, **self._encode(key, response, body, encoding)}, self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def _encode(self, key, response, body, encoding):
+        """Comprime el body de la respuesta una vez; retorna la entrada a guardar junto a la original."""
+        if encoding is None or len(body) < MIN_SIZE:
+            return {}
+        encoded = compress(body, encoding)
+        response.set_data(encoded)
+        mark_encoded(response, encoding)
+        return {f"{key}|{encoding}": encoded}
+
+    def track(self, session):
+        """Invalida automaticamente lo que cambie por el ORM al hacer commit."""
+        @event.listens_for(session, "after_flush")
+        def collect(session, flush_context):
+            changed = session.info.setdefault("cache_changes", {})
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+                table = getattr(obj, "__tablename__", None)
+                if table in CACHED_TABLES:
+                    changed.setdefault(table, set()).add(obj.id)
+
+        @event.listens_for(session, "after_commit")
+        def invalidate(session):
+            for table, ids in session.info.pop("cache_changes", {}).items():
+                self.invalidate(table, ids)
+
+        @event.listens_for(session, "after_rollback")
+        def discard(session):
+            session.info.pop("cache_changes", None)
+
+
+def create_cache():
+    if os.getenv("CACHE_URL"):
+        backend = RedisBackend(os.getenv("CACHE_URL"))
+    else:
+        backend = MemoryBackend(int(os.getenv("CACHE_MAX_ENTRIES", 1024)))
+    return ResponseCache(backend, ttl=int(os.getenv("CACHE_TTL", 60)))
+
+
+response_cache = create_cache()
@@ -0,0 +1,162 @@
+"""
+Compresion de respuestas segun Accept-Encoding: zstd, br (brotli) o gzip,
+en ese orden de preferencia cuando el cliente acepta varios con la misma q.
+
+    COMPRESSION_ENABLED     0 la desactiva, p. ej. si un proxy ya comprime (1)
+    COMPRESSION_MIN_SIZE    bytes minimos para comprimir (1024); por debajo
+                            los headers y la CPU cuestan mas de lo que se ahorra
+    COMPRESSION_ENCODINGS   orden de preferencia ("zstd,br,gzip")
+    COMPRESSION_GZIP_LEVEL  (6)
+    COMPRESSION_BR_QUALITY  (4)
+    COMPRESSION_ZSTD_LEVEL  (3)
+
+gzip es de la stdlib; br necesita `pip install brotli` y zstd `pip install
+zstandard`, sin ellos no se ofrecen. Las respuestas en streaming (?limit=all)
+se comprimen de a chunk con un flush en cada uno, asi el cliente sigue
+recibiendo datos mientras se leen las filas. El cache de respuestas guarda
+la version comprimida de cada entrada (ver cache.py) y en los hits no se
+vuelve a comprimir. Los bytes y segundos de CPU por encoding quedan en
+/metrics y `flask bench compression` los compara con distintos niveles.
+"""
+import gzip
+import os
+import time
+import zlib
+from collections import namedtuple
+from flask import request
+from metrics import observe_compression
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional
+    zstandard = None
+
+ENABLED = os.getenv("COMPRESSION_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off", "")
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+LEVELS = {"gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)), "br": int(os.getenv("COMPRESSION_BR_QUALITY", 4)),
+          "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))}
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript", "application/xml",
+                "image/svg+xml")
+
+# compress(data, level) -> bytes; stream(level) -> (comprimir un chunk con flush, cerrar)
+Encoder = namedtuple("Encoder", ["name", "compress", "stream"])
+
+
+def _gzip_stream(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _brotli_stream(level):
+    compressor = brotli.Compressor(quality=level)
+    return (lambda data: compressor.process(data) + compressor.flush()), compressor.finish
+
+
+def _zstd_stream(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return ((lambda data: compressor.compress(data) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)),
+            compressor.flush)
+
+
+ENCODERS = {"gzip": Encoder("gzip", lambda data, level: gzip.compress(data, level, mtime=0), _gzip_stream)}
+if brotli is not None:
+    ENCODERS["br"] = Encoder("br", lambda data, level: brotli.compress(data, quality=level), _brotli_stream)
+if zstandard is not None:
+    ENCODERS["zstd"] = Encoder("zstd", lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+                               _zstd_stream)
+
+AVAILABLE = [name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")
+             if name.strip() in ENCODERS]
+
+
+def negotiate():
+    """Encoding para el request actual, o None para enviar sin comprimir."""
+    if not ENABLED:
+        return None
+    return request.accept_encodings.best_match(AVAILABLE)
+
+
+def compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE
+
+
+def compress(data, encoding, level=None):
+    started = time.perf_counter()
+    encoded = ENCODERS[encoding].compress(data, LEVELS[encoding] if level is None else level)
+    observe_compression(encoding, len(data), len(encoded), time.perf_counter() - started)
+    return encoded
+
+
+def _stream(iterable, encoding):
+    chunk, finish = ENCODERS[encoding].stream(LEVELS[encoding])
+    raw = sent = 0
+    seconds = 0.0
+    try:
+        for data in iterable:
+            if isinstance(data, str):
+                data = data.encode()
+            if not data:
+                continue
+            started = time.perf_counter()
+            encoded = chunk(data)
+            seconds += time.perf_counter() - started
+            raw += len(data)
+            sent += len(encoded)
+            yield encoded
+        tail = finish()
+        sent += len(tail)
+        yield tail
+        observe_compression(encoding, raw, sent, seconds)
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def mark_encoded(response, encoding):
+    """Headers de una respuesta cuyo body ya esta comprimido con encoding."""
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # otra representacion del mismo recurso: ETag debil, If-None-Match lo sigue aceptando
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compress_response(response, encoding=None):
+    """Comprime el body de la respuesta si conviene; se usa en after_request y en el cache."""
+    if not compressible(response) or response.direct_passthrough or response.status_code in (204, 206, 304):
+        return response
+    response.vary.add("Accept-Encoding")
+    if "Content-Encoding" in response.headers:
+        # ya viene comprimida (entrada del cache): solo faltan Vary y el ETag debil
+        if response.headers["Content-Encoding"] in ENCODERS:
+            mark_encoded(response, response.headers["Content-Encoding"])
+        return response
+    if "no-transform" in response.headers.get("Cache-Control", ""):
+        return response
+    encoding = encoding or negotiate()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+        return mark_encoded(response, encoding)
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    return mark_encoded(response, encoding)
+
+
+def setup_compression(app):
+    @app.after_request
+    def compress_after_request(response):
+        return compress_response(response)
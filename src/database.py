@@ -0,0 +1,81 @@
+"""
+Opciones del engine y del pool de conexiones segun variables de entorno,
+estadisticas del pool y limpieza despues del fork de gunicorn.
+
+    DB_POOL_SIZE          conexiones que se mantienen abiertas por worker (5)
+    DB_MAX_OVERFLOW       conexiones extra en picos (10)
+    DB_POOL_TIMEOUT       segundos esperando una conexion libre (30)
+    DB_POOL_RECYCLE       segundos antes de reemplazar una conexion (1800)
+    DB_POOL_PRE_PING      probar la conexion antes de usarla (true)
+    DB_POOLER=external    hay un pooler externo (PgBouncer en modo transaction):
+                          sin pool propio, cada checkout abre y cierra
+"""
+import os
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+
+def env_flag(name, default):
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def external_pooler():
+    return os.getenv("DB_POOLER", "").strip().lower() == "external"
+
+
+def engine_options(uri):
+    """Valor para SQLALCHEMY_ENGINE_OPTIONS."""
+    url = make_url(uri)
+    if external_pooler():
+        options = {"poolclass": NullPool}
+        # PgBouncer en modo transaction no conserva los prepared statements
+        # entre transacciones; psycopg2 no los usa, psycopg 3 y asyncpg si
+        if url.drivername == "postgresql+psycopg":
+            options["connect_args"] = {"prepare_threshold": None}
+        elif url.drivername == "postgresql+asyncpg":
+            options["connect_args"] = {"statement_cache_size": 0}
+        return options
+
+    options = {"pool_pre_ping": env_flag("DB_POOL_PRE_PING", "true"),
+               "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800))}
+    # SQLite en memoria usa un pool de una conexion por thread, sin tamano
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE", 5))
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", 10))
+        options["pool_timeout"] = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    return options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {"dialect": engine.dialect.name, "pool": type(pool).__name__,
+             "external_pooler": external_pooler()}
+    for name in ("size", "checkedin", "checkedout", "overflow", "timeout"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    stats["recycle"] = pool._recycle
+    stats["pre_ping"] = pool._pre_ping
+    return stats
+
+
+def check_database(engine):
+    """(ok, error) ejecutando un SELECT 1 con una conexion del pool."""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def dispose_after_fork(app, db):
+    """
+    Con preload_app el engine se crea en el proceso maestro: cada worker
+    descarta las conexiones heredadas (sin cerrarlas, son del maestro) y
+    abre las suyas.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
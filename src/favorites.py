@@ -0,0 +1,204 @@
+"""
+Consultas sobre las tablas de favoritos user_planet, user_character y user_vehicle.
+"""
+from sqlalchemy import JSON, Integer, cast, func, literal_column, null, select, tuple_, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from models import db, User, Planet, Character, Vehicle, user_planet, user_character, user_vehicle
+from serializers import public_columns
+from stats import count_favorite, recount
+from versions import touch
+
+# llave de la respuesta, tabla de asociacion, columna fk y modelo favorito
+FAVORITE_TABLES = (
+    ("fav_planets", user_planet, user_planet.c.planet_id, Planet),
+    ("fav_character", user_character, user_character.c.character_id, Character),
+    ("fav_vehicles", user_vehicle, user_vehicle.c.vehicle_id, Vehicle),
+)
+
+# operaciones de favoritos se identifican por la llave fk del body: planet_id, character_id, vehicle_id
+FAVORITE_BY_FK = {fk.name: (table, fk, model) for _, table, fk, model in FAVORITE_TABLES}
+
+MAX_BULK_OPERATIONS = 1000
+
+
+def _json_object(function, model):
+    """Arma el mismo objeto que model.serialize() pero dentro de la base de datos."""
+    args = []
+    for column in public_columns(model):
+        args.extend([literal_column(f"'{column.name}'"), column])
+    return function(*args, type_=JSON)
+
+
+def _favorites_postgresql(user_id):
+    """Un solo SELECT con json_agg por tabla; retorna None si el usuario no existe."""
+    lists = []
+    for key, table, fk, model in FAVORITE_TABLES:
+        obj = _json_object(func.json_build_object, model)
+        lists.append(
+            select(func.coalesce(func.json_agg(aggregate_order_by(obj, model.id)),
+                                 literal_column("'[]'::json"), type_=JSON))
+            .select_from(table.join(model, fk == model.id))
+            .where(table.c.user_id == user_id)
+            .scalar_subquery()
+            .label(key)
+        )
+    row = db.session.execute(select(User.id, *lists).where(User.id == user_id)).first()
+    if row is None:
+        return None
+    return {key: getattr(row, key) for key, _, _, _ in FAVORITE_TABLES}
+
+
+def _favorites_union(user_id):
+    """
+    Fallback para SQLite/MySQL: un solo UNION ALL con una fila por favorito
+    (json_object) mas una fila que confirma que el usuario existe. Ordenado
+    por id como el json_agg de PostgreSQL, asi el body (y el ETag) es estable.
+    """
+    branches = [select(literal_column("'user'").label("kind"), cast(null(), JSON).label("item"),
+                       cast(null(), Integer).label("id"))
+                .where(User.id == user_id)]
+    for key, table, fk, model in FAVORITE_TABLES:
+        branches.append(
+            select(literal_column(f"'{key}'").label("kind"),
+                   _json_object(func.json_object, model).label("item"), model.id.label("id"))
+            .select_from(table.join(model, fk == model.id))
+            .where(table.c.user_id == user_id)
+        )
+    favorites = {key: [] for key, _, _, _ in FAVORITE_TABLES}
+    found = False
+    stmt = union_all(*branches).order_by(literal_column("kind"), literal_column("id"))
+    for kind, item, _ in db.session.execute(stmt):
+        if kind == "user":
+            found = True
+        else:
+            favorites[kind].append(item)
+    return favorites if found else None
+
+
+def get_favorites(user_id):
+    """Los tres listados de favoritos del usuario en una sola consulta."""
+    if db.engine.dialect.name == "postgresql":
+        return _favorites_postgresql(user_id)
+    return _favorites_union(user_id)
+
+
+def _insert_ignore(table):
+    """INSERT multi-fila que ignora los favoritos que ya existen."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == "mysql":
+        return table.insert().prefix_with("IGNORE")
+    return table.insert()
+
+
+def _parse_operation(item):
+    """Retorna (op, fk_name, user_id, entity_id) o un mensaje de error."""
+    if not isinstance(item, dict):
+        return "Cada operacion debe ser un objeto"
+    op = item.get("op")
+    if op not in ("add", "delete"):
+        return "El campo 'op' debe ser 'add' o 'delete'"
+    keys = [key for key in FAVORITE_BY_FK if key in item]
+    if len(keys) != 1:
+        return "Se necesita uno de " + ", ".join(FAVORITE_BY_FK)
+    user_id = item.get("user_id")
+    entity_id = item.get(keys[0])
+    # bool es subclase de int: true no es el id 1
+    if any(isinstance(value, bool) or not isinstance(value, int) for value in (user_id, entity_id)):
+        return f"Los campos 'user_id' y '{keys[0]}' deben ser numeros"
+    return op, keys[0], user_id, entity_id
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+
+def apply_bulk(operations, owner=None):
+    """
+    Aplica una lista mixta de altas/bajas de favoritos en una sola transaccion:
+    un INSERT multi-fila y un DELETE por tabla. Si el mismo favorito aparece
+    varias veces gana la ultima operacion. Retorna un resultado por operacion;
+    con owner, las de otro usuario quedan "forbidden".
+    Sin RETURNING no se sabe que filas cambiaron: los contadores de esos
+    registros se recalculan al hacer commit y se sube la version de todos
+    los usuarios de la lista.
+    El caller hace commit/rollback.
+    """
+    results = [None] * len(operations)
+    latest = {}
+    for index, item in enumerate(operations):
+        parsed = _parse_operation(item)
+        if isinstance(parsed, str):
+            results[index] = {"index": index, "status": "invalid", "message": parsed}
+            continue
+        op, fk_name, user_id, entity_id = parsed
+        if owner is not None and user_id != owner:
+            results[index] = {"index": index, "status": "forbidden"}
+            continue
+        key = (fk_name, user_id, entity_id)
+        if key in latest:
+            results[latest[key][0]] = {"index": latest[key][0], "status": "superseded"}
+        latest[key] = (index, op)
+
+    # usuarios y entidades que existen, una consulta por modelo
+    users = _existing_ids(User, {user_id for _, user_id, _ in latest})
+    entities = {
+        fk_name: _existing_ids(model, {entity_id for fk, _, entity_id in latest if fk == fk_name})
+        for fk_name, (_, _, model) in FAVORITE_BY_FK.items()
+    }
+
+    dialect = db.engine.dialect
+    # usuarios con filas que cambiaron: solo a ellos se les sube la version (ETag y cache)
+    changed = set()
+    for fk_name, (table, fk, model) in FAVORITE_BY_FK.items():
+        kind = model.__tablename__
+        adds, deletes = {}, {}
+        for (key_fk, user_id, entity_id), (index, op) in latest.items():
+            if key_fk != fk_name:
+                continue
+            if user_id not in users or entity_id not in entities[fk_name]:
+                results[index] = {"index": index, "status": "not_found"}
+                continue
+            (adds if op == "add" else deletes)[(user_id, entity_id)] = index
+
+        if adds:
+            stmt = _insert_ignore(table).values(
+                [{"user_id": user_id, fk_name: entity_id} for user_id, entity_id in adds])
+            if dialect.insert_returning:
+                created = {tuple(row) for row in db.session.execute(stmt.returning(table.c.user_id, fk))}
+                for user_id, entity_id in created:
+                    count_favorite(kind, entity_id, 1)
+                    changed.add(user_id)
+                for pair, index in adds.items():
+                    results[index] = {"index": index, "status": "created" if pair in created else "exists"}
+            else:
+                db.session.execute(stmt)
+                recount(kind, {entity_id for _, entity_id in adds})
+                changed.update(user_id for user_id, _ in adds)
+                for index in adds.values():
+                    results[index] = {"index": index, "status": "applied"}
+
+        if deletes:
+            stmt = table.delete().where(tuple_(table.c.user_id, fk).in_(list(deletes)))
+            if dialect.delete_returning:
+                deleted = {tuple(row) for row in db.session.execute(stmt.returning(table.c.user_id, fk))}
+                for user_id, entity_id in deleted:
+                    count_favorite(kind, entity_id, -1)
+                    changed.add(user_id)
+                for pair, index in deletes.items():
+                    results[index] = {"index": index, "status": "deleted" if pair in deleted else "not_found"}
+            else:
+                db.session.execute(stmt)
+                recount(kind, {entity_id for _, entity_id in deletes})
+                changed.update(user_id for user_id, _ in deletes)
+                for index in deletes.values():
+                    results[index] = {"index": index, "status": "applied"}
+    if changed:
+        touch("favorites", *(f"favorites:{user_id}" for user_id in changed))
+    return results
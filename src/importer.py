@@ -0,0 +1,176 @@
+"""
+Importacion masiva de characters, planets y vehicles desde NDJSON o CSV.
+Se usa desde POST /import/<model> y desde `flask import-catalog`.
+
+    IMPORT_MAX_ROWS   filas por request en POST /import/<model> (50000); las
+                      que siguen no se leen y la respuesta es 413
+    IMPORT_MAX_BYTES  tamano maximo del body de POST /import/<model> (50 MiB)
+
+El CLI no tiene esos limites.
+"""
+import csv
+import io
+import json
+import os
+import time
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+from models import db, Character, Planet, Vehicle
+from cache import response_cache
+from versions import touch
+from search import SEARCH_TABLES, index_after
+from numeric import fill_shadows
+from validation import compile_validator
+
+IMPORT_MODELS = {"character": Character, "planet": Planet, "vehicle": Vehicle}
+
+DEFAULT_CHUNK_SIZE = 1000
+# cuantas filas rechazadas se devuelven con detalle (el total siempre se cuenta)
+MAX_REPORTED_REJECTS = 100
+MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 50000))
+MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def clean_row(model, raw):
+    """Valida una fila con el validador compilado del modelo (REQUIRED_FIELDS, tipos y largos)."""
+    if not isinstance(raw, dict):
+        return None, ["Fila invalida"]
+    row, errors = compile_validator(model).validate(raw)
+    if errors:
+        return row, [error["message"] for error in errors]
+    return fill_shadows(model, row), []
+
+
+def _existing_values(column, values):
+    if not values:
+        return set()
+    return set(db.session.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _copy_chunk(table, columns, rows):
+    """COPY ... FROM STDIN en PostgreSQL (psycopg2); False si el driver no lo soporta."""
+    cursor = db.session.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        return False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[name] for name in columns] for row in rows)
+    buffer.seek(0)
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    cursor.copy_expert(f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+    return True
+
+
+def _write_chunk(model, rows):
+    table = model.__table__
+    columns = [column.name for column in table.columns if column.name != "id"]
+    last_id = db.session.execute(select(func.max(model.id))).scalar() or 0
+    if db.engine.dialect.name != "postgresql" or not _copy_chunk(table, columns, rows):
+        # executemany: SQLAlchemy lo agrupa en INSERTs multi-fila
+        db.session.execute(insert(table), rows)
+    # la busqueda se actualiza en la misma transaccion que el lote
+    index_after(db.session.connection(), SEARCH_TABLES[table.name], last_id)
+    touch(table.name)
+    db.session.commit()
+
+
+def import_rows(model, records, chunk_size=DEFAULT_CHUNK_SIZE, max_rows=None):
+    """
+    Importa (line_number, dict) en lotes de chunk_size con un commit por lote.
+    Retorna un reporte con insertados, rechazados y filas por segundo. Con
+    max_rows se deja de leer despues de esa cantidad de filas (validas o no)
+    y el reporte lleva "truncated": true.
+    """
+    unique_columns = [column for column in model.__table__.columns if column.unique]
+    seen = {column.name: set() for column in unique_columns}
+    report = {"model": model.__tablename__, "inserted": 0, "rejected_count": 0, "rejected": []}
+    started = time.perf_counter()
+    last_id = db.session.execute(select(func.max(model.id))).scalar() or 0
+
+    def reject(line_number, errors):
+        report["rejected_count"] += 1
+        if len(report["rejected"]) < MAX_REPORTED_REJECTS:
+            report["rejected"].append({"line": line_number, "errors": errors})
+
+    def flush(chunk):
+        # duplicados contra la base de datos en una consulta por columna unica
+        for column in unique_columns:
+            existing = _existing_values(column, [row[column.name] for _, row in chunk])
+            if existing:
+                for line_number, row in chunk:
+                    if row[column.name] in existing:
+                        reject(line_number, [f"'{column.name}' ya existe: {row[column.name]}"])
+                chunk = [(line_number, row) for line_number, row in chunk if row[column.name] not in existing]
+        if chunk:
+            _write_chunk(model, [row for _, row in chunk])
+            report["inserted"] += len(chunk)
+
+    chunk = []
+    for count, (line_number, raw) in enumerate(records):
+        if max_rows is not None and count >= max_rows:
+            report["truncated"] = True
+            break
+        row, errors = clean_row(model, raw)
+        for column in unique_columns:
+            if not errors and row[column.name] in seen[column.name]:
+                errors.append(f"'{column.name}' repetido en el archivo: {row[column.name]}")
+        if errors:
+            reject(line_number, errors)
+            continue
+        for column in unique_columns:
+            seen[column.name].add(row[column.name])
+        chunk.append((line_number, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    if report["inserted"]:
+        # los INSERT/COPY no pasan por el ORM, se invalida el rango de ids nuevos
+        new_last_id = db.session.execute(select(func.max(model.id))).scalar() or 0
+        response_cache.invalidate(model.__tablename__, range(last_id + 1, new_last_id + 1))
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["inserted"] / elapsed) if elapsed else None
+    return report
+
+
+def read_records(stream, fmt):
+    return read_csv(stream) if fmt == "csv" else read_ndjson(stream)
+
+
+@click.command("import-catalog")
+@click.argument("model_name", type=click.Choice(sorted(IMPORT_MODELS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "csv"]), default=None,
+              help="Formato del archivo; por defecto segun la extension.")
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True)
+@with_appcontext
+def import_catalog_command(model_name, path, fmt, chunk_size):
+    """Importa characters, planets o vehicles desde un archivo NDJSON o CSV."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    with open(path, newline="", encoding="utf-8") as stream:
+        report = import_rows(IMPORT_MODELS[model_name], read_records(stream, fmt), chunk_size)
+    click.echo(f"{report['inserted']} insertados, {report['rejected_count']} rechazados "
+               f"en {report['elapsed_seconds']}s ({report['rows_per_second']} filas/s)")
+    for rejected in report["rejected"]:
+        click.echo(f"  linea {rejected['line']}: {'; '.join(rejected['errors'])}", err=True)
@@ -0,0 +1,146 @@
+"""
+Conteo y tiempo de las queries SQL de cada request usando los eventos del
+engine de `db`. Cada respuesta lleva un header Server-Timing y se acumula un
+reporte por endpoint (GET /debug/queries, solo con FLASK_DEBUG=1 u
+OPS_ENDPOINTS=1: muestra el SQL de toda la app).
+
+Las queries que corren mientras se envia una respuesta en streaming
+(?limit=all) ocurren despues de armar los headers y no se cuentan.
+"""
+import os
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+# mismo statement repetido estas veces en un request = probable N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 200))
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestQueries:
+    __slots__ = ("count", "duration", "slowest", "slowest_duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = None
+        self.slowest_duration = 0.0
+        self.shapes = {}
+
+    def add(self, statement, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        if elapsed > self.slowest_duration:
+            self.slowest, self.slowest_duration = statement, elapsed
+        # los parametros van aparte, el texto del statement ya es su "forma"
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self):
+        """(statement, veces) del statement mas repetido si pasa el umbral de N+1."""
+        if not self.shapes:
+            return None
+        statement, times = max(self.shapes.items(), key=lambda item: item[1])
+        return (statement, times) if times >= N_PLUS_ONE_THRESHOLD else None
+
+
+class QueryReport:
+    """Acumulado por endpoint; un lock corto por request."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, queries, total):
+        repeated = queries.repeated()
+        with self.lock:
+            data = self.endpoints.get(endpoint)
+            if data is None:
+                data = self.endpoints[endpoint] = {
+                    "requests": 0, "queries": 0, "db_seconds": 0.0, "total_seconds": 0.0,
+                    "max_queries": 0, "n_plus_one_requests": 0, "n_plus_one_statement": None,
+                    "slowest_ms": 0.0, "slowest_statement": None}
+            data["requests"] += 1
+            data["queries"] += queries.count
+            data["db_seconds"] += queries.duration
+            data["total_seconds"] += total
+            data["max_queries"] = max(data["max_queries"], queries.count)
+            if repeated:
+                data["n_plus_one_requests"] += 1
+                data["n_plus_one_statement"] = repeated[0][:MAX_STATEMENT_LENGTH]
+            if queries.slowest_duration * 1000 > data["slowest_ms"]:
+                data["slowest_ms"] = round(queries.slowest_duration * 1000, 3)
+                data["slowest_statement"] = queries.slowest[:MAX_STATEMENT_LENGTH]
+
+    def summary(self):
+        with self.lock:
+            items = [(endpoint, dict(data)) for endpoint, data in self.endpoints.items()]
+        report = {}
+        for endpoint, data in sorted(items, key=lambda item: item[1]["db_seconds"], reverse=True):
+            requests = data.pop("requests")
+            db_seconds = data.pop("db_seconds")
+            total_seconds = data.pop("total_seconds")
+            report[endpoint] = {
+                "requests": requests,
+                "queries_per_request": round(data.pop("queries") / requests, 2),
+                "avg_db_ms": round(db_seconds / requests * 1000, 3),
+                "avg_total_ms": round(total_seconds / requests * 1000, 3),
+                **data,
+            }
+        return report
+
+
+query_report = QueryReport()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    if has_request_context():
+        queries = g.get("sql_queries")
+        if queries is not None:
+            queries.add(statement, elapsed)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                current_app.logger.warning("query lenta (%.1f ms) en %s: %s", elapsed * 1000,
+                                           request.endpoint, statement[:MAX_STATEMENT_LENGTH])
+
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def setup_instrumentation(app):
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_queries():
+        g.sql_queries = RequestQueries()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def server_timing(response):
+        queries = g.pop("sql_queries", None)
+        if queries is None:
+            return response
+        total = time.perf_counter() - g.request_started
+        timing = [f'db;dur={queries.duration * 1000:.2f};desc="{queries.count} queries"',
+                  f"total;dur={total * 1000:.2f}"]
+        repeated = queries.repeated()
+        if repeated:
+            timing.append(f'nplusone;desc="{repeated[1]}x mismo statement"')
+        response.headers.add("Server-Timing", ", ".join(timing))
+        if request.endpoint:
+            query_report.record(request.endpoint, queries, total)
+        return response
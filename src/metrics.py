@@ -0,0 +1,119 @@
+"""
+Metricas estilo Prometheus en GET /metrics: requests, latencias, requests en
+curso, errores, uso del pool de conexiones, cache y compresion.
+
+Necesita `pip install prometheus_client`; sin el las metricas no se registran
+y /metrics responde 503. Con varios workers de gunicorn se define
+PROMETHEUS_MULTIPROC_DIR (un directorio compartido) y cada worker escribe sus
+valores ahi; gunicorn.conf.py limpia el directorio y marca los workers muertos.
+"""
+import os
+import time
+from flask import Response, g, request
+from sqlalchemy import event
+from models import db
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # prometheus_client es opcional
+    Counter = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if Counter is not None:
+    REQUESTS = Counter("http_requests_total", "Requests por ruta, metodo y status",
+                       ["method", "endpoint", "status"])
+    LATENCY = Histogram("http_request_duration_seconds", "Latencia por ruta",
+                        ["method", "endpoint"], buckets=LATENCY_BUCKETS)
+    IN_PROGRESS = Gauge("http_requests_in_progress", "Requests en curso",
+                        ["method", "endpoint"], multiprocess_mode="livesum")
+    EXCEPTIONS = Counter("http_request_exceptions_total", "Excepciones no manejadas por ruta y clase",
+                         ["endpoint", "exception"])
+    POOL_IN_USE = Gauge("db_pool_connections_in_use", "Conexiones del pool en uso",
+                        multiprocess_mode="livesum")
+    POOL_SIZE = Gauge("db_pool_size", "Tamano configurado del pool", multiprocess_mode="livesum")
+    CACHE = Counter("response_cache_requests_total", "Lecturas del cache de respuestas", ["result"])
+    CACHE_EVICTIONS = Counter("response_cache_evictions_total", "Entradas expulsadas del cache")
+    RATE_LIMITED = Counter("http_rate_limited_total", "Requests rechazados con 429 por ruta", ["endpoint"])
+    COMPRESSION_BYTES = Counter("response_compression_bytes_total",
+                                "Bytes de respuestas comprimidas antes (in) y despues (out)", ["encoding", "direction"])
+    COMPRESSION_SECONDS = Counter("response_compression_seconds_total", "Tiempo comprimiendo respuestas",
+                                  ["encoding"])
+
+
+def observe_cache(result, count=1):
+    """result: "hit" o "miss"; count para las lecturas de varios registros."""
+    if Counter is not None and count:
+        CACHE.labels(result).inc(count)
+
+
+def observe_eviction():
+    if Counter is not None:
+        CACHE_EVICTIONS.inc()
+
+
+def observe_rate_limited(endpoint):
+    if Counter is not None:
+        RATE_LIMITED.labels(endpoint).inc()
+
+
+def observe_compression(encoding, raw, encoded, seconds):
+    if Counter is not None:
+        COMPRESSION_BYTES.labels(encoding, "in").inc(raw)
+        COMPRESSION_BYTES.labels(encoding, "out").inc(encoded)
+        COMPRESSION_SECONDS.labels(encoding).inc(seconds)
+
+
+def _endpoint():
+    # request.endpoint es None para 404, asi la cardinalidad queda acotada
+    return request.endpoint or "unmatched"
+
+
+def setup_metrics(app):
+    if Counter is None:
+        @app.route("/metrics", methods=["GET"])
+        def metrics_unavailable():
+            return Response("prometheus_client no esta instalado\n", status=503, mimetype="text/plain")
+        return
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        size = getattr(engine.pool, "size", None)
+        if callable(size):
+            POOL_SIZE.inc(size())
+        event.listen(engine, "checkout", lambda *args: POOL_IN_USE.inc())
+        event.listen(engine, "checkin", lambda *args: POOL_IN_USE.dec())
+
+    @app.before_request
+    def start_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_gauge = IN_PROGRESS.labels(request.method, _endpoint())
+        g.metrics_gauge.inc()
+
+    @app.after_request
+    def record_metrics(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            endpoint = _endpoint()
+            LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+            REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def finish_metrics(exc):
+        gauge = g.pop("metrics_gauge", None)
+        if gauge is not None:
+            gauge.dec()
+        if exc is not None:
+            EXCEPTIONS.labels(_endpoint(), type(exc).__name__).inc()
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
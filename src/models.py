@@ -1,30 +1,92 @@
 from flask_sqlalchemy import SQLAlchemy
 #from sqlalchemy import String, Boolean
 #from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Boolean, Column, ForeignKey, Table, Integer, Float
+from sqlalchemy import String, Boolean, Column, ForeignKey, Index, Table, Integer, Float, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from serializers import compile_schema
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
+# tablas de favoritos: la PK (user_id, <x>_id) resuelve los favoritos de un
+# usuario y el indice inverso (<x>_id, user_id) "quien tiene X de favorito" y
+# el borrado de las filas de un registro del catalogo
 user_character = Table(
     "user_character",
     db.metadata,  
     Column("user_id", ForeignKey("user.id"), primary_key=True),
-    Column("character_id", ForeignKey("character.id"), primary_key=True)
+    Column("character_id", ForeignKey("character.id"), primary_key=True),
+    Index("ix_user_character_character_id", "character_id", "user_id")
 )
 
 user_planet = Table(
     "user_planet",
     db.metadata,
     Column("user_id", ForeignKey("user.id"), primary_key=True),
-    Column("planet_id", ForeignKey("planet.id"), primary_key=True)
+    Column("planet_id", ForeignKey("planet.id"), primary_key=True),
+    Index("ix_user_planet_planet_id", "planet_id", "user_id")
 )
 
 user_vehicle = Table(
     "user_vehicle",
     db.metadata,
     Column("user_id", ForeignKey("user.id"), primary_key=True),
-    Column("vehicle_id", ForeignKey("vehicle.id"), primary_key=True)
+    Column("vehicle_id", ForeignKey("vehicle.id"), primary_key=True),
+    Index("ix_user_vehicle_vehicle_id", "vehicle_id", "user_id")
+)
+
+def filter_index(table, column):
+    """
+    Indice para los filtros de los listados (?column=valor y ?column=prefijo*).
+    Incluye id porque el listado ordena y pagina por id; en PostgreSQL usa
+    varchar_pattern_ops para que el LIKE 'prefijo%' tambien lo use.
+    """
+    return Index(f"ix_{table}_{column}", column, "id", postgresql_ops={column: "varchar_pattern_ops"})
+
+
+def shadow_column(source):
+    """
+    Copia numerica (Float) de una columna de texto como diameter o population,
+    para filtrar por rango y ordenar; la llena numeric.py al escribir.
+    """
+    return mapped_column(Float, nullable=True, info={"shadow_of": source})
+
+
+def range_index(table, column):
+    """Indice para ?min_/?max_ y ?sort= sobre una columna espejo; id desempata el orden."""
+    return Index(f"ix_{table}_{column}", column, "id")
+
+
+# version por tabla ("planet") o por usuario ("favorites:3"), la suben los commits
+# que modifican esos datos y se usa para los ETag / Last-Modified de las rutas GET
+data_version = Table(
+    "data_version",
+    db.metadata,
+    Column("tag", String(50), primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("updated_at", DateTime, nullable=False)
+)
+
+# cantidad de usuarios que tienen cada character/planet/vehicle de favorito;
+# la mantiene stats.py en el mismo commit que cambia user_character/user_planet/user_vehicle
+favorite_count = Table(
+    "favorite_count",
+    db.metadata,
+    Column("kind", String(20), primary_key=True),
+    Column("ref_id", Integer, primary_key=True),
+    Column("favorites", Integer, nullable=False),
+    # ranking por tipo: ORDER BY favorites DESC, ref_id DESC recorre el indice al reves
+    Index("ix_favorite_count_kind_favorites", "kind", "favorites", "ref_id")
+)
+
+# tokens de /logout que todavia no vencieron; auth.py los lee en segundo plano
+# (expires_at en segundos epoch, como el exp del token)
+revoked_token = Table(
+    "revoked_token",
+    db.metadata,
+    Column("jti", String(32), primary_key=True),
+    Column("expires_at", Integer, nullable=False),
+    Index("ix_revoked_token_expires_at", "expires_at")
 )
 
 class User(db.Model):
@@ -34,9 +96,12 @@ class User(db.Model):
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     phone: Mapped[str] = mapped_column(String(30), nullable=True)
     email: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
-    password: Mapped[str] = mapped_column(nullable=False)
+    # scrypt$ln=..,r=..,p=..$<salt>$<hash> ocupa 87 caracteres; 255 deja margen para subir el costo
+    password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean(), nullable=False)
 
+    __table_args__ = (filter_index("user", "name"), filter_index("user", "last_name"))
+
     planets: Mapped[list["Planet"]] = relationship("Planet", secondary=user_planet, back_populates="users")
     
     
@@ -44,19 +109,24 @@ class User(db.Model):
     
     vehicles: Mapped[list["Vehicle"]] = relationship("Vehicle", secondary=user_vehicle, back_populates="users")
 
-    def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "last_name": self.last_name,
-            "phone": self.phone,
-            "email": self.email,
-            "is_active": self.is_active,
-            "planets": [planet.serialize() for planet in self.planets],
-            "characters": [character.serialize() for character in self.characters],
-            "vehicles": [vehicle.serialize() for vehicle in self.vehicles],
-            # do not serialize the password, its a security breach
-        }
+    # relaciones de favoritos que se pueden expandir con ?expand=
+    RELATIONS = ("planets", "characters", "vehicles")
+
+    # campos que exige POST /user
+    REQUIRED_FIELDS = ("name", "last_name", "phone", "email", "password", "is_active")
+
+    # se guardan hasheados: el largo de la columna es el del hash, no el del valor recibido
+    HASHED_FIELDS = ("password",)
+
+    # lo que GET /user muestra de otros usuarios: sin email, telefono ni favoritos
+    DIRECTORY_FIELDS = ("id", "name", "last_name", "is_active")
+
+    def serialize(self, expand=RELATIONS):
+        data = compile_schema(User).from_object(self)
+        # do not serialize the password, its a security breach (compile_schema never includes it)
+        for relation in expand:
+            data[relation] = [item.serialize() for item in getattr(self, relation)]
+        return data
 
 
 class Character(db.Model):
@@ -71,27 +141,21 @@ class Character(db.Model):
     skin_color: Mapped[str] = mapped_column(String(30), nullable=True)
     gender: Mapped[str] = mapped_column(String(30), nullable=True)
     mass: Mapped[str] = mapped_column(String(30), nullable=True)
+    mass_num: Mapped[float] = shadow_column("mass")
     homeworld: Mapped[str] = mapped_column(String(50), nullable=True)
     birth_year: Mapped[str] = mapped_column(String(30), nullable=True)
     description: Mapped[str] = mapped_column(String(100), nullable=True)
     users: Mapped[list["User"]] = relationship("User", secondary=user_character, back_populates="characters")
 
+    __table_args__ = (filter_index("character", "name"), filter_index("character", "gender"),
+                      filter_index("character", "homeworld"), range_index("character", "mass_num"))
+
+    # campos que exigen /add_character y la importacion masiva
+    REQUIRED_FIELDS = ("name", "age", "height", "weight", "eye_color", "hair_color", "skin_color",
+                       "gender", "mass", "homeworld", "birth_year", "description")
+
     def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "height": self.height,
-            "weight": self.weight,
-            "eye_color": self.eye_color,
-            "hair_color": self.hair_color,
-            "skin_color": self.skin_color,
-            "gender": self.gender,
-            "mass": self.mass,
-            "homeworld": self.homeworld,
-            "birth_year": self.birth_year,
-            "description": self.description,
-        }
+        return compile_schema(Character).from_object(self)
 
 class Planet(db.Model):
     __tablename__ = "planet"
@@ -106,22 +170,24 @@ class Planet(db.Model):
     orbital_period: Mapped[str] = mapped_column(String(30), nullable=True)
     population: Mapped[str] = mapped_column(String(30), nullable=True)
     description: Mapped[str] = mapped_column(String(30), nullable=True)
+    surface_water_num: Mapped[float] = shadow_column("surface_water")
+    diameter_num: Mapped[float] = shadow_column("diameter")
+    rotation_period_num: Mapped[float] = shadow_column("rotation_period")
+    orbital_period_num: Mapped[float] = shadow_column("orbital_period")
+    population_num: Mapped[float] = shadow_column("population")
     users: Mapped[list["User"]] = relationship("User", secondary=user_planet, back_populates="planets")
 
+    __table_args__ = (filter_index("planet", "name"), filter_index("planet", "climate"),
+                      filter_index("planet", "terrain"), range_index("planet", "surface_water_num"),
+                      range_index("planet", "diameter_num"), range_index("planet", "rotation_period_num"),
+                      range_index("planet", "orbital_period_num"), range_index("planet", "population_num"))
+
+    # campos que exigen /add_planet y la importacion masiva
+    REQUIRED_FIELDS = ("name", "climate", "surface_water", "diameter", "rotation_period", "terrain",
+                       "gravity", "orbital_period", "population", "description")
+
     def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "climate": self.climate,
-            "surface_water": self.surface_water,
-            "diameter": self.diameter,
-            "rotation_period": self.rotation_period,
-            "terrain": self.terrain,
-            "gravity": self.gravity,
-            "orbital_period": self.orbital_period,
-            "population": self.population,
-            "description": self.description
-        }
+        return compile_schema(Planet).from_object(self)
     
 class Vehicle(db.Model):
     __tablename__ = "vehicle"
@@ -138,22 +204,24 @@ class Vehicle(db.Model):
     manufactured: Mapped[str] = mapped_column(String(30), nullable=True)
     vehicle_class: Mapped[str] = mapped_column(String(30), nullable=True)
     description: Mapped[str] = mapped_column(String(100), nullable=True)
+    cargo_capacity_num: Mapped[float] = shadow_column("cargo_capacity")
+    max_atmosphering_speed_num: Mapped[float] = shadow_column("max_atmosphering_speed")
+    crew_num: Mapped[float] = shadow_column("crew")
+    length_num: Mapped[float] = shadow_column("length")
+    cost_in_credits_num: Mapped[float] = shadow_column("cost_in_credits")
     users: Mapped[list["User"]] = relationship("User", secondary=user_vehicle, back_populates="vehicles")
 
+    # name ya tiene el indice del unique
+    __table_args__ = (filter_index("vehicle", "vehicle_class"), filter_index("vehicle", "model"),
+                      range_index("vehicle", "cargo_capacity_num"),
+                      range_index("vehicle", "max_atmosphering_speed_num"), range_index("vehicle", "crew_num"),
+                      range_index("vehicle", "length_num"), range_index("vehicle", "cost_in_credits_num"))
+
+    # campos que exigen /add_vehicle y la importacion masiva
+    REQUIRED_FIELDS = ("name", "consumables", "cargo_capacity", "passenger", "max_atmosphering_speed",
+                       "crew", "length", "model", "cost_in_credits", "manufactured", "vehicle_class",
+                       "description")
+
     def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "consumables": self.consumables,
-            "cargo_capacity": self.cargo_capacity,
-            "passenger": self.passenger,
-            "max_atmosphering_speed": self.max_atmosphering_speed,
-            "crew": self.crew,
-            "length": self.length,
-            "model": self.model,
-            "cost_in_credits": self.cost_in_credits,
-            "manufactured": self.manufactured,
-            "vehicle_class": self.vehicle_class,
-            "description": self.description,
-        }
+        return compile_schema(Vehicle).from_object(self)
     
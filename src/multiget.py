@@ -0,0 +1,73 @@
+"""
+Lectura por id de characters, planets y vehicles: un registro (get_one_*) o
+varios con ?ids=1,2,3 (get_many_*). Ambas usan las mismas entradas de cache
+por registro y los que faltan se leen con un solo SELECT ... IN.
+"""
+from flask import Response, current_app
+from sqlalchemy import inspect, select
+from models import db
+from cache import response_cache
+from serializers import compile_schema
+from utils import APIException
+
+MAX_IDS = 100
+
+
+def parse_ids(args):
+    raw = args.get("ids")
+    if not raw:
+        raise APIException("El parametro 'ids' es requerido", status_code=400)
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise APIException("El parametro 'ids' debe ser una lista de numeros separados por coma", status_code=400)
+    if not ids:
+        raise APIException("El parametro 'ids' es requerido", status_code=400)
+    if len(ids) > MAX_IDS:
+        raise APIException(f"Maximo {MAX_IDS} ids por request", status_code=400)
+    return ids
+
+
+def _load(model, ids):
+    """Objetos por id: los que ya estan en el identity map de la sesion y el resto con un IN."""
+    found, missing = {}, []
+    for id in ids:
+        obj = db.session.identity_map.get(db.session.identity_key(model, id))
+        if obj is not None and not inspect(obj).expired:
+            found[id] = obj
+        else:
+            missing.append(id)
+    if missing:
+        for obj in db.session.scalars(select(model).where(model.id.in_(missing))):
+            found[obj.id] = obj
+    return found
+
+
+def load_items(model, ids):
+    """JSON (bytes) de cada id en el orden pedido; None para los que no existen."""
+    table = model.__tablename__
+    unique = list(dict.fromkeys(ids))
+    items, versions = response_cache.get_records(table, unique)
+    missing = [id for id in unique if id not in items]
+    if missing:
+        schema = compile_schema(model)
+        dumps = current_app.json.dumps
+        fresh = {id: dumps(schema.from_object(obj)).encode() for id, obj in _load(model, missing).items()}
+        response_cache.set_records(table, fresh, versions)
+        items.update(fresh)
+    return [items.get(id) for id in ids]
+
+
+def item_response(key, item):
+    """{"<key>": item} armado con el JSON ya serializado del registro."""
+    return Response(b'{"' + key.encode() + b'":' + item + b"}\n", mimetype="application/json")
+
+
+def items_response(ids, items):
+    """
+    {"missing": [ids que no existen], "results": [...]} con un resultado por
+    id pedido, en el mismo orden, y null donde no existe.
+    """
+    missing = current_app.json.dumps([id for id, item in zip(ids, items) if item is None]).encode()
+    results = b",".join(b"null" if item is None else item for item in items)
+    return Response(b'{"missing":' + missing + b',"results":[' + results + b"]}\n", mimetype="application/json")
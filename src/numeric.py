@@ -0,0 +1,45 @@
+"""
+Columnas numericas espejo (diameter_num, population_num, ...): se llenan al
+insertar o actualizar por el ORM y en la importacion masiva, a partir de la
+columna de texto original ("1,000" -> 1000.0, "unknown" -> NULL).
+"""
+import re
+from functools import lru_cache
+from sqlalchemy import event
+from models import Character, Planet, Vehicle
+
+NUMBER = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def parse_number(value):
+    """Float del texto o None si no es un numero ("unknown", "n/a", "30-165", "")."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(",", "").replace(" ", "")
+    return float(text) if NUMBER.fullmatch(text) else None
+
+
+@lru_cache(maxsize=None)
+def shadow_columns(model):
+    """{columna de texto: columna espejo} del modelo."""
+    return {column.info["shadow_of"]: column.name
+            for column in model.__table__.columns if "shadow_of" in column.info}
+
+
+def fill_shadows(model, row):
+    """Completa las columnas espejo en un dict de columnas (INSERT sin ORM)."""
+    for source, shadow in shadow_columns(model).items():
+        row[shadow] = parse_number(row.get(source))
+    return row
+
+
+def _sync(mapper, connection, target):
+    for source, shadow in shadow_columns(type(target)).items():
+        setattr(target, shadow, parse_number(getattr(target, source)))
+
+
+for _model in (Character, Planet, Vehicle):
+    event.listen(_model, "before_insert", _sync)
+    event.listen(_model, "before_update", _sync)
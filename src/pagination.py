@@ -0,0 +1,279 @@
+"""
+Paginacion por cursor (keyset sobre id), proyeccion de campos y filtros
+para las rutas que listan modelos completos.
+"""
+import base64
+import json
+import operator
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+from models import db
+from serializers import compile_schema, public_columns
+from numeric import parse_number, shadow_columns
+from utils import APIException
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+STREAM_BATCH = 500
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def encode_cursor(values):
+    """Convierte los valores de la ultima fila en un cursor opaco para el cliente."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise APIException("Cursor invalido, verifique", status_code=400)
+
+
+def parse_limit(args):
+    limit = args.get("limit", DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise APIException("El parametro 'limit' debe ser un numero", status_code=400)
+    if limit < 1:
+        raise APIException("El parametro 'limit' debe ser mayor a 0", status_code=400)
+    return min(limit, MAX_LIMIT)
+
+
+def parse_fields(model, args):
+    """Lee ?fields=name,climate y retorna la tupla de campos (id siempre incluido)."""
+    fields = args.get("fields")
+    if not fields:
+        return None
+    available = {column.name: column for column in public_columns(model)}
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise APIException("Campos no validos", status_code=400,
+                           payload={"invalid_fields": unknown})
+    if "id" not in names:
+        names.insert(0, "id")
+    return tuple(dict.fromkeys(names))
+
+
+def parse_expand(model, args):
+    """
+    Lee ?expand=planets,vehicles y retorna las relaciones a incluir.
+    Sin el parametro se incluyen todas; ?expand= o ?expand=none no incluye ninguna.
+    """
+    expand = args.get("expand")
+    if expand is None:
+        return model.RELATIONS
+    names = [name.strip() for name in expand.split(",") if name.strip() and name.strip() != "none"]
+    unknown = [name for name in names if name not in model.RELATIONS]
+    if unknown:
+        raise APIException("Relaciones no validas", status_code=400,
+                           payload={"invalid_expand": unknown})
+    return tuple(dict.fromkeys(names))
+
+
+def expand_options(model, expand):
+    """Carga cada relacion con un solo SELECT ... IN por pagina, no uno por fila."""
+    return [selectinload(getattr(model, relation)) for relation in expand]
+
+
+def apply_filters(stmt, model, args, filter_fields):
+    """
+    Filtros de igualdad sobre columnas indexadas: ?climate=arid
+    Un '*' al final hace busqueda por prefijo: ?name=Tato*
+    """
+    for name in filter_fields:
+        value = args.get(name)
+        if value is None or value == "":
+            continue
+        column = model.__table__.c[name]
+        if value.endswith("*"):
+            stmt = stmt.where(column.startswith(value[:-1], autoescape=True))
+        else:
+            stmt = stmt.where(column == value)
+    return stmt
+
+
+def apply_ranges(stmt, model, args):
+    """?min_population=1000&max_diameter=12000 sobre las columnas numericas espejo."""
+    for name, shadow in shadow_columns(model).items():
+        for prefix, compare in (("min_", operator.ge), ("max_", operator.le)):
+            value = args.get(prefix + name)
+            if value is None or value == "":
+                continue
+            number = parse_number(value)
+            if number is None:
+                raise APIException(f"El parametro '{prefix}{name}' debe ser un numero", status_code=400)
+            stmt = stmt.where(compare(model.__table__.c[shadow], number))
+    return stmt
+
+
+def parse_sort(model, args):
+    """
+    Lee ?sort=population o ?sort=-population (descendente) y retorna
+    (columna espejo, descendente) o None. Los valores desconocidos van al final.
+    """
+    sort = args.get("sort")
+    if not sort:
+        return None
+    name = sort[1:] if sort.startswith("-") else sort
+    shadows = shadow_columns(model)
+    if name not in shadows:
+        raise APIException("Orden no valido", status_code=400,
+                           payload={"invalid_sort": sort, "sortable": sorted(shadows)})
+    return model.__table__.c[shadows[name]], sort.startswith("-")
+
+
+def parse_cursor(args, sort):
+    """Sin sort el cursor es el ultimo id; con sort es [valor o None, id]."""
+    cursor = args.get("cursor")
+    if not cursor:
+        return None
+    last = decode_cursor(cursor)
+    if sort is None:
+        valid = isinstance(last, int)
+    else:
+        valid = (isinstance(last, list) and len(last) == 2 and isinstance(last[1], int)
+                 and (last[0] is None or isinstance(last[0], (int, float))))
+    if not valid:
+        raise APIException("Cursor invalido, verifique", status_code=400)
+    return last
+
+
+def keyset(model, sort, last):
+    """
+    (condiciones, orden) de las filas despues de `last`. Con sort primero se
+    recorren los valores conocidos usando el indice (columna, id) y despues
+    los NULL por id, en dos consultas separadas.
+    """
+    if sort is None:
+        return ([model.id > last] if last is not None else []), [model.id]
+    column, descending = sort
+    after = operator.lt if descending else operator.gt
+    order = [model.id.desc()] if descending else [model.id]
+    if last is not None and last[0] is None:
+        # [None, None] es el comienzo de los NULL
+        where = [column.is_(None)]
+        if last[1] is not None:
+            where.append(after(model.id, last[1]))
+        return where, order
+    where = [column.is_not(None)]
+    if last is not None:
+        where.append(after(tuple_(column, model.id), tuple_(*last)))
+    return where, [column.desc() if descending else column] + order
+
+
+def base_query(model, args, filter_fields=(), options=(), orm=False):
+    """
+    SELECT con proyeccion y filtros, sin cursor ni orden; retorna (stmt, schema, sort).
+    Se leen solo columnas y se serializa con el schema compilado; con orm=True
+    (y sin ?fields=) se cargan objetos con las options y schema es None. Con
+    ?sort= la columna espejo va al final de cada fila para armar el cursor.
+    """
+    fields = parse_fields(model, args)
+    sort = parse_sort(model, args)
+    if orm and fields is None:
+        schema = None
+        stmt = select(model).options(*options)
+    else:
+        schema = compile_schema(model, fields)
+        stmt = select(*schema.columns)
+        if sort is not None:
+            stmt = stmt.add_columns(sort[0])
+    stmt = apply_filters(stmt, model, args, filter_fields)
+    return apply_ranges(stmt, model, args), schema, sort
+
+
+def build_query(model, args, filter_fields=(), options=(), orm=False):
+    """La coleccion completa desde el cursor en una sola consulta; retorna (stmt, schema)."""
+    stmt, schema, sort = base_query(model, args, filter_fields, options, orm)
+    last = parse_cursor(args, sort)
+    where, order = keyset(model, sort, last)
+    if sort is not None and (last is None or last[0] is not None):
+        # valores conocidos despues del cursor y luego todos los NULL
+        column, descending = sort
+        known = where[1:]
+        where = [column.is_(None) | known[0]] if known else []
+        order[0] = order[0].nulls_last()
+    return stmt.where(*where).order_by(*order), schema
+
+
+def paginate(model, args, filter_fields=(), options=(), serializer=None):
+    """
+    Retorna (items, next_cursor) usando keyset sobre id (o sobre la columna de
+    ?sort= e id), nunca OFFSET.
+    Solo se pasa serializer cuando hacen falta objetos del ORM (relaciones),
+    si no las filas se serializan directo con el schema del modelo.
+    """
+    limit = parse_limit(args)
+    stmt, schema, sort = base_query(model, args, filter_fields, options, orm=serializer is not None)
+    last = parse_cursor(args, sort)
+
+    def fetch(last, count):
+        where, order = keyset(model, sort, last)
+        page = stmt.where(*where).order_by(*order).limit(count)
+        return db.session.execute(page).all() if schema else db.session.execute(page).scalars().all()
+
+    rows = fetch(last, limit + 1)
+    if sort is not None and len(rows) <= limit and (last is None or last[0] is not None):
+        # se terminaron los valores conocidos, la pagina sigue con los NULL
+        rows += fetch([None, None], limit + 1 - len(rows))
+    if schema:
+        items = [schema.from_row(row) for row in rows[:limit]]
+    else:
+        items = [serializer(row) for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        items = items[:limit]
+        if sort is None:
+            next_cursor = encode_cursor(items[-1]["id"])
+        else:
+            row = rows[limit - 1]
+            value = row[-1] if schema else getattr(row, sort[0].key)
+            next_cursor = encode_cursor([value, items[-1]["id"]])
+    return items, next_cursor
+
+
+def wants_stream(args):
+    """?limit=all pide la coleccion completa como stream en vez de una pagina."""
+    return args.get("limit") == "all"
+
+
+def stream_response(model, args, filter_fields=(), options=(), serializer=None):
+    """
+    Envia toda la coleccion leyendo de a STREAM_BATCH filas (cursor del servidor
+    en PostgreSQL), asi la memoria del worker no depende del tamano de la tabla.
+    Con Accept: application/x-ndjson se envia un objeto por linea, si no un array JSON.
+    """
+    stmt, schema = build_query(model, args, filter_fields, options, orm=serializer is not None)
+    stmt = stmt.execution_options(yield_per=STREAM_BATCH)
+    ndjson = request.accept_mimetypes.best_match(
+        ["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+    if schema:
+        serializer = schema.from_row
+    dumps = current_app.json.dumps
+
+    def generate():
+        result = db.session.execute(stmt)
+        batches = result.partitions() if schema else result.scalars().partitions()
+        first = True
+        if not ndjson:
+            yield "["
+        for batch in batches:
+            items = [serializer(row) for row in batch]
+            if ndjson:
+                yield "".join(dumps(item) + "\n" for item in items)
+            else:
+                chunk = ",".join(dumps(item) for item in items)
+                yield chunk if first else "," + chunk
+                first = False
+        if not ndjson:
+            yield "]"
+
+    mimetype = NDJSON_MIMETYPE if ndjson else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,181 @@
+"""
+Hash de passwords con scrypt (hashlib, sin dependencias). El calculo corre en
+un pool de procesos acotado, asi un hash de ~100 ms no ocupa el worker de
+gunicorn ni el GIL de los demas threads.
+
+    PASSWORD_SCRYPT_LN      log2 de N, el costo de CPU y memoria (15: 32 MiB)
+    PASSWORD_SCRYPT_R       tamano de bloque (8)
+    PASSWORD_SCRYPT_P       paralelismo (1)
+    PASSWORD_WORKERS        procesos del pool por worker de gunicorn (cantidad
+                            de CPUs); 0 calcula en el mismo thread del request
+    PASSWORD_MAX_PENDING    hashes en curso o en cola por worker (4 x workers);
+                            los que no entran reciben 503 en lugar de esperar
+    PASSWORD_TIMEOUT        segundos maximos que espera un request (5)
+
+Formato guardado: scrypt$ln=15,r=8,p=1$<salt>$<hash> (base64). Al subir el
+costo los hashes viejos siguen validando y /login los rehace con el costo
+nuevo; los passwords guardados en texto plano antes de este cambio tambien.
+"""
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from utils import APIException
+
+Cost = namedtuple("Cost", ["ln", "r", "p"])
+
+COST = Cost(int(os.getenv("PASSWORD_SCRYPT_LN", 15)), int(os.getenv("PASSWORD_SCRYPT_R", 8)),
+            int(os.getenv("PASSWORD_SCRYPT_P", 1)))
+WORKERS = int(os.getenv("PASSWORD_WORKERS", os.cpu_count() or 1))
+MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", 4 * max(WORKERS, 1)))
+TIMEOUT = float(os.getenv("PASSWORD_TIMEOUT", 5))
+PREFIX = "scrypt$"
+SALT_BYTES = 16
+KEY_BYTES = 32
+MAX_PASSWORD_BYTES = 1024
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, cost):
+    n = 1 << cost.ln
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=cost.r, p=cost.p, dklen=KEY_BYTES,
+                          maxmem=128 * cost.r * (n + cost.p + 2) + (1 << 20))
+
+
+def parse(encoded):
+    """(Cost, salt, hash) de un valor guardado, o None si no es un hash de este modulo."""
+    if not encoded or not encoded.startswith(PREFIX):
+        return None
+    try:
+        _, params, salt, key = encoded.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return Cost(int(values["ln"]), int(values["r"]), int(values["p"])), _unb64(salt), _unb64(key)
+    except (ValueError, KeyError):
+        return None
+
+
+def _hash(password, cost):
+    salt = os.urandom(SALT_BYTES)
+    return f"{PREFIX}ln={cost.ln},r={cost.r},p={cost.p}${_b64(salt)}${_b64(_scrypt(password, salt, cost))}"
+
+
+def _verify(password, encoded):
+    parsed = parse(encoded)
+    if parsed is None:
+        # password guardado en texto plano antes de tener hash
+        return encoded is not None and hmac.compare_digest(password.encode(), encoded.encode())
+    cost, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, cost), key)
+
+
+def _login(password, encoded, cost):
+    """Verifica y, si corresponde, rehace el hash en el mismo viaje al pool: (ok, hash nuevo o None)."""
+    if not _verify(password, encoded):
+        return False, None
+    return True, (_hash(password, cost) if needs_rehash(encoded, cost) else None)
+
+
+def needs_rehash(encoded, cost=COST):
+    parsed = parse(encoded)
+    return parsed is None or parsed[0] != cost
+
+
+class PasswordPool:
+    """
+    ProcessPoolExecutor creado al primer uso en cada proceso (los workers de
+    gunicorn hacen fork despues de importar la app) y con un cupo de trabajos:
+    sin cupo el request falla enseguida con 503 en lugar de encolarse.
+    """
+
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, timeout=TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                # forkserver: los procesos no heredan los threads ni las conexiones del worker
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+                self.pid = os.getpid()
+            return self.executor
+
+    def run(self, function, *args):
+        if self.workers == 0:
+            return function(*args)
+        if not self.slots.acquire(blocking=False):
+            raise APIException("Servidor ocupado, reintente en unos segundos", status_code=503)
+        try:
+            future = self._executor().submit(function, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        # el cupo se libera cuando termina el calculo, aunque el request ya no espere
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # un proceso murio (p. ej. sin memoria); el proximo request arma un pool nuevo
+            with self.lock:
+                self.executor = None
+            raise
+        except TimeoutError:
+            future.cancel()
+            raise APIException("Servidor ocupado, reintente en unos segundos", status_code=503)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None and self.pid == os.getpid():
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+pool = PasswordPool()
+
+
+@lru_cache(maxsize=None)
+def _dummy(cost):
+    # se verifica contra este hash cuando el email no existe, asi /login tarda
+    # lo mismo y no revela que emails estan registrados
+    return pool.run(_hash, "", cost)
+
+
+def check_length(password):
+    if len(password.encode()) > MAX_PASSWORD_BYTES:
+        raise APIException("Datos invalidos", status_code=400, payload={"errors": [{
+            "field": "password", "code": "max_length",
+            "message": f"El campo 'password' supera {MAX_PASSWORD_BYTES} bytes"}]})
+
+
+def hash_password(password, cost=COST):
+    check_length(password)
+    return pool.run(_hash, password, cost)
+
+
+def verify_login(password, encoded, cost=COST):
+    """
+    (ok, hash nuevo o None). encoded None (usuario inexistente) cuesta lo
+    mismo que un password incorrecto.
+    """
+    check_length(password)
+    if encoded is None:
+        pool.run(_verify, password, _dummy(cost))
+        return False, None
+    return pool.run(_login, password, encoded, cost)
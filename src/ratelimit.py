@@ -0,0 +1,203 @@
+"""
+Limite de requests por cliente y por ruta con token buckets: cada bucket
+tiene `burst` fichas, se recarga a `rate` fichas por segundo y cada request
+gasta una. Sin fichas la ruta responde 429 con Retry-After.
+
+    RATELIMIT_ENABLED      0 lo desactiva (1)
+    RATELIMIT_URL          redis://... para compartir los buckets entre workers
+                           y maquinas; sin ella cada worker tiene los suyos en
+                           memoria (el limite efectivo es por worker)
+    RATELIMIT_MAX_BUCKETS  buckets en memoria por worker (100000)
+    RATELIMIT_WRITES       limite de las rutas de escritura ("60/minute")
+    RATELIMIT_LOGIN        limite de /login ("10/minute")
+    RATELIMIT_PROXY_HOPS   proxies delante de gunicorn (0); con 1 la IP del
+                           cliente es la ultima de X-Forwarded-For
+
+El cliente es el usuario del token (Authorization: Bearer) o, sin token, la
+IP. Las respuestas llevan RateLimit-Limit, RateLimit-Remaining,
+RateLimit-Reset y RateLimit-Policy.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import jsonify, make_response, request
+from auth import auth, InvalidToken
+from metrics import observe_rate_limited
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+Limit = namedtuple("Limit", ["rate", "burst", "headers"])
+
+
+def parse_limit(text, burst=None):
+    """"30/minute" -> 30 fichas que se recargan en un minuto; burst cambia el tamano del bucket."""
+    amount, _, period = text.partition("/")
+    seconds = PERIODS[period.strip()]
+    amount = int(amount)
+    burst = burst or amount
+    # los headers que no cambian entre requests se arman una sola vez
+    headers = (("RateLimit-Limit", str(burst)), ("RateLimit-Policy", f"{amount};w={seconds};burst={burst}"))
+    return Limit(amount / seconds, burst, headers)
+
+
+class MemoryBackend:
+    """
+    Buckets en un OrderedDict por orden de uso: cada consulta es O(1) y los
+    del frente son los mas inactivos. Un bucket que ya se lleno de nuevo es
+    igual a uno que no existe, asi que se borran sin cambiar ningun limite;
+    pasado max_buckets se borra el mas inactivo aunque no este lleno.
+    """
+
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def hit(self, key, limit, now=None):
+        """(permitido, fichas que quedan)."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            buckets = self.buckets
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = limit.burst
+            else:
+                tokens, updated, _ = bucket
+                tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+                buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # [fichas, ultima consulta, momento en que vuelve a estar lleno]
+            buckets[key] = [tokens, now, now + (limit.burst - tokens) / limit.rate]
+            # limpieza amortizada: a lo sumo dos buckets por consulta
+            for _ in range(2):
+                oldest = next(iter(buckets.values()))
+                if oldest[2] > now and len(buckets) <= self.max_buckets:
+                    break
+                buckets.popitem(last=False)
+                self.evictions += 1
+            return allowed, tokens
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+# fichas y ultima recarga en un hash; la llave vence cuando el bucket se llenaria
+REDIS_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Buckets compartidos; un script Lua hace la recarga y el descuento en un solo viaje."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(REDIS_SCRIPT)
+        self.evictions = 0
+
+    def hit(self, key, limit, now=None):
+        allowed, tokens = self.script(keys=["ratelimit:" + key], args=[limit.rate, limit.burst])
+        return bool(allowed), float(tokens)
+
+    def __len__(self):
+        return 0
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled=True, proxy_hops=0):
+        self.backend = backend
+        self.enabled = enabled
+        self.proxy_hops = proxy_hops
+
+    def client(self, req):
+        """user:<id> con un token valido (ya verificado, sale de la cache de auth) o ip:<direccion>."""
+        # environ directo: es lo mismo que req.headers pero sin armar EnvironHeaders
+        environ = req.environ
+        scheme, _, token = environ.get("HTTP_AUTHORIZATION", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                return f"user:{auth.claims(token.strip()).user_id}"
+            except InvalidToken:
+                pass
+        if self.proxy_hops:
+            forwarded = environ.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if len(forwarded) >= self.proxy_hops:
+                # las que estan mas a la izquierda las puede inventar el cliente
+                return f"ip:{forwarded[-self.proxy_hops].strip()}"
+        return f"ip:{req.remote_addr}"
+
+    def check(self, limit, req):
+        """(permitido, lista de headers, segundos para reintentar) del cliente de req en su ruta."""
+        try:
+            allowed, tokens = self.backend.hit(f"{req.endpoint}:{self.client(req)}", limit)
+        except Exception:
+            # backend compartido caido: mejor atender sin limite que cortar las escrituras
+            return True, [], 0
+        headers = [*limit.headers, ("RateLimit-Remaining", str(int(tokens))),
+                   ("RateLimit-Reset", str(math.ceil((limit.burst - tokens) / limit.rate)))]
+        if allowed:
+            return True, headers, 0
+        retry_after = math.ceil((1 - tokens) / limit.rate)
+        headers.append(("Retry-After", str(retry_after)))
+        return False, headers, retry_after
+
+    def limit(self, text, burst=None):
+        """Decorador para rutas; va debajo de @app.route y antes de @login_required."""
+        limit = parse_limit(text, burst)
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self.enabled:
+                    return view(**kwargs)
+                # el request real una vez, no un LocalProxy por cada atributo
+                req = request._get_current_object()
+                allowed, headers, retry_after = self.check(limit, req)
+                if not allowed:
+                    observe_rate_limited(req.endpoint)
+                    response = jsonify({"message": f"Demasiados requests, reintente en {retry_after} segundos"})
+                    response.status_code = 429
+                else:
+                    response = make_response(view(**kwargs))
+                # extend y no update: la vista no pone estos headers y extend no busca los existentes
+                response.headers.extend(headers)
+                return response
+            return wrapper
+        return decorator
+
+
+def create_limiter():
+    if os.getenv("RATELIMIT_URL"):
+        backend = RedisBackend(os.getenv("RATELIMIT_URL"))
+    else:
+        backend = MemoryBackend(int(os.getenv("RATELIMIT_MAX_BUCKETS", 100000)))
+    enabled = os.getenv("RATELIMIT_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off", "")
+    return RateLimiter(backend, enabled, int(os.getenv("RATELIMIT_PROXY_HOPS", 0)))
+
+
+rate_limiter = create_limiter()
+rate_limit = rate_limiter.limit
+
+WRITE_LIMIT = os.getenv("RATELIMIT_WRITES", "60/minute")
+LOGIN_LIMIT = os.getenv("RATELIMIT_LOGIN", "10/minute")
@@ -0,0 +1,253 @@
+"""
+Lecturas en replicas: las rutas GET marcadas con @read_replica ejecutan sus
+SELECT en una replica (round-robin entre las sanas) y todo lo demas sigue
+en DATABASE_URL.
+
+    DATABASE_REPLICA_URLS    urls separadas por coma; sin ella no cambia nada
+    REPLICA_HEALTH_INTERVAL  segundos entre chequeos de cada replica (10,
+                             minimo 0.1)
+    REPLICA_STICKY_SECONDS   despues de una escritura el mismo cliente lee del
+                             primario este tiempo (5); debe cubrir el lag de
+                             replicacion
+    REPLICA_STICKY_URL       redis://... para compartir entre workers y
+                             maquinas la ventana por usuario; sin ella cada
+                             worker recuerda a los usuarios que escribieron en el
+    REPLICA_STICKY_USERS     usuarios con ventana abierta en memoria por
+                             worker (100000)
+
+Despues de una escritura se lee del primario por dos caminos: una cookie
+(el mismo navegador, en cualquier worker) y una ventana por usuario, el de
+@login_required o el sub del token (el mismo usuario desde otro cliente).
+Los chequeos de las replicas los hace un thread por proceso, fuera de los
+requests; un error de desconexion en un request la marca caida enseguida.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+STICKY_COOKIE = "db_primary_until"
+STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+HEALTH_INTERVAL = max(float(os.getenv("REPLICA_HEALTH_INTERVAL", 10)), 0.1)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replica_urls():
+    return [url.strip().replace("postgres://", "postgresql://")
+            for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def replica_binds(urls, options):
+    """SQLALCHEMY_BINDS para las replicas; options(url) da las opciones del engine."""
+    return {f"replica_{n}": {"url": url, **options(url)} for n, url in enumerate(urls)}
+
+
+class Replica:
+    __slots__ = ("name", "healthy", "checked_at", "failures")
+
+    def __init__(self, name):
+        self.name = name
+        self.healthy = True
+        self.checked_at = 0.0
+        self.failures = 0
+
+
+class MemorySticky:
+    """
+    Ventanas por usuario de este worker en un OrderedDict: todas duran lo
+    mismo, asi el orden de insercion es el de vencimiento y las vencidas se
+    borran desde el frente.
+    """
+
+    def __init__(self, max_users=100000):
+        self.max_users = max_users
+        self.until = OrderedDict()
+        self.lock = threading.Lock()
+
+    def mark(self, user_id, seconds):
+        now = time.monotonic()
+        with self.lock:
+            self.until.pop(user_id, None)
+            self.until[user_id] = now + seconds
+            while self.until and (len(self.until) > self.max_users or next(iter(self.until.values())) <= now):
+                self.until.popitem(last=False)
+
+    def active(self, user_id):
+        return self.until.get(user_id, 0.0) > time.monotonic()
+
+
+class RedisSticky:
+    """Ventanas por usuario compartidas: una llave con vencimiento por usuario."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def mark(self, user_id, seconds):
+        self.client.set(f"primary:{user_id}", 1, px=int(seconds * 1000))
+
+    def active(self, user_id):
+        return bool(self.client.exists(f"primary:{user_id}"))
+
+
+def create_sticky():
+    if os.getenv("REPLICA_STICKY_URL"):
+        return RedisSticky(os.getenv("REPLICA_STICKY_URL"))
+    return MemorySticky(int(os.getenv("REPLICA_STICKY_USERS", 100000)))
+
+
+def request_user():
+    """Usuario del request: el de @login_required o el sub de un token bien firmado; None sin token."""
+    user_id = g.get("user_id")
+    if user_id is not None:
+        return user_id
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    # aca y no arriba: models importa este modulo (RoutingSession) y auth importa models
+    from auth import auth, InvalidToken
+    try:
+        # solo decide de donde leer: vencido o revocado lo rechaza @login_required
+        return auth.claims(token.strip()).user_id
+    except InvalidToken:
+        return None
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.engines = {}
+        self.replicas = []
+        self.lock = threading.Lock()
+        self.cycle = itertools.cycle(())
+        self.users = None
+        self.pid = None
+        self.wakeup = threading.Event()
+
+    def init_app(self, app, db):
+        names = sorted(name for name in app.config.get("SQLALCHEMY_BINDS", {}) if name.startswith("replica_"))
+        self.replicas = [Replica(name) for name in names]
+        self.cycle = itertools.cycle(self.replicas)
+        if not self.replicas:
+            return
+        self.users = create_sticky()
+        with app.app_context():
+            # los engines se guardan para chequearlos desde el thread, sin contexto de app
+            self.engines = {replica.name: db.engines[replica.name] for replica in self.replicas}
+        for replica in self.replicas:
+            event.listen(self.engines[replica.name], "handle_error", self._on_error(replica))
+
+        @app.after_request
+        def stick_to_primary(response):
+            if request.method not in SAFE_METHODS and response.status_code < 400:
+                response.set_cookie(STICKY_COOKIE, str(time.time() + STICKY_SECONDS),
+                                    max_age=int(STICKY_SECONDS) + 1, httponly=True, samesite="Lax")
+                user_id = request_user()
+                if user_id is not None:
+                    try:
+                        self.users.mark(user_id, STICKY_SECONDS)
+                    except Exception:
+                        # sin el backend compartido queda la cookie
+                        pass
+            return response
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+                replica.failures += 1
+        return handle_error
+
+    def check(self, replica):
+        try:
+            with self.engines[replica.name].connect() as connection:
+                connection.execute(text("SELECT 1"))
+            replica.healthy = True
+        except Exception:
+            replica.healthy = False
+            replica.failures += 1
+        replica.checked_at = time.monotonic()
+        return replica.healthy
+
+    def choose(self):
+        """Nombre del bind de la siguiente replica sana, o None para usar el primario."""
+        self._ensure_checker()
+        for _ in range(len(self.replicas)):
+            with self.lock:
+                replica = next(self.cycle)
+            if replica.healthy:
+                return replica.name
+        return None
+
+    def _ensure_checker(self):
+        # como el refresco de auth: los workers hacen fork despues de importar la app
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        threading.Thread(target=self._check_loop, args=(self.pid,), name="replica-health", daemon=True).start()
+
+    def _check_loop(self, pid):
+        while self.pid == pid:
+            for replica in self.replicas:
+                self.check(replica)
+            if self.wakeup.wait(HEALTH_INTERVAL):
+                return
+
+    def sticky(self):
+        """El cliente (cookie) o el usuario escribio hace menos de STICKY_SECONDS."""
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        user_id = request_user()
+        if user_id is None:
+            return False
+        try:
+            return self.users.active(user_id)
+        except Exception:
+            # no se sabe si escribio: el primario siempre tiene lo ultimo
+            return True
+
+    def stats(self):
+        now = time.monotonic()
+        return [{"name": replica.name, "healthy": replica.healthy, "failures": replica.failures,
+                 "checked_seconds_ago": round(now - replica.checked_at, 1) if replica.checked_at else None}
+                for replica in self.replicas]
+
+
+replica_router = ReplicaRouter()
+
+
+def read_replica(view):
+    """
+    Va justo debajo de @app.route para que los decoradores de cache y ETag
+    tambien lean de la replica elegida. Una replica por request.
+    """
+    @wraps(view)
+    def wrapper(**kwargs):
+        use_replica = replica_router.replicas and not replica_router.sticky()
+        g.db_replica = replica_router.choose() if use_replica else None
+        return view(**kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Los SELECT de un request marcado van a su replica; el resto al primario."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replica = g.get("db_replica")
+            # los UNION del ORM llegan sin clause ni mapper
+            reads = getattr(clause, "is_select", False) or (clause is None and mapper is None)
+            if replica is not None and reads and not (self.new or self.dirty or self.deleted):
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,211 @@
+"""
+Busqueda de texto en characters, planets y vehicles (GET /search?q=).
+
+Cada registro tiene una fila en search_document con el nombre (title) y las
+otras columnas de texto (body):
+    PostgreSQL  tabla con una columna tsvector generada y un indice GIN
+    SQLite      tabla virtual FTS5
+La fila se actualiza en el mismo commit que el registro (eventos de la
+sesion, como en versions.py); los INSERT masivos del importador llaman a
+index_after. En otras bases /search responde 501.
+"""
+import re
+from sqlalchemy import and_, column, event, func, inspect, literal, literal_column, or_, select, table
+from models import db, Character, Planet, Vehicle
+from pagination import decode_cursor, encode_cursor, parse_limit
+from serializers import compile_schema
+from utils import APIException
+
+SEARCH_TABLE = "search_document"
+# tipo -> (modelo, codigo para la llave del documento, columnas del body)
+SEARCH_MODELS = {
+    "character": (Character, 1, ("homeworld", "gender", "description")),
+    "planet": (Planet, 2, ("climate", "terrain", "description")),
+    "vehicle": (Vehicle, 3, ("model", "vehicle_class", "manufactured", "description")),
+}
+SEARCH_TABLES = {model.__tablename__: kind for kind, (model, _, _) in SEARCH_MODELS.items()}
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+MAX_TERMS = 8
+# peso del nombre frente al resto de columnas
+TITLE_WEIGHT, BODY_WEIGHT = 10.0, 2.0
+
+DDL = {
+    "postgresql": [
+        f"CREATE TABLE {SEARCH_TABLE} ("
+        " doc_id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL,"
+        " title TEXT NOT NULL, body TEXT NOT NULL,"
+        " document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED)",
+        f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        "kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+}
+
+
+def _documents(dialect):
+    # en FTS5 la llave es el rowid de la tabla virtual
+    key = "rowid" if dialect == "sqlite" else "doc_id"
+    return table(SEARCH_TABLE, column(key), column("kind"), column("ref_id"), column("title"),
+                 column("body"), column("document")), key
+
+
+def _source(kind):
+    """SELECT con las filas de search_document de ese tipo, para INSERT ... SELECT."""
+    model, code, body_columns = SEARCH_MODELS[kind]
+    body = func.coalesce(getattr(model, body_columns[0]), "")
+    for name in body_columns[1:]:
+        body = body + " " + func.coalesce(getattr(model, name), "")
+    return select(model.id * 4 + code, literal(kind), model.id, model.name, body)
+
+
+def _index(connection, kind, where=None):
+    documents, key = _documents(connection.dialect.name)
+    source = _source(kind)
+    if where is not None:
+        source = source.where(where)
+    connection.execute(documents.insert().from_select([key, "kind", "ref_id", "title", "body"], source))
+
+
+def reindex(connection, kind, ids):
+    """Borra y vuelve a indexar esos ids (los que ya no existen solo se borran)."""
+    if connection.dialect.name not in SUPPORTED_DIALECTS or not ids:
+        return
+    model, code, _ = SEARCH_MODELS[kind]
+    documents, key = _documents(connection.dialect.name)
+    connection.execute(documents.delete().where(documents.c[key].in_([id * 4 + code for id in ids])))
+    _index(connection, kind, model.id.in_(ids))
+
+
+def index_after(connection, kind, last_id):
+    """Indexa las filas con id > last_id (recien insertadas por el importador)."""
+    if connection.dialect.name in SUPPORTED_DIALECTS:
+        _index(connection, kind, SEARCH_MODELS[kind][0].id > last_id)
+
+
+def create_search_index(target, connection, **kw):
+    """Crea search_document y la llena; corre despues de db.create_all()."""
+    statements = DDL.get(connection.dialect.name)
+    if statements is None or inspect(connection).has_table(SEARCH_TABLE):
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    for kind in SEARCH_MODELS:
+        _index(connection, kind)
+
+
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name in SUPPORTED_DIALECTS:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+event.listen(db.metadata, "after_create", create_search_index)
+event.listen(db.metadata, "before_drop", drop_search_index)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Para alembic: search_document (y las tablas internas de FTS5) no estan en los modelos."""
+    return not (type_ == "table" and reflected and name.startswith(SEARCH_TABLE))
+
+
+def track(session):
+    """Actualiza search_document en la misma transaccion que el cambio."""
+    @event.listens_for(session, "after_flush")
+    def collect(session, flush_context):
+        changed = session.info.setdefault("search_changes", {})
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            kind = SEARCH_TABLES.get(getattr(obj, "__tablename__", None))
+            if kind is not None:
+                changed.setdefault(kind, set()).add(obj.id)
+
+    @event.listens_for(session, "before_commit")
+    def update(session):
+        session.flush()
+        changed = session.info.pop("search_changes", None)
+        if changed:
+            connection = session.connection()
+            for kind, ids in changed.items():
+                reindex(connection, kind, sorted(ids))
+
+    @event.listens_for(session, "after_rollback")
+    def discard(session):
+        session.info.pop("search_changes", None)
+
+
+def parse_terms(args):
+    terms = re.findall(r"\w+", (args.get("q") or "").lower())[:MAX_TERMS]
+    if not terms:
+        raise APIException("El parametro 'q' es requerido", status_code=400)
+    return terms
+
+
+def parse_kinds(args):
+    kinds = args.get("type")
+    if not kinds:
+        return tuple(SEARCH_MODELS)
+    kinds = tuple(dict.fromkeys(kind.strip() for kind in kinds.split(",") if kind.strip()))
+    unknown = [kind for kind in kinds if kind not in SEARCH_MODELS]
+    if unknown:
+        raise APIException("Tipos no validos", status_code=400,
+                           payload={"invalid_type": unknown, "types": list(SEARCH_MODELS)})
+    return kinds
+
+
+def _matches(dialect, documents, key, terms):
+    """(condicion, score) para los terminos; el ultimo busca por prefijo. Menor score = mejor."""
+    if dialect == "sqlite":
+        query = " ".join(f'"{term}"' for term in terms) + "*"
+        source = literal_column(SEARCH_TABLE)
+        return source.op("MATCH")(query), func.bm25(source, 0.0, 0.0, TITLE_WEIGHT, BODY_WEIGHT)
+    query = func.to_tsquery("simple", " & ".join(terms[:-1] + [terms[-1] + ":*"]))
+    weights = literal_column(f"ARRAY[0, 0, {BODY_WEIGHT / TITLE_WEIGHT}, 1]::float4[]")
+    return documents.c.document.op("@@")(query), -func.ts_rank(weights, documents.c.document, query)
+
+
+def search(args):
+    """
+    Retorna (resultados, next_cursor) ordenados por relevancia. El cursor es
+    keyset sobre (score, llave del documento), igual que los listados.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in SUPPORTED_DIALECTS:
+        raise APIException("La busqueda no esta disponible en esta base de datos", status_code=501)
+    terms = parse_terms(args)
+    kinds = parse_kinds(args)
+    limit = parse_limit(args)
+    documents, key = _documents(dialect)
+    condition, score = _matches(dialect, documents, key, terms)
+
+    ranked = (select(documents.c[key].label("doc_id"), documents.c.kind, documents.c.ref_id, score.label("score"))
+              .where(condition, documents.c.kind.in_(kinds))
+              .subquery())
+    stmt = select(ranked)
+    cursor = args.get("cursor")
+    if cursor:
+        last = decode_cursor(cursor)
+        if not (isinstance(last, list) and len(last) == 2 and isinstance(last[1], int)
+                and isinstance(last[0], (int, float))):
+            raise APIException("Cursor invalido, verifique", status_code=400)
+        stmt = stmt.where(or_(ranked.c.score > last[0],
+                              and_(ranked.c.score == last[0], ranked.c.doc_id > last[1])))
+    rows = db.session.execute(stmt.order_by(ranked.c.score, ranked.c.doc_id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].score, rows[-1].doc_id])
+
+    # un SELECT por tipo para traer los registros encontrados
+    items = {}
+    for kind in {row.kind for row in rows}:
+        model = SEARCH_MODELS[kind][0]
+        schema = compile_schema(model)
+        ids = [row.ref_id for row in rows if row.kind == kind]
+        for found in db.session.execute(select(*schema.columns).where(model.id.in_(ids))):
+            item = schema.from_row(found)
+            items[(kind, item["id"])] = item
+    results = [{"type": row.kind, "id": int(row.ref_id), "score": round(-row.score, 6),
+                "item": items[(row.kind, int(row.ref_id))]}
+               for row in rows if (row.kind, int(row.ref_id)) in items]
+    return results, next_cursor
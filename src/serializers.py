@@ -0,0 +1,76 @@
+"""
+Serializacion basada en las columnas de cada modelo, compilada una vez por
+modelo y conjunto de campos, y proveedor JSON de Flask con orjson si esta instalado.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, sin el se usa el json de Flask
+    orjson = None
+
+Schema = namedtuple("Schema", ["names", "columns", "from_row", "from_object"])
+
+
+def public_columns(model):
+    """Columnas que se pueden exponer (nunca el password ni las copias numericas internas)."""
+    return [column for column in model.__table__.columns
+            if column.name != "password" and "shadow_of" not in column.info]
+
+
+@lru_cache(maxsize=None)
+def compile_schema(model, fields=None):
+    """
+    fields es una tupla de nombres de columna (None = todas las publicas).
+    from_row arma el dict directo desde una fila de select(*columns), sin
+    crear objetos del ORM; from_object hace lo mismo desde una instancia.
+    """
+    available = {column.name: column for column in public_columns(model)}
+    names = tuple(available) if fields is None else tuple(fields)
+    columns = tuple(available[name] for name in names)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        def from_object(obj):
+            return {names[0]: getter(obj)}
+    else:
+        def from_object(obj):
+            return dict(zip(names, getter(obj)))
+
+    def from_row(row):
+        return dict(zip(names, row))
+
+    return Schema(names, columns, from_row, from_object)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Igual que el proveedor por defecto (llaves ordenadas, mismas fechas) pero
+    codificando con orjson. Si se piden opciones del json estandar, como el
+    indent en modo debug, se usa el proveedor por defecto.
+    """
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def setup_json(app):
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
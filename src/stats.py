@@ -0,0 +1,254 @@
+"""
+Estadisticas de favoritos (GET /stats/favorites...) leidas de la tabla
+favorite_count, sin GROUP BY sobre user_character/user_planet/user_vehicle.
+
+Las rutas de favoritos llaman a count_favorite con +1/-1 y los contadores se
+escriben en el mismo commit (eventos de la sesion, como en versions.py).
+Borrar un usuario resta sus favoritos y borrar un registro borra su contador.
+`flask stats reconcile` los recalcula desde las tablas de favoritos e informa
+las diferencias que encontro.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, literal, or_, select, text, tuple_, union_all
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import db, User, Character, Planet, Vehicle, favorite_count, user_character, user_planet, user_vehicle
+from pagination import decode_cursor, encode_cursor, parse_limit
+from utils import APIException
+
+# tipo -> (modelo, tabla de favoritos, columna fk)
+FAVORITE_KINDS = {
+    "character": (Character, user_character, user_character.c.character_id),
+    "planet": (Planet, user_planet, user_planet.c.planet_id),
+    "vehicle": (Vehicle, user_vehicle, user_vehicle.c.vehicle_id),
+}
+TOP_LIMIT = 5
+
+
+def _queue(session, kind, ref_id, delta):
+    deltas = session.info.setdefault("favorite_deltas", {})
+    key = (kind, int(ref_id))
+    deltas[key] = deltas.get(key, 0) + delta
+
+
+def count_favorite(kind, ref_id, delta):
+    """Suma delta al contador del registro al hacer commit de la sesion actual."""
+    _queue(db.session, kind, ref_id, delta)
+
+
+def recount(kind, ids):
+    """Recalcula esos contadores al hacer commit; para cuando no se sabe que filas cambiaron."""
+    db.session.info.setdefault("favorite_recount", set()).update((kind, int(id)) for id in ids)
+
+
+def _actual(session, kind, ids=None):
+    _, table, fk = FAVORITE_KINDS[kind]
+    stmt = select(fk, func.count()).group_by(fk)
+    if ids is not None:
+        stmt = stmt.where(fk.in_(ids))
+    return dict(session.execute(stmt).all())
+
+
+def _write(session, rows, add):
+    """Upsert de contadores: con add suma el valor al que ya existe, si no lo reemplaza."""
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert(favorite_count).values(rows)
+        new = insert.excluded.favorites
+        stmt = insert.on_conflict_do_update(
+            index_elements=[favorite_count.c.kind, favorite_count.c.ref_id],
+            set_={"favorites": favorite_count.c.favorites + new if add else new})
+    elif dialect == "mysql":
+        insert = mysql.insert(favorite_count).values(rows)
+        new = insert.inserted.favorites
+        stmt = insert.on_duplicate_key_update(favorites=favorite_count.c.favorites + new if add else new)
+    else:
+        for row in rows:
+            new = row["favorites"]
+            result = session.execute(
+                favorite_count.update()
+                .where(favorite_count.c.kind == row["kind"], favorite_count.c.ref_id == row["ref_id"])
+                .values(favorites=favorite_count.c.favorites + new if add else new))
+            if result.rowcount == 0:
+                session.execute(favorite_count.insert().values(row))
+        return
+    session.execute(stmt)
+
+
+def _apply(session, deltas, recounts, dropped):
+    for key in recounts | dropped:
+        deltas.pop(key, None)
+    recounts = recounts - dropped
+    # orden fijo de llaves para que dos transacciones no se bloqueen en orden inverso
+    _write(session, [{"kind": kind, "ref_id": ref_id, "favorites": delta}
+                     for (kind, ref_id), delta in sorted(deltas.items()) if delta], add=True)
+    exact = []
+    for kind in sorted({kind for kind, _ in recounts}):
+        ids = sorted(ref_id for other, ref_id in recounts if other == kind)
+        actual = _actual(session, kind, ids)
+        exact += [{"kind": kind, "ref_id": ref_id, "favorites": actual.get(ref_id, 0)} for ref_id in ids]
+    _write(session, exact, add=False)
+    if dropped:
+        session.execute(favorite_count.delete().where(
+            tuple_(favorite_count.c.kind, favorite_count.c.ref_id).in_(sorted(dropped))))
+
+
+def track(session):
+    """Actualiza favorite_count en la misma transaccion que los favoritos."""
+    @event.listens_for(session, "before_flush")
+    def collect(session, flush_context, instances):
+        deleted = list(session.deleted)
+        users = [obj.id for obj in deleted if isinstance(obj, User)]
+        if users:
+            # el flush borra sus filas de favoritos; se restan antes de que desaparezcan
+            connection = session.connection()
+            for kind, (_, table, fk) in FAVORITE_KINDS.items():
+                for ref_id in connection.execute(select(fk).where(table.c.user_id.in_(users))).scalars():
+                    _queue(session, kind, ref_id, -1)
+        dropped = session.info.setdefault("favorite_dropped", set())
+        for obj in deleted:
+            kind = getattr(obj, "__tablename__", None)
+            if kind in FAVORITE_KINDS:
+                dropped.add((kind, obj.id))
+
+    @event.listens_for(session, "before_commit")
+    def update(session):
+        session.flush()
+        deltas = session.info.pop("favorite_deltas", None) or {}
+        recounts = session.info.pop("favorite_recount", None) or set()
+        dropped = session.info.pop("favorite_dropped", None) or set()
+        if deltas or recounts or dropped:
+            _apply(session, deltas, recounts, dropped)
+
+    @event.listens_for(session, "after_rollback")
+    def discard(session):
+        for key in ("favorite_deltas", "favorite_recount", "favorite_dropped"):
+            session.info.pop(key, None)
+
+
+def parse_kind(kind):
+    if kind not in FAVORITE_KINDS:
+        raise APIException("Tipo no valido", status_code=404, payload={"types": list(FAVORITE_KINDS)})
+    return kind
+
+
+def _ranked(kind):
+    model = FAVORITE_KINDS[kind][0]
+    return (select(favorite_count.c.ref_id, model.name, favorite_count.c.favorites)
+            .join(model, model.id == favorite_count.c.ref_id)
+            .where(favorite_count.c.kind == kind, favorite_count.c.favorites > 0))
+
+
+def _item(row):
+    return {"id": row.ref_id, "name": row.name, "favorites": row.favorites}
+
+
+def favorite_summary(args):
+    """Total de favoritos, registros con al menos uno y el top de cada tipo."""
+    limit = parse_limit(args) if "limit" in args else TOP_LIMIT
+    totals = {kind: (total, favorited) for kind, total, favorited in db.session.execute(
+        select(favorite_count.c.kind, func.sum(favorite_count.c.favorites), func.count())
+        .where(favorite_count.c.favorites > 0)
+        .group_by(favorite_count.c.kind))}
+    summary = {}
+    for kind in FAVORITE_KINDS:
+        total, favorited = totals.get(kind, (0, 0))
+        top = db.session.execute(_ranked(kind).order_by(favorite_count.c.favorites.desc(),
+                                                        favorite_count.c.ref_id.desc()).limit(limit))
+        summary[kind] = {"total_favorites": int(total or 0), "favorited": favorited,
+                         "top": [_item(row) for row in top]}
+    return summary
+
+
+def ranking(kind, args):
+    """Registros del tipo ordenados por favoritos; keyset sobre (favorites, id) descendente."""
+    kind = parse_kind(kind)
+    limit = parse_limit(args)
+    stmt = _ranked(kind)
+    cursor = args.get("cursor")
+    if cursor:
+        last = decode_cursor(cursor)
+        if not (isinstance(last, list) and len(last) == 2 and all(isinstance(value, int) for value in last)):
+            raise APIException("Cursor invalido, verifique", status_code=400)
+        stmt = stmt.where(tuple_(favorite_count.c.favorites, favorite_count.c.ref_id) < tuple_(*last))
+    rows = db.session.execute(stmt.order_by(favorite_count.c.favorites.desc(), favorite_count.c.ref_id.desc())
+                              .limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].favorites, rows[-1].ref_id])
+    return [_item(row) for row in rows], next_cursor
+
+
+def favorite_count_of(kind, ref_id):
+    """Favoritos de un registro, o None si el registro no existe."""
+    model = FAVORITE_KINDS[parse_kind(kind)][0]
+    row = db.session.execute(
+        select(model.id, func.coalesce(favorite_count.c.favorites, 0).label("favorites"))
+        .outerjoin(favorite_count, (favorite_count.c.kind == kind) & (favorite_count.c.ref_id == model.id))
+        .where(model.id == ref_id)).first()
+    if row is None:
+        return None
+    return {"type": kind, "id": row.id, "favorites": row.favorites}
+
+
+def drift(session, kind):
+    """Filas (ref_id, guardado, real) donde favorite_count no coincide con la tabla de favoritos."""
+    _, table, fk = FAVORITE_KINDS[kind]
+    actual = select(fk.label("ref_id"), func.count().label("favorites")).group_by(fk).subquery()
+    stored = (select(favorite_count.c.ref_id, favorite_count.c.favorites)
+              .where(favorite_count.c.kind == kind).subquery())
+    wrong = (select(actual.c.ref_id, stored.c.favorites, actual.c.favorites)
+             .select_from(actual.outerjoin(stored, stored.c.ref_id == actual.c.ref_id))
+             .where(or_(stored.c.favorites.is_(None), stored.c.favorites != actual.c.favorites)))
+    orphan = (select(stored.c.ref_id, stored.c.favorites, literal(0))
+              .select_from(stored.outerjoin(actual, actual.c.ref_id == stored.c.ref_id))
+              .where(actual.c.ref_id.is_(None), stored.c.favorites != 0))
+    return session.execute(union_all(wrong, orphan)).all()
+
+
+def rebuild(session):
+    """Vuelve a llenar favorite_count desde cero con un INSERT ... SELECT por tipo."""
+    session.execute(favorite_count.delete())
+    for kind, (_, table, fk) in FAVORITE_KINDS.items():
+        session.execute(favorite_count.insert().from_select(
+            ["kind", "ref_id", "favorites"], select(literal(kind), fk, func.count()).group_by(fk)))
+
+
+def reconcile(session, fix=True):
+    """
+    Compara favorite_count con las tablas de favoritos y, con fix, la
+    reconstruye en la misma transaccion. Retorna {tipo: [diferencias]}.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        # las escrituras de favoritos esperan a que termine; las que ya hicieron
+        # commit quedan contadas y las que esperan suman sobre el valor nuevo
+        session.execute(text("LOCK TABLE favorite_count IN EXCLUSIVE MODE"))
+    report = {kind: [{"id": ref_id, "stored": stored, "actual": actual}
+                     for ref_id, stored, actual in drift(session, kind)]
+              for kind in FAVORITE_KINDS}
+    if fix:
+        rebuild(session)
+    return report
+
+
+stats_cli = AppGroup("stats", help="Contadores de favoritos de /stats.")
+
+
+@stats_cli.command("reconcile")
+@click.option("--dry-run", is_flag=True, help="Solo informa las diferencias, sin reconstruir.")
+def reconcile_command(dry_run):
+    """Recalcula favorite_count desde user_character, user_planet y user_vehicle."""
+    report = reconcile(db.session, fix=not dry_run)
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    for kind, rows in report.items():
+        click.echo(f"{kind}: {len(rows)} contadores con diferencias")
+        for row in rows[:20]:
+            click.echo(f"  id {row['id']}: guardado {row['stored']}, real {row['actual']}", err=True)
+    if any(report.values()):
+        click.echo("contadores reconstruidos" if not dry_run else "sin cambios (--dry-run)")
@@ -0,0 +1,146 @@
+"""
+Validacion de los datos de escritura (POST/PUT e importacion masiva) segun
+las columnas de cada modelo: tipo, largo, nulos y REQUIRED_FIELDS.
+
+Como compile_schema, las reglas se compilan una vez por modelo y modo; validar
+un body es un solo recorrido sobre una tupla de reglas, sin tocar la base.
+Los errores son una lista de {"field", "code", "message"}.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy import or_, select
+from models import db
+from utils import APIException
+
+Validator = namedtuple("Validator", ["fields", "required", "validate"])
+
+MISSING = object()
+
+
+def _to_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    return int(value)
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise TypeError
+    return float(value)
+
+
+def _to_bool(value):
+    if not isinstance(value, bool):
+        raise TypeError
+    return value
+
+
+CONVERTERS = {str: (_to_str, "texto"), int: (_to_int, "numerico"), float: (_to_float, "numerico"),
+              bool: (_to_bool, "true o false")}
+
+
+def writable_columns(model):
+    """Columnas que se pueden escribir desde un body: sin la PK ni las copias numericas."""
+    return [column for column in model.__table__.columns
+            if not column.primary_key and "shadow_of" not in column.info]
+
+
+def _error(field, code, message):
+    return {"field": field, "code": code, "message": message}
+
+
+@lru_cache(maxsize=None)
+def compile_validator(model, partial=False):
+    """
+    validate(data) retorna (datos limpios, errores). Sin partial (alta o
+    reemplazo completo) los campos requeridos deben venir y los que faltan
+    quedan en None; con partial (PUT parcial) solo se validan los que vienen.
+    """
+    required_fields = getattr(model, "REQUIRED_FIELDS", ())
+    hashed_fields = getattr(model, "HASHED_FIELDS", ())
+    rules = []
+    for column in writable_columns(model):
+        python_type = column.type.python_type
+        if python_type not in CONVERTERS:
+            python_type = str
+        convert, expected = CONVERTERS[python_type]
+        required = column.name in required_fields or not column.nullable
+        length = None if column.name in hashed_fields else getattr(column.type, "length", None)
+        rules.append((column.name, python_type, convert, expected, length, required, required and not partial))
+    rules = tuple(rules)
+
+    def validate(data):
+        if not isinstance(data, dict):
+            return None, [_error(None, "invalid", "Se esperaba un objeto JSON")]
+        clean, errors = {}, []
+        get = data.get
+        for name, python_type, convert, expected, length, required, must_send in rules:
+            value = get(name, MISSING)
+            if value is MISSING:
+                if must_send:
+                    errors.append(_error(name, "required", f"El campo '{name}' es requerido"))
+                elif not partial:
+                    clean[name] = None
+                continue
+            if value is None or value == "":
+                if required:
+                    errors.append(_error(name, "required", f"El campo '{name}' es requerido"))
+                else:
+                    clean[name] = None
+                continue
+            # el caso comun ya viene con el tipo de la columna y no se convierte
+            if value.__class__ is not python_type:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError):
+                    errors.append(_error(name, "type", f"El campo '{name}' debe ser {expected}"))
+                    continue
+            if length and len(value) > length:
+                errors.append(_error(name, "max_length", f"El campo '{name}' supera {length} caracteres"))
+                continue
+            clean[name] = value
+        return clean, errors
+
+    return Validator(tuple(rule[0] for rule in rules), tuple(rule[0] for rule in rules if rule[5]), validate)
+
+
+def validate_payload(model, data, partial=False):
+    """Datos limpios del body o APIException 400 con la lista de errores."""
+    clean, errors = compile_validator(model, partial).validate(data)
+    if errors:
+        raise APIException("Datos invalidos", status_code=400, payload={
+            "errors": errors,
+            "missing_fields": [error["field"] for error in errors if error["code"] == "required"]})
+    return clean
+
+
+def check_unique(model, clean, current_id=None):
+    """
+    Una consulta por las columnas unicas que vienen en el body; 409 si otro
+    registro ya tiene ese valor. El constraint de la base sigue cubriendo
+    las carreras entre requests.
+    """
+    columns = [column for column in model.__table__.columns
+               if column.unique and clean.get(column.name) is not None]
+    if not columns:
+        return
+    stmt = select(*columns).where(or_(*(column == clean[column.name] for column in columns)))
+    if current_id is not None:
+        stmt = stmt.where(model.id != current_id)
+    taken = db.session.execute(stmt.limit(len(columns))).all()
+    errors = [_error(column.name, "unique", f"'{column.name}' ya existe: {clean[column.name]}")
+              for column in columns if any(row._mapping[column.name] == clean[column.name] for row in taken)]
+    if errors:
+        raise APIException("Datos invalidos", status_code=409, payload={"errors": errors})
@@ -0,0 +1,122 @@
+"""
+Versiones por tabla y por usuario (tabla data_version) para responder GET
+condicionales (If-None-Match / If-Modified-Since) con 304 sin leer ni
+serializar los registros.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import Response, g, make_response, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import db, data_version
+
+VERSIONED_TABLES = ("user", "character", "planet", "vehicle")
+
+
+def touch(*tags):
+    """Marca tags para subir su version al hacer commit de la sesion actual."""
+    db.session.info.setdefault("version_tags", set()).update(tags)
+
+
+def _tags_for(obj):
+    table = getattr(obj, "__tablename__", None)
+    if table not in VERSIONED_TABLES:
+        return ()
+    if table == "user":
+        # los favoritos del usuario tambien pueden cambiar por la relacion
+        return ("user", f"user:{obj.id}", "favorites", f"favorites:{obj.id}")
+    return (table,)
+
+
+def _bump(session, tags):
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    rows = [{"tag": tag, "version": 1, "updated_at": now} for tag in sorted(tags)]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert(data_version).values(rows)
+        stmt = insert.on_conflict_do_update(
+            index_elements=[data_version.c.tag],
+            set_={"version": data_version.c.version + 1, "updated_at": insert.excluded.updated_at})
+    elif dialect == "mysql":
+        insert = mysql.insert(data_version).values(rows)
+        stmt = insert.on_duplicate_key_update(
+            version=data_version.c.version + 1, updated_at=insert.inserted.updated_at)
+    else:
+        existing = set(session.execute(
+            select(data_version.c.tag).where(data_version.c.tag.in_(tags))).scalars())
+        session.execute(data_version.update().where(data_version.c.tag.in_(existing))
+                        .values(version=data_version.c.version + 1, updated_at=now))
+        stmt = data_version.insert().values([row for row in rows if row["tag"] not in existing])
+        if len(existing) == len(rows):
+            return
+    session.execute(stmt)
+
+
+def track(session):
+    """Sube las versiones en la misma transaccion que el cambio."""
+    @event.listens_for(session, "after_flush")
+    def collect(session, flush_context):
+        tags = session.info.setdefault("version_tags", set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            tags.update(_tags_for(obj))
+
+    @event.listens_for(session, "before_commit")
+    def bump(session):
+        session.flush()
+        tags = session.info.pop("version_tags", None)
+        if tags:
+            _bump(session, tags)
+
+    @event.listens_for(session, "after_rollback")
+    def discard(session):
+        session.info.pop("version_tags", None)
+
+
+def conditional(*tags):
+    """
+    Decorador para rutas GET. Los tags pueden usar los argumentos de la ruta,
+    por ejemplo "favorites:{user_id}". El ETag sale de la ruta, los query args
+    y las versiones; si el cliente ya lo tiene se responde 304 sin ejecutar la vista.
+    Va antes de @response_cache.cached, que usa las versiones que deja en g.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            resolved = sorted(tag.format(**kwargs) for tag in tags)
+            rows = db.session.execute(
+                select(data_version.c.tag, data_version.c.version, data_version.c.updated_at)
+                .where(data_version.c.tag.in_(resolved))).all()
+            versions = {tag: (version, updated_at) for tag, version, updated_at in rows}
+            # las versiones leidas de la base; cache.py las usa en sus llaves, asi el
+            # body cacheado en un worker nunca es mas viejo que el ETag
+            g.data_versions = ",".join(f"{tag}:{versions.get(tag, (0,))[0]}" for tag in resolved)
+            # Accept se incluye porque ?limit=all puede responder JSON o NDJSON
+            stamp = request.full_path + "|" + request.headers.get("Accept", "") + "|" + g.data_versions
+            etag = hashlib.blake2b(stamp.encode(), digest_size=12).hexdigest()
+            last_modified = max((updated_at for _, updated_at in versions.values()), default=None)
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+                # Last-Modified tiene resolucion de segundos: mientras el segundo actual
+                # no termine podria haber otro cambio con la misma fecha
+                if last_modified >= datetime.now(timezone.utc).replace(microsecond=0):
+                    last_modified = None
+
+            if request.if_none_match:
+                # comparacion debil: las respuestas comprimidas llevan W/"etag" (compression.py)
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
@@ -1,5 +1,42 @@
 # This file was created to run the application on heroku using gunicorn.
 # Read more about it here: https://devcenter.heroku.com/articles/python-gunicorn
+"""
+Modos de worker de gunicorn, se eligen con variables de entorno que lee
+gunicorn.conf.py (en la raiz, junto al Procfile). Las rutas son las mismas
+en todos los modos.
+
+sync (por defecto)
+    Un request a la vez por worker. WEB_CONCURRENCY=4 levanta 4 workers;
+    una query lenta deja ese worker ocupado hasta que termina.
+
+gthread: GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=8
+    Cada worker atiende GUNICORN_THREADS requests a la vez con threads. El
+    pool de conexiones queda en DB_POOL_SIZE=GUNICORN_THREADS si no se
+    define otro valor, asi ningun thread espera conexion en carga normal.
+
+gevent: GUNICORN_WORKER_CLASS=gevent GUNICORN_WORKER_CONNECTIONS=1000
+    Cada worker atiende hasta GUNICORN_WORKER_CONNECTIONS requests con
+    greenlets; mientras uno espera a la base los demas siguen. Necesita
+    `pip install gevent` y, con PostgreSQL, `pip install psycogreen`
+    (psycopg2 es C y sin el parche bloquea todo el worker en cada query).
+    Los requests que pasan de DB_POOL_SIZE + DB_MAX_OVERFLOW esperan una
+    conexion hasta DB_POOL_TIMEOUT segundos: conviene subir el pool o poner
+    PgBouncer delante (DB_POOLER=external, ver database.py).
+
+`flask bench concurrency` compara los modos con 100 y 1000 clientes.
+"""
+try:
+    from gevent import monkey
+except ImportError:  # gevent es opcional
+    monkey = None
+
+if monkey is not None and monkey.is_module_patched("socket"):
+    # el worker gevent ya parcheo la stdlib; falta el driver de PostgreSQL
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
 
 from app import app as application
 
@@ -0,0 +1,89 @@
+"""
+Fixtures comunes: la app sobre una base SQLite propia, una base vacia por
+test y helpers para sembrar datos y armar el header Authorization.
+Las variables de entorno van antes de importar la app (se leen al importar).
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE = os.path.join(tempfile.mkdtemp(prefix="api-tests-"), "test.db")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DATABASE}",
+    "AUTH_SECRET": "tests-secret",
+    "PASSWORD_WORKERS": "0",
+    "PASSWORD_SCRYPT_LN": "4",
+    "RATELIMIT_WRITES": "10000/minute",
+    "RATELIMIT_LOGIN": "3/minute",
+    "FLASK_DEBUG": "0",
+})
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.pop("RATELIMIT_URL", None)
+os.environ.pop("CACHE_URL", None)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import pytest  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from models import db, User, Character, Planet, Vehicle  # noqa: E402
+from auth import auth  # noqa: E402
+from cache import response_cache, MemoryBackend  # noqa: E402
+from ratelimit import rate_limiter  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        # la cache y los buckets son del proceso: cada test empieza de cero
+        response_cache.backend = MemoryBackend(response_cache.backend.max_entries)
+        response_cache.invalidated_at.clear()
+        rate_limiter.backend.buckets.clear()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(n, **fields):
+    user = User(**{"name": f"user{n}", "last_name": "test", "phone": "1", "email": f"user{n}@test",
+                   "password": "secret", "is_active": True, **fields})
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def make_planet(n, **fields):
+    planet = Planet(**{"name": f"planet{n}", "climate": "arid", "surface_water": "1", "diameter": "10465",
+                       "rotation_period": "23", "terrain": "desert", "gravity": "1", "orbital_period": "304",
+                       "population": "200000", "description": "d", **fields})
+    db.session.add(planet)
+    db.session.commit()
+    return planet.id
+
+
+def make_character(n, **fields):
+    character = Character(**{"name": f"character{n}", "age": 20, "height": 1.7, "weight": 70, "gender": "male",
+                             "mass": "77", "homeworld": "Tatooine", "description": "d", **fields})
+    db.session.add(character)
+    db.session.commit()
+    return character.id
+
+
+def make_vehicle(n, **fields):
+    vehicle = Vehicle(**{"name": f"vehicle{n}", "consumables": "2", "cargo_capacity": "50000", "passenger": "30",
+                         "max_atmosphering_speed": "30", "crew": "46", "length": "36.8", "model": "Digger",
+                         "cost_in_credits": "150000", "manufactured": "Corellia", "vehicle_class": "wheeled",
+                         "description": "d", **fields})
+    db.session.add(vehicle)
+    db.session.commit()
+    return vehicle.id
+
+
+def bearer(user_id, ttl=3600):
+    return {"Authorization": f"Bearer {auth.issue(user_id, ttl)[0]}"}
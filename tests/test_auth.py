@@ -0,0 +1,64 @@
+"""Tokens de /login y @login_required: 401 sin token valido, 403 con el de otro usuario."""
+from conftest import bearer, make_user
+
+
+def test_login_returns_a_token_for_the_owner_routes(client):
+    user_id = make_user(1)
+    response = client.post("/login", json={"email": "user1@test", "password": "secret"})
+    assert response.status_code == 200
+    token = response.get_json()["token"]
+    response = client.get(f"/user/{user_id}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.get_json()["user"]["email"] == "user1@test"
+
+
+def test_user_reads_need_a_token(client):
+    user_id = make_user(1)
+    for path in (f"/user/{user_id}", "/user", f"/users/favorites/{user_id}"):
+        assert client.get(path).status_code == 401, path
+
+
+def test_user_reads_of_another_user_are_forbidden(client):
+    owner, other = make_user(1), make_user(2)
+    headers = bearer(owner)
+    for path in (f"/user/{other}", f"/users/favorites/{other}"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 403, path
+    assert client.put(f"/user/{other}", json={"phone": "2"}, headers=headers).status_code == 403
+    assert client.post("/user_planet", json={"user_id": other, "planet_id": 1}, headers=headers).status_code == 403
+
+
+def test_user_list_hides_email_and_favorites(client):
+    owner = make_user(1)
+    make_user(2)
+    headers = bearer(owner)
+    response = client.get("/user", headers=headers)
+    assert response.status_code == 200
+    for user in response.get_json()["results"]:
+        assert set(user) == {"id", "name", "last_name", "is_active"}
+    assert client.get("/user?expand=planets", headers=headers).status_code == 403
+    assert client.get("/user?fields=email", headers=headers).status_code == 400
+
+
+def test_expired_token_is_rejected(client):
+    user_id = make_user(1)
+    response = client.get(f"/user/{user_id}", headers=bearer(user_id, ttl=-1))
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Token vencido"
+
+
+def test_tampered_token_is_rejected(client):
+    user_id = make_user(1)
+    token = bearer(user_id)["Authorization"]
+    response = client.get(f"/user/{user_id}", headers={"Authorization": token[:-2] + "xx"})
+    assert response.status_code == 401
+
+
+def test_revoked_token_is_rejected_after_logout(client):
+    user_id = make_user(1)
+    headers = bearer(user_id)
+    assert client.get(f"/user/{user_id}", headers=headers).status_code == 200
+    assert client.post("/logout", headers=headers).status_code == 200
+    response = client.get(f"/user/{user_id}", headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Token revocado"
@@ -0,0 +1,79 @@
+"""POST /users/favorites/bulk: un estado por operacion y una sola transaccion."""
+from conftest import bearer, make_character, make_planet, make_user, make_vehicle
+
+
+def bulk(client, user_id, operations):
+    response = client.post("/users/favorites/bulk", json={"operations": operations}, headers=bearer(user_id))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def statuses(body):
+    return [result["status"] for result in body["results"]]
+
+
+def test_every_status(client):
+    owner, other = make_user(1), make_user(2)
+    planet, character = make_planet(1), make_character(1)
+    kept, removed = make_vehicle(1), make_vehicle(2)
+    bulk(client, owner, [{"op": "add", "user_id": owner, "vehicle_id": kept},
+                         {"op": "add", "user_id": owner, "vehicle_id": removed}])
+
+    body = bulk(client, owner, [
+        {"op": "add", "user_id": owner, "planet_id": planet},           # created
+        {"op": "add", "user_id": owner, "vehicle_id": kept},            # exists
+        {"op": "add", "user_id": owner, "character_id": 999},           # not_found
+        {"op": "add", "user_id": other, "planet_id": planet},           # forbidden
+        {"op": "add", "user_id": owner, "character_id": character},     # superseded
+        {"op": "delete", "user_id": owner, "character_id": character},  # not_found: no era favorito
+        {"op": "add", "user_id": True, "planet_id": planet},            # invalid: bool no es id
+        {"op": "move", "user_id": owner, "planet_id": planet},          # invalid
+        {"op": "add", "user_id": owner},                                # invalid
+        {"op": "delete", "user_id": owner, "vehicle_id": removed},      # deleted
+    ])
+    assert statuses(body) == ["created", "exists", "not_found", "forbidden", "superseded", "not_found",
+                              "invalid", "invalid", "invalid", "deleted"]
+    assert [result["index"] for result in body["results"]] == list(range(10))
+    assert body["summary"] == {"created": 1, "exists": 1, "not_found": 2, "forbidden": 1, "superseded": 1,
+                               "invalid": 3, "deleted": 1}
+
+    favorites = client.get(f"/users/favorites/{owner}", headers=bearer(owner)).get_json()
+    assert [item["id"] for item in favorites["fav_planets"]] == [planet]
+    assert favorites["fav_character"] == []
+    assert [item["id"] for item in favorites["fav_vehicles"]] == [kept]
+    assert client.get(f"/users/favorites/{other}", headers=bearer(other)).get_json()["fav_planets"] == []
+
+
+def test_counts_follow_the_rows_that_changed(client):
+    owner = make_user(1)
+    planet = make_planet(1)
+    operations = [{"op": "add", "user_id": owner, "planet_id": planet}]
+    assert statuses(bulk(client, owner, operations)) == ["created"]
+    assert statuses(bulk(client, owner, operations)) == ["exists"]
+    assert client.get(f"/stats/favorites/planet/{planet}").get_json()["favorites"] == 1
+    bulk(client, owner, [{"op": "delete", "user_id": owner, "planet_id": planet}])
+    assert client.get(f"/stats/favorites/planet/{planet}").get_json()["favorites"] == 0
+
+
+def test_noop_keeps_the_etag(client):
+    owner = make_user(1)
+    planet = make_planet(1)
+    bulk(client, owner, [{"op": "add", "user_id": owner, "planet_id": planet}])
+    etag = client.get(f"/users/favorites/{owner}", headers=bearer(owner)).headers["ETag"]
+    # nada cambia: ni la version del usuario ni su ETag
+    bulk(client, owner, [{"op": "add", "user_id": owner, "planet_id": planet},
+                         {"op": "delete", "user_id": owner, "vehicle_id": 999}])
+    response = client.get(f"/users/favorites/{owner}", headers={**bearer(owner), "If-None-Match": etag})
+    assert response.status_code == 304
+    bulk(client, owner, [{"op": "delete", "user_id": owner, "planet_id": planet}])
+    response = client.get(f"/users/favorites/{owner}", headers={**bearer(owner), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["fav_planets"] == []
+
+
+def test_request_errors(client):
+    owner = make_user(1)
+    headers = bearer(owner)
+    assert client.post("/users/favorites/bulk", json={"operations": []}, headers=headers).status_code == 400
+    assert client.post("/users/favorites/bulk", json={"operations": {}}, headers=headers).status_code == 400
+    assert client.post("/users/favorites/bulk", json={"operations": [{}]}).status_code == 401
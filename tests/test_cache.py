@@ -0,0 +1,51 @@
+"""response_cache: la segunda lectura sale de la cache y una escritura la invalida."""
+from conftest import make_planet
+from cache import response_cache
+
+PLANET = {"name": "Hoth", "climate": "frozen", "surface_water": "100", "diameter": "7200",
+          "rotation_period": "23", "terrain": "tundra", "gravity": "1.1", "orbital_period": "549",
+          "population": "unknown", "description": "d"}
+
+
+def names(response):
+    return [planet["name"] for planet in response.get_json()["results"]]
+
+
+def test_list_is_served_from_cache(client):
+    make_planet(1)
+    first = client.get("/get_all_planet")
+    hits = response_cache.hits
+    second = client.get("/get_all_planet")
+    assert response_cache.hits == hits + 1
+    assert second.get_data() == first.get_data()
+
+
+def test_write_then_get_returns_the_fresh_body(client):
+    planet_id = make_planet(1)
+    assert names(client.get("/get_all_planet")) == ["planet1"]
+    assert client.get(f"/get_one_planet/{planet_id}").get_json()["planet"]["name"] == "planet1"
+
+    assert client.put(f"/planet/{planet_id}", json=PLANET).status_code == 200
+    assert names(client.get("/get_all_planet")) == ["Hoth"]
+    assert client.get(f"/get_one_planet/{planet_id}").get_json()["planet"]["name"] == "Hoth"
+    assert client.get(f"/get_many_planet?ids={planet_id}").get_json()["results"][0]["name"] == "Hoth"
+
+
+def test_insert_and_delete_invalidate_the_list(client):
+    planet_id = make_planet(1)
+    assert names(client.get("/get_all_planet")) == ["planet1"]
+    assert client.post("/add_planet", json=PLANET).status_code == 201
+    assert names(client.get("/get_all_planet")) == ["planet1", "Hoth"]
+    assert client.delete(f"/planet/{planet_id}").status_code == 200
+    assert names(client.get("/get_all_planet")) == ["Hoth"]
+    assert client.get(f"/get_many_planet?ids={planet_id}").get_json()["missing"] == [planet_id]
+
+
+def test_etag_changes_with_the_write(client):
+    planet_id = make_planet(1)
+    etag = client.get("/get_all_planet").headers["ETag"]
+    assert client.get("/get_all_planet", headers={"If-None-Match": etag}).status_code == 304
+    assert client.put(f"/planet/{planet_id}", json=PLANET).status_code == 200
+    response = client.get("/get_all_planet", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert names(response) == ["Hoth"]
@@ -0,0 +1,83 @@
+"""Paginacion por cursor con y sin ?sort=, incluido el paso de los valores conocidos a los NULL."""
+from conftest import make_planet
+from pagination import encode_cursor
+
+# poblaciones con empates y con valores que no son numeros (NULL en la columna espejo)
+POPULATIONS = ["200000", "unknown", "1000", "200000", "n/a", "30", "unknown", "1,000,000"]
+
+
+def walk(client, query, limit):
+    """Ids de todas las paginas siguiendo next_cursor."""
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = f"/get_all_planet?{query}&limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body["results"]) <= limit
+        ids += [planet["id"] for planet in body["results"]]
+        cursor, pages = body["next_cursor"], pages + 1
+        if cursor is None:
+            return ids, pages
+
+
+def seed():
+    return {make_planet(n, population=population): population for n, population in enumerate(POPULATIONS)}
+
+
+def expected(planets, descending=False):
+    known = sorted((id for id, population in planets.items() if population not in ("unknown", "n/a")),
+                   key=lambda id: (float(planets[id].replace(",", "")), id), reverse=descending)
+    unknown = sorted((id for id in planets if id not in known), reverse=descending)
+    return known + unknown
+
+
+def test_cursor_without_sort_walks_by_id(client):
+    planets = seed()
+    ids, pages = walk(client, "", 3)
+    assert ids == sorted(planets)
+    assert pages == 3
+
+
+def test_sort_crosses_from_known_values_into_nulls(client):
+    planets = seed()
+    for limit in (1, 2, 3, 5, 6, 8, 50):
+        ids, _ = walk(client, "sort=population", limit)
+        assert ids == expected(planets), limit
+
+
+def test_descending_sort_keeps_nulls_last(client):
+    planets = seed()
+    for limit in (2, 6):
+        ids, _ = walk(client, "sort=-population", limit)
+        assert ids == expected(planets, descending=True), limit
+
+
+def test_sort_with_fields_and_filters(client):
+    planets = seed()
+    make_planet(99, population="5", climate="temperate")
+    ids, _ = walk(client, "sort=population&climate=arid&fields=name", 3)
+    assert ids == expected(planets)
+
+
+def test_stream_matches_the_pages(client):
+    planets = seed()
+    response = client.get("/get_all_planet?sort=population&limit=all")
+    assert [planet["id"] for planet in response.get_json()] == expected(planets)
+
+
+def test_cursor_inside_the_nulls(client):
+    planets = seed()
+    nulls = expected(planets)[-3:]
+    response = client.get(f"/get_all_planet?sort=population&cursor={encode_cursor([None, nulls[0]])}")
+    assert [planet["id"] for planet in response.get_json()["results"]] == nulls[1:]
+
+
+def test_invalid_sort_and_cursor_are_400(client):
+    seed()
+    response = client.get("/get_all_planet?sort=name")
+    assert response.status_code == 400
+    assert "population" in response.get_json()["sortable"]
+    assert client.get("/get_all_planet?cursor=%%%").status_code == 400
+    # un cursor sin sort no sirve con sort
+    assert client.get(f"/get_all_planet?sort=population&cursor={encode_cursor(3)}").status_code == 400
@@ -0,0 +1,41 @@
+"""429 de @rate_limit con los headers RateLimit-* y Retry-After (RATELIMIT_LOGIN=3/minute en conftest)."""
+from conftest import bearer, make_user
+
+LOGIN = {"email": "user1@test", "password": "wrong"}
+
+
+def test_login_past_the_limit_is_429(client):
+    make_user(1)
+    for remaining in (2, 1, 0):
+        response = client.post("/login", json=LOGIN)
+        assert response.status_code == 401
+        assert response.headers["RateLimit-Limit"] == "3"
+        assert response.headers["RateLimit-Remaining"] == str(remaining)
+        assert response.headers["RateLimit-Policy"] == "3;w=60;burst=3"
+        assert "Retry-After" not in response.headers
+    response = client.post("/login", json=LOGIN)
+    assert response.status_code == 429
+    assert response.headers["RateLimit-Remaining"] == "0"
+    assert int(response.headers["RateLimit-Reset"]) == 60
+    # una ficha cada 20 segundos
+    assert int(response.headers["Retry-After"]) == 20
+    assert response.get_json()["message"] == "Demasiados requests, reintente en 20 segundos"
+
+
+def test_buckets_are_per_client(client):
+    make_user(1)
+    for _ in range(3):
+        client.post("/login", json=LOGIN)
+    assert client.post("/login", json=LOGIN).status_code == 429
+    response = client.post("/login", json=LOGIN, environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    assert response.status_code == 401
+
+
+def test_token_owner_is_the_client(client):
+    user_id = make_user(1)
+    for _ in range(3):
+        client.post("/login", json=LOGIN)
+    # el token manda sobre la IP: otro bucket aunque la direccion sea la misma
+    response = client.post("/login", json=LOGIN, headers=bearer(user_id))
+    assert response.status_code == 401
+    assert response.headers["RateLimit-Remaining"] == "2"
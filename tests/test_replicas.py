@@ -0,0 +1,23 @@
+"""
+Ruteo a replicas y read-your-writes de punta a punta con `flask bench
+replicas`: un primario y dos replicas SQLite sin replicacion, el comando
+sale con codigo 1 si falla algun chequeo. Corre en otro proceso porque las
+replicas (DATABASE_REPLICA_URLS) se configuran al importar la app.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_replicas_read_your_writes(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/app.db", AUTH_SECRET="test-replicas-secret",
+               PASSWORD_WORKERS="0", FLASK_DEBUG="0")
+    env.pop("DATABASE_REPLICA_URLS", None)
+    result = subprocess.run([sys.executable, "-m", "flask", "--app", os.path.join(ROOT, "src", "app.py"),
+                             "bench", "replicas", "--directory", str(tmp_path / "replicas")],
+                            env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "[ok] quien escribio ve su favorito" in result.stdout
+    assert "FALLO" not in result.stdout
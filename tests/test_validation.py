@@ -0,0 +1,56 @@
+"""validate_payload (400 con missing_fields) y check_unique (409) en las escrituras."""
+from conftest import bearer, make_user, make_vehicle
+
+USER = {"name": "Ana", "last_name": "Diaz", "phone": "1", "email": "ana@test", "password": "secret",
+        "is_active": True}
+
+
+def test_missing_fields_are_listed(client):
+    response = client.post("/user", json={"name": "Ana", "email": ""})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["message"] == "Datos invalidos"
+    assert set(body["missing_fields"]) == {"last_name", "phone", "email", "password", "is_active"}
+    assert all(error["code"] == "required" for error in body["errors"])
+
+
+def test_wrong_types_are_not_missing_fields(client):
+    response = client.post("/user", json={**USER, "is_active": "si", "name": 5})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["missing_fields"] == []
+    assert [(error["field"], error["code"]) for error in body["errors"]] == [("is_active", "type")]
+
+
+def test_max_length_is_checked(client):
+    response = client.post("/user", json={**USER, "name": "x" * 500})
+    assert response.status_code == 400
+    assert response.get_json()["errors"][0]["code"] == "max_length"
+
+
+def test_duplicate_email_is_a_conflict(client):
+    assert client.post("/user", json=USER).status_code == 201
+    response = client.post("/user", json={**USER, "name": "Otra"})
+    assert response.status_code == 409
+    assert response.get_json()["errors"] == [
+        {"field": "email", "code": "unique", "message": "'email' ya existe: ana@test"}]
+
+
+def test_update_keeps_its_own_unique_values(client):
+    user_id = make_user(1)
+    make_user(2)
+    headers = bearer(user_id)
+    assert client.put(f"/user/{user_id}", json={"email": "user1@test"}, headers=headers).status_code == 200
+    response = client.put(f"/user/{user_id}", json={"email": "user2@test"}, headers=headers)
+    assert response.status_code == 409
+    assert response.get_json()["errors"][0]["field"] == "email"
+
+
+def test_duplicate_vehicle_name_is_a_conflict(client):
+    make_vehicle(1)
+    response = client.post("/add_vehicle", json={
+        "name": "vehicle1", "consumables": "2", "cargo_capacity": "1", "passenger": "1",
+        "max_atmosphering_speed": "1", "crew": "1", "length": "1", "model": "m", "cost_in_credits": "1",
+        "manufactured": "m", "vehicle_class": "c", "description": "d"})
+    assert response.status_code == 409
+    assert response.get_json()["errors"][0]["field"] == "name"